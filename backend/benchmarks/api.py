@@ -0,0 +1,156 @@
+"""
+python -m benchmarks.api [--drinks N] [--requests N] [--concurrency N] [--output FILE]
+
+drives every endpoint of src.api with a threaded load generator
+and reports throughput, p50/p95/p99 latency, peak allocations and
+sql statements per request
+"""
+import argparse
+import itertools
+import tempfile
+import threading
+from pathlib import Path
+
+from src.auth.auth import token_cache
+from src.auth.local import LocalAuthority
+
+from .common import (count_queries, measure_allocations, print_results,
+                     run_load, seed_app, seed_drinks, summarize, write_results)
+
+PERMISSIONS = ("get:drinks-detail", "post:drinks", "patch:drinks", "delete:drinks")
+ALLOCATION_SAMPLES = 20
+BULK_SIZE = 10
+
+
+def endpoints(drinks, doomed):
+    """
+    endpoints(drinks, doomed)
+        return (name, method, path, body) tuples, body and path may be callables
+        taking a per call counter so writes never collide
+            doomed: the ids DELETE removes, one per call, filled before it runs (see main)
+    """
+    recipe = [dict(name="espresso", color="brown", parts=1)]
+    return [
+        ("list", "GET", "/drinks", None),
+        ("list_page", "GET", "/drinks?limit=50", None),
+        # the full listing rendered per request (bypasses the menu cache), then streamed
+        ("list_render", "GET", "/drinks?total=false", None),
+        ("list_stream", "GET", "/drinks?total=false&stream=true", None),
+        ("list_detail", "GET", "/drinks-detail", None),
+        ("detail", "GET", f"/drinks/{max(1, drinks // 2)}", None),
+        ("export", "GET", "/drinks/export", None),
+        # a long-poll answered at once, waiting would only measure the timeout
+        ("changes", "GET", "/drinks/changes?since=0&timeout=0", None),
+        (
+            "create",
+            "POST",
+            "/drinks",
+            lambda n: dict(title=f"Bench {n}", recipe=recipe),
+        ),
+        (
+            "update",
+            "PATCH",
+            lambda n: f"/drinks/{n % drinks + 1}",
+            lambda n: dict(title=f"Updated {n}"),
+        ),
+        (
+            "bulk_create",
+            "POST",
+            "/drinks/bulk",
+            lambda n: [
+                dict(title=f"Bulk {n} {index}", recipe=recipe)
+                for index in range(BULK_SIZE)
+            ],
+        ),
+        ("delete", "DELETE", lambda n: f"/drinks/{doomed[n]}", None),
+    ]
+
+
+def make_call(app, method, path, body, headers):
+    local = threading.local()
+    counter = itertools.count()
+
+    def call():
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+
+        n = next(counter)
+        response = client.open(
+            path(n) if callable(path) else path,
+            method=method,
+            json=body(n) if callable(body) else body,
+            headers=headers,
+        )
+        response.get_data()
+        if response.status_code != 200:
+            raise RuntimeError(f"{method} {path} answered {response.status}")
+
+    return call
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drinks", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--endpoint", action="append", help="only run these endpoints")
+    parser.add_argument("--no-token-cache", action="store_true")
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        authority = LocalAuthority(audience="coffee-shop-benchmarks")
+        authority.install()
+        if args.no_token_cache:
+            token_cache.maxsize = 0
+        headers = dict(Authorization=f"Bearer {authority.token(PERMISSIONS)}")
+
+        app = seed_app(Path(directory) / "bench.db", args.drinks)
+
+        results = []
+        doomed = []
+        for name, method, path, body in endpoints(args.drinks, doomed):
+            if args.endpoint and name not in args.endpoint:
+                continue
+            if method == "DELETE":
+                # seeded last so the reads list --drinks drinks, one per call below
+                calls = 2 + ALLOCATION_SAMPLES + args.requests
+                doomed.extend(seed_drinks(app, calls, "Doomed"))
+
+            call = make_call(app, method, path, body, headers)
+            call()  # warm up caches and connections
+
+            queries = count_queries(call)
+            allocations = measure_allocations(call, ALLOCATION_SAMPLES)
+            latencies, elapsed = run_load(call, args.requests, args.concurrency)
+            results.append(
+                summarize(
+                    latencies,
+                    elapsed,
+                    endpoint=name,
+                    method=method,
+                    queries=queries,
+                    peak_kib=allocations,
+                )
+            )
+
+    print_results(
+        results,
+        ("endpoint", "rps", "p50_ms", "p95_ms", "p99_ms", "peak_kib", "queries"),
+    )
+    if args.output:
+        write_results(
+            args.output,
+            "api",
+            results,
+            drinks=args.drinks,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            token_cache=not args.no_token_cache,
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+python -m benchmarks.asgi [--drinks N] [--requests N] [--concurrency N] [--threads N]
+
+compares the threaded WSGI app with the ASGI entry point (src.asgi)
+on a throwaway sqlite database seeded with --drinks drinks
+"""
+import argparse
+import asyncio
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from src.asgi import AsgiAdapter
+
+from .common import print_results, run_load, seed_app, summarize, write_results
+
+PATHS = ("/drinks", "/drinks?limit=50")
+
+
+def bench_wsgi(app, path, requests, concurrency):
+    local = threading.local()
+
+    def call():
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        assert client.get(path).status_code == 200
+
+    latencies, elapsed = run_load(call, requests, concurrency)
+    return summarize(latencies, elapsed, server="wsgi", path=path)
+
+
+def bench_asgi(app, path, requests, concurrency, threads):
+    adapter = AsgiAdapter(app, threads=threads)
+    route, _, query = path.partition("?")
+    scope = dict(
+        type="http",
+        method="GET",
+        path=route,
+        query_string=query.encode(),
+        headers=[],
+        server=("localhost", 80),
+    )
+
+    async def request():
+        messages = []
+
+        async def receive():
+            return dict(type="http.request", body=b"")
+
+        async def send(message):
+            messages.append(message)
+
+        started = time.perf_counter()
+        await adapter(scope, receive, send)
+        assert messages[0]["status"] == 200
+        return time.perf_counter() - started
+
+    async def worker(count):
+        return [await request() for _ in range(count)]
+
+    async def main():
+        counts = [requests // concurrency] * concurrency
+        results = await asyncio.gather(*map(worker, counts))
+        return [latency for result in results for latency in result]
+
+    started = time.perf_counter()
+    latencies = asyncio.run(main())
+    elapsed = time.perf_counter() - started
+    adapter.executor.shutdown()
+    return summarize(latencies, elapsed, server="asgi", path=path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drinks", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = seed_app(Path(directory) / "bench.db", args.drinks)
+
+        results = []
+        for path in PATHS:
+            results.append(bench_wsgi(app, path, args.requests, args.concurrency))
+            results.append(
+                bench_asgi(app, path, args.requests, args.concurrency, args.threads)
+            )
+
+    print_results(results, ("server", "path", "rps", "p50_ms", "p95_ms", "p99_ms"))
+    if args.output:
+        write_results(
+            args.output,
+            "asgi",
+            results,
+            drinks=args.drinks,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            threads=args.threads,
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
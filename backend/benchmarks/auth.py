@@ -0,0 +1,80 @@
+"""
+python -m benchmarks.auth [--tokens N] [--repeat N] [--output FILE]
+
+measures token verifications per second of src.auth.auth.verify_decode_jwt
+against python-jose's jwt.decode given the jwk dict, as verify_decode_jwt used to
+"""
+import argparse
+import json
+import os
+import time
+
+from jose import jwt
+
+from src.auth.auth import (b64url_decode, get_key_store, reset_key_store,
+                           verify_decode_jwt)
+from src.auth.constants import Permissions
+from src.auth.local import LocalAuthority
+
+from .common import print_results, write_results
+
+
+def jose_decode(token):
+    # the previous verifier: header parsed by hand, then everything again by jose
+    # with the public key rebuilt from its jwk dict
+    header = json.loads(b64url_decode(token.split(".")[0]))
+    key = get_key_store().get_key(header["kid"])
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[os.environ["AUTH0_JWT_ALGORITHM"]],
+        audience=os.environ["AUTH0_API_AUDIENCE"],
+        issuer=f"{os.environ['AUTH0_DOMAIN']}/",
+    )
+
+
+def measure(verify, tokens, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for token in tokens:
+            verify(token)
+    elapsed = time.perf_counter() - started
+    count = len(tokens) * repeat
+    return dict(
+        verifications=count,
+        ops_per_sec=round(count / elapsed, 1),
+        us_per_op=round(elapsed / count * 1e6, 1),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tokens", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args(argv)
+
+    authority = LocalAuthority(audience="coffee-shop-benchmarks")
+    authority.install()
+    permissions = [Permissions.GET_DRINK_DETAILS, Permissions.POST_DRINKS]
+    tokens = [
+        authority.token(permissions, subject=f"benchmarks|{index}")
+        for index in range(args.tokens)
+    ]
+
+    results = []
+    for name, verify in (("jose", jose_decode), ("single-pass", verify_decode_jwt)):
+        assert verify(tokens[0])["sub"] == "benchmarks|0"
+        results.append(dict(verifier=name, **measure(verify, tokens, args.repeat)))
+    reset_key_store()
+
+    print_results(results, ("verifier", "ops_per_sec", "us_per_op"))
+    if args.output:
+        write_results(
+            args.output, "auth", results, tokens=args.tokens, repeat=args.repeat
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
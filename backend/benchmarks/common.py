@@ -0,0 +1,176 @@
+"""
+shared helpers of the benchmark suite
+    seed_app: a throwaway sqlite database seeded with DrinkFactory drinks, seed_drinks: more of them
+    run_load: a threaded load generator, summarize: throughput and latency percentiles
+    count_queries, measure_allocations: per request sql statements and memory
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from src.api import create_app
+from src.models import db
+from tests.factories import DrinkFactory
+
+
+# Database
+def seed_app(database, drinks, config=None):
+    """
+    seed_app(database, drinks, config=None)
+        return an app on a fresh sqlite database at `database` holding `drinks` drinks
+    """
+    # the load generator is a single client, rate limits would only measure 429s
+    config = dict(RATE_LIMIT_PER_IP=None, RATE_LIMIT_PERMISSIONS={}, **(config or {}))
+    app = create_app(dict(config, SQLALCHEMY_DATABASE_URI=f"sqlite:///{database}"))
+    with app.app_context():
+        db.create_all()
+        DrinkFactory.reset_sequence()
+        for index in range(drinks):
+            DrinkFactory.create(title=f"Drink {index}")
+        db.session.commit()
+    return app
+
+
+def seed_drinks(app, count, prefix):
+    """
+    seed_drinks(app, count, prefix)
+        return the ids of `count` more drinks titled "<prefix> <index>"
+    """
+    with app.app_context():
+        drinks = [
+            DrinkFactory.create(title=f"{prefix} {index}") for index in range(count)
+        ]
+        db.session.commit()
+        return [drink.id for drink in drinks]
+
+
+# Measurements
+def percentile(values, percent):
+    values = sorted(values)
+    index = max(0, min(len(values) - 1, round(len(values) * percent / 100) - 1))
+    return values[index]
+
+
+def summarize(latencies, elapsed, **fields):
+    """
+    summarize(latencies, elapsed, **fields)
+        return fields plus the throughput and p50/p95/p99 latencies in milliseconds
+    """
+    return dict(
+        fields,
+        requests=len(latencies),
+        rps=round(len(latencies) / elapsed, 1),
+        p50_ms=round(statistics.median(latencies) * 1000, 3),
+        p95_ms=round(percentile(latencies, 95) * 1000, 3),
+        p99_ms=round(percentile(latencies, 99) * 1000, 3),
+    )
+
+
+def run_load(call, requests, concurrency):
+    """
+    run_load(call, requests, concurrency)
+        calls call() `requests` times spread over `concurrency` threads
+        return (latencies, elapsed) in seconds
+    """
+
+    def worker(count):
+        latencies = []
+        for _ in range(count):
+            started = time.perf_counter()
+            call()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    counts = [requests // concurrency] * concurrency
+    counts[0] += requests % concurrency
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(worker, counts))
+    elapsed = time.perf_counter() - started
+    return [latency for result in results for latency in result], elapsed
+
+
+def count_queries(call):
+    """
+    count_queries(call)
+        return the number of sql statements run by call()
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+    return len(statements)
+
+
+def measure_allocations(call, samples=20):
+    """
+    measure_allocations(call, samples=20)
+        return the median peak of memory traced by tracemalloc during call(), in KiB
+    """
+    peaks = []
+    for _ in range(samples):
+        tracemalloc.start()
+        try:
+            call()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak)
+    return round(statistics.median(peaks) / 1024, 1)
+
+
+# Results
+def environment():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return dict(
+        revision=revision,
+        python=platform.python_version(),
+        platform=platform.platform(),
+        timestamp=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
+
+
+def write_results(path, name, results, **parameters):
+    """
+    write_results(path, name, results, **parameters)
+        saves the results with the parameters and the environment they were measured in
+    """
+    document = dict(
+        benchmark=name,
+        environment=environment(),
+        parameters=parameters,
+        results=results,
+    )
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2))
+
+
+def print_results(results, columns):
+    for result in results:
+        print("  ".join(f"{column}={result[column]}" for column in columns))
@@ -0,0 +1,97 @@
+"""
+python -m benchmarks.recipes [--ingredients N] [--drinks N] [--repeat N] [--output FILE]
+
+measures the recipe validation of src.recipes on a large recipe, against the
+sorted keys check DrinkSchema used to run per ingredient, and the full schema
+load of one drink and of a bulk payload
+"""
+import argparse
+import statistics
+import time
+
+from src.recipes import recipe_errors
+from src.serializers import DrinkSchema
+
+from .common import print_results, write_results
+
+COLORS = ["white", "#3b2a1d", "rgb(59, 42, 29)", "hsl(25deg 34% 17%)"]
+
+
+def sorted_keys_check(recipe):
+    # the previous check: fields only, through a sorted list per ingredient
+    for ingredient in recipe:
+        if sorted(ingredient.keys()) != ["color", "name", "parts"]:
+            return ["invalid recipe"]
+    return []
+
+
+def measure(call, repeat):
+    call()  # warm up, the colors are cached after the first pass
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ingredients", type=int, default=10000)
+    parser.add_argument("--drinks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args(argv)
+
+    recipe = [
+        dict(
+            name=f"ingredient {index}",
+            color=COLORS[index % len(COLORS)],
+            parts=index % 5 + 1 if index % 2 else str(index % 5 + 1),
+        )
+        for index in range(args.ingredients)
+    ]
+    drinks = [
+        dict(title=f"Drink {index}", recipe=recipe[index % 50 : index % 50 + 3])
+        for index in range(args.drinks)
+    ]
+    schema, bulk_schema = DrinkSchema(), DrinkSchema(many=True)
+    assert recipe_errors(recipe) == []
+
+    cases = [
+        ("sorted keys", args.ingredients, lambda: sorted_keys_check(recipe)),
+        ("recipe_errors", args.ingredients, lambda: recipe_errors(recipe)),
+        (
+            "schema load",
+            args.ingredients,
+            lambda: schema.load(dict(title="Drink", recipe=recipe)),
+        ),
+        ("bulk schema load", args.drinks * 3, lambda: bulk_schema.load(drinks)),
+    ]
+    results = []
+    for name, ingredients, call in cases:
+        ms = measure(call, args.repeat)
+        results.append(
+            dict(
+                validator=name,
+                ingredients=ingredients,
+                ms=ms,
+                us_per_ingredient=round(ms * 1000 / ingredients, 3),
+            )
+        )
+
+    print_results(results, ("validator", "ingredients", "ms", "us_per_ingredient"))
+    if args.output:
+        write_results(
+            args.output,
+            "recipes",
+            results,
+            ingredients=args.ingredients,
+            drinks=args.drinks,
+            repeat=args.repeat,
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
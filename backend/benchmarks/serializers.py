@@ -0,0 +1,100 @@
+"""
+python -m benchmarks.serializers [--drinks N] [--repeat N] [--output FILE]
+
+compares the marshmallow dump of the drink listings with the compiled
+projections (src.serializers.get_projection) and the json backends
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from flask import current_app
+
+from src import serializers
+from src.serializers import (JSON_BACKENDS, DrinkBriefSchema, DrinkSchema,
+                             get_projection, json_response)
+from src.services import get_all_drinks, get_drink_rows
+
+from .common import print_results, seed_app, write_results
+
+
+def measure(call, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def bench_schema(schema_class, backends, repeat):
+    schema = schema_class(many=True)
+    projection = get_projection(schema_class)
+
+    def marshmallow_dump():
+        return schema.dump(get_all_drinks())
+
+    def projection_dump():
+        return projection.dump(get_drink_rows(projection.columns))
+
+    results = [
+        dict(
+            schema=schema_class.__name__,
+            path="marshmallow",
+            json="json",
+            dump_ms=measure(marshmallow_dump, repeat),
+            response_ms=measure(
+                lambda: json_response(dict(drinks=marshmallow_dump(), success=True)),
+                repeat,
+            ),
+        )
+    ]
+    for backend in backends:
+        current_app.config["JSON_BACKEND"] = backend
+        results.append(
+            dict(
+                schema=schema_class.__name__,
+                path="projection",
+                json=backend,
+                dump_ms=measure(projection_dump, repeat),
+                response_ms=measure(
+                    lambda: json_response(dict(drinks=projection_dump(), success=True)),
+                    repeat,
+                ),
+            )
+        )
+    current_app.config["JSON_BACKEND"] = "json"
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drinks", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args(argv)
+
+    # the optional backends that are installed
+    backends = ["json"] + [
+        name for name in JSON_BACKENDS if getattr(serializers, name) is not None
+    ]
+
+    with tempfile.TemporaryDirectory() as directory:
+        app = seed_app(Path(directory) / "bench.db", args.drinks)
+        with app.test_request_context():
+            results = []
+            for schema_class in (DrinkBriefSchema, DrinkSchema):
+                results.extend(bench_schema(schema_class, backends, args.repeat))
+
+    print_results(results, ("schema", "path", "json", "dump_ms", "response_ms"))
+    if args.output:
+        write_results(
+            args.output, "serializers", results, drinks=args.drinks, repeat=args.repeat
+        )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+python -m benchmarks.startup [--runs N] [--top N] [--output FILE]
+
+measures the cold start of the application in fresh interpreters:
+the import of src.api, create_app and the first request, and the modules
+`python -X importtime` reports as the slowest to import
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from pathlib import Path
+
+from .common import print_results, write_results
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# run in a fresh interpreter, prints the timings of each stage in milliseconds
+PROBE = """
+import json, sys, time
+
+started = time.perf_counter()
+import src.api
+imported = time.perf_counter()
+app = src.api.create_app(dict(SQLALCHEMY_DATABASE_URI=sys.argv[1]))
+created = time.perf_counter()
+with app.app_context():
+    src.api.db_drop_and_create_all()
+ready = time.perf_counter()
+assert app.test_client().get("/drinks").status_code == 200
+served = time.perf_counter()
+
+print(json.dumps(dict(
+    import_ms=(imported - started) * 1000,
+    create_app_ms=(created - imported) * 1000,
+    first_request_ms=(served - ready) * 1000,
+)))
+"""
+
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def parse_importtime(stderr):
+    """
+    parse_importtime(stderr)
+        return the microseconds spent importing each top level package
+            the imports of another package are counted for that package only
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            depth = len(match.group(3))
+            imports.append((depth, match.group(4).split(".")[0], int(match.group(2))))
+
+    # importtime prints a module after its imports, walk it parents first
+    packages = Counter()
+    parents = []
+    for depth, package, cumulative in reversed(imports):
+        while parents and parents[-1][0] >= depth:
+            parents.pop()
+        parent = parents[-1][1] if parents else None
+        if package != parent:
+            packages[package] += cumulative
+            if parent is not None:
+                packages[parent] -= cumulative
+        parents.append((depth, package))
+    return packages
+
+
+def probe(database):
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, f"sqlite:///{database}"],
+        cwd=BACKEND,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(process.stdout), parse_importtime(process.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--output", help="write the results to this json file")
+    args = parser.parse_args(argv)
+
+    timings, packages = [], []
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(args.runs):
+            stages, imported = probe(Path(directory) / f"startup-{run}.db")
+            timings.append(stages)
+            packages.append(imported)
+
+    stages = [
+        dict(stage=stage, ms=round(statistics.median(t[stage] for t in timings), 1))
+        for stage in ("import_ms", "create_app_ms", "first_request_ms")
+    ]
+    names = set().union(*packages)
+    slowest = sorted(
+        (
+            dict(
+                package=name,
+                ms=round(statistics.median(p.get(name, 0) for p in packages) / 1000, 1),
+            )
+            for name in names
+        ),
+        key=lambda result: result["ms"],
+        reverse=True,
+    )[: args.top]
+
+    print_results(stages, ("stage", "ms"))
+    print_results(slowest, ("package", "ms"))
+    results = dict(stages=stages, packages=slowest)
+    if args.output:
+        write_results(args.output, "startup", results, runs=args.runs, top=args.top)
+    return results
+
+
+if __name__ == "__main__":
+    main()
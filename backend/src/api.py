@@ -1,27 +1,69 @@
 import json
 import os
+import time
 from functools import partial
 
-from flask import Blueprint, Flask, abort, jsonify, request
+from flask import (Blueprint, Flask, Response, abort, current_app, jsonify,
+                   request, stream_with_context, url_for)
 from flask_cors import CORS
+from marshmallow import ValidationError
 from sqlalchemy import exc
+from sqlalchemy.orm.exc import StaleDataError
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.http import quote_etag
 
 from src.auth.auth import AuthError, requires_auth
 from src.auth.constants import Permissions
+from src.caching import cache_control, conditional_get, drink_etag, menu_cache
+from src.changes import changes
+from src.compression import compression, matching_etag
+from src.config import Config
+from src.idempotency import idempotency, idempotent
+from src.instrumentation import instrumentation, timed
 from src.models import db_drop_and_create_all, setup_db
-from src.serializers import (drink_schema, drinks_brief_schema, drinks_schema,
-                             ma)
-from src.services import (add_drink, delete_drink, get_all_drinks, get_drink,
-                          update_drink)
+from src.ratelimit import rate_limiter
+from src.serializers import (DrinkBriefSchema, DrinkSchema, drink_schema,
+                             drinks_schema, get_json_dumps, get_projection,
+                             json_response, ma, validate_json_backend)
+from src.services import (add_drink, add_drinks, count_drinks, delete_drink,
+                          get_drink, get_drink_rows, get_existing_titles,
+                          iter_drink_batches, search_drinks, update_drink)
 
 drink_api = Blueprint("drinks", "")
 
+DRINK_FIELDS = ("id", "title", "recipe")
+# carries the drink's ETag on write responses, see set_drink_etag
+DRINK_ETAG_HEADER = "Drink-ETag"
+# response headers the cross-origin frontend reads: the drink version to send back
+# in If-Match, and the seconds to wait after a 429 or 503
+EXPOSED_HEADERS = ["ETag", DRINK_ETAG_HEADER, "Retry-After"]
 
-def create_app():
+
+def create_app(config=None):
+    """
+    create_app(config=None)
+        @INPUTS
+            config: a dict or object of settings overriding the environment (see src.config.Config)
+
+        return the configured flask application
+    """
     app = Flask(__name__)
+    app.config.from_object(Config())
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    validate_json_backend(app.config)
+    rate_limiter.init_app(app)
     setup_db(app)
-    CORS(app)
+    CORS(app, expose_headers=EXPOSED_HEADERS)
     ma.init_app(app)
+    compression.init_app(app)
+    menu_cache.init_app(app)
+    idempotency.init_app(app)
+    changes.init_app(app)
+    instrumentation.init_app(app)
 
     register_errorhandlers(app)
     app.register_blueprint(drink_api)
@@ -35,31 +77,202 @@ def create_app():
 # db_drop_and_create_all()
 
 
+def get_listing_args():
+    """
+    get_listing_args()
+        it should parse the optional listing query arguments
+            limit: page size, capped at app.config["DRINKS_MAX_LIMIT"] (default 100)
+            cursor: the next_cursor of the previous page, drinks with a greater id are returned
+            fields: comma separated subset of id,title,recipe to select and return
+            total: "false" to skip counting all drinks
+            stream: "true" to stream the whole listing (see stream_drinks),
+                the default is app.config["DRINKS_STREAMING"], it cannot be combined with limit
+            q: words matching the start of title, ingredient name or color words
+            ingredient: words matching the start of ingredient name words, may be repeated
+                searches cannot be streamed
+        it should abort 400 on invalid values
+        return a dict of listing options
+    """
+    args = request.args
+    try:
+        limit = int(args["limit"]) if "limit" in args else None
+        cursor = int(args["cursor"]) if "cursor" in args else None
+    except ValueError:
+        abort(400)
+    if (limit is not None and limit < 1) or (cursor is not None and cursor < 0):
+        abort(400)
+    if limit is not None:
+        limit = min(limit, current_app.config.get("DRINKS_MAX_LIMIT", 100))
+
+    fields = None
+    if args.get("fields"):
+        requested = {field.strip() for field in args["fields"].split(",")}
+        if not requested <= set(DRINK_FIELDS):
+            abort(400)
+        # one canonical tuple per set of fields, it keys the compiled projections
+        fields = tuple(field for field in DRINK_FIELDS if field in requested)
+
+    total = args.get("total", "true").lower() not in ("false", "0", "no")
+
+    if "stream" in args:
+        stream = args["stream"].lower() not in ("false", "0", "no")
+        if stream and limit is not None:
+            abort(400)
+    else:
+        stream = limit is None and current_app.config.get("DRINKS_STREAMING", False)
+
+    q = args.get("q", "").strip() or None
+    ingredients = tuple(
+        ingredient.strip()
+        for ingredient in args.getlist("ingredient")
+        if ingredient.strip()
+    )
+    if q or ingredients:
+        if "stream" in args and stream:
+            abort(400)
+        stream = False
+
+    return dict(
+        limit=limit,
+        cursor=cursor,
+        fields=fields,
+        total=total,
+        stream=stream,
+        q=q,
+        ingredients=ingredients,
+    )
+
+
+def render_drinks(
+    schema_class, limit=None, cursor=None, fields=None, total=True, ids=None
+):
+    """
+    render_drinks(schema_class, limit=None, cursor=None, fields=None, total=True, ids=None)
+        it should select one page of drinks ordered by id, using cursor as the keyset
+        it should only select the drinks in ids, the sorted search results, when given
+        it should select only the needed columns and dump them with the schema's projection
+        it should link the next page in "next_cursor" and a Link header when there is one
+        return the json response
+    """
+    projection = get_projection(schema_class, fields)
+    rows = get_drink_rows(
+        projection.columns, limit=limit + 1 if limit else None, after=cursor, ids=ids
+    )
+    has_next = limit is not None and len(rows) > limit
+    rows = rows[:limit]
+
+    with timed("dump"):
+        drinks = projection.dump(rows)
+    body = dict(drinks=drinks, success=True)
+    if total and ids is not None:
+        body["total"] = len(ids)
+    elif total:
+        body["total"] = count_drinks() if limit or cursor else len(rows)
+    if has_next:
+        body["next_cursor"] = str(rows[-1][0])
+
+    with timed("jsonify"):
+        response = json_response(body)
+    if has_next:
+        next_url = url_for(
+            request.endpoint,
+            **dict(request.args.to_dict(), cursor=body["next_cursor"]),
+            _external=True,
+        )
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return response
+
+
+def stream_drinks(schema_class, cursor=None, fields=None, total=True):
+    """
+    stream_drinks(schema_class, cursor=None, fields=None, total=True)
+        it should write the same json body as render_drinks without a limit,
+        one batch of app.config["DRINKS_STREAM_BATCH_SIZE"] drinks (default 500) at a time
+        so memory does not grow with the catalog and the first bytes leave before the query
+        return the streamed json response
+    """
+    projection = get_projection(schema_class, fields)
+    batch_size = current_app.config.get("DRINKS_STREAM_BATCH_SIZE", 500)
+    dumps = get_json_dumps()
+
+    def generate():
+        # keys in jsonify's sorted order: drinks, success, total
+        yield b'{"drinks":['
+        count = 0
+        for rows in iter_drink_batches(
+            projection.columns, after=cursor, batch_size=batch_size
+        ):
+            # one encoder call per batch, without the list brackets
+            chunk = dumps(projection.dump(rows))[1:-1]
+            yield b"," + chunk if count else chunk
+            count += len(rows)
+
+        tail = b'],"success":true'
+        if total:
+            tail += b',"total":%d' % (count_drinks() if cursor else count)
+        yield tail + b"}\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=current_app.config["JSONIFY_MIMETYPE"],
+    )
+
+
+def list_drinks(schema_class, cache_name):
+    """
+    list_drinks(schema_class, cache_name)
+        it should stream the listing when asked to (see stream_drinks)
+        it should answer searches from the search index (see src.services.search_drinks)
+        it should serve the full listing from the menu cache
+        it should render paginated or projected listings per request
+    """
+    options = get_listing_args()
+    q, ingredients = options.pop("q"), options.pop("ingredients")
+    if q or ingredients:
+        del options["stream"]
+        return render_drinks(schema_class, ids=search_drinks(q, ingredients), **options)
+
+    if options.pop("stream"):
+        del options["limit"]
+        return stream_drinks(schema_class, **options)
+
+    if not request.args:
+        return menu_cache.response(
+            cache_name, lambda: render_drinks(schema_class, **options)
+        )
+
+    return render_drinks(schema_class, **options)
+
+
 @drink_api.route("/drinks", methods=["GET"])
+@conditional_get
 def drinks_list():
     """
     GET /drinks
         it should be a public endpoint
         it should contain only the drink.short() data representation
-    returns status code 200 and json {"success": True, "drinks": drinks} where drinks is the list of drinks
+        it should accept the limit, cursor, fields, total, q and ingredient query arguments (see get_listing_args)
+    returns status code 200 and json {"success": True, "drinks": drinks, "total": total} where drinks is the list of drinks
+        and "next_cursor" when more drinks follow
         or appropriate status code indicating reason for failure
     """
-    queryset = get_all_drinks()
-    return jsonify(drinks=drinks_brief_schema.dump(queryset), success=True)
+    return list_drinks(DrinkBriefSchema, "drinks")
 
 
 @drink_api.route("/drinks-detail")
 @requires_auth(Permissions.GET_DRINK_DETAILS)
+@conditional_get
 def drinks_list_detail():
     """
     GET /drinks-detail
         it should require the 'get:drinks-detail' permission
         it should contain the drink.long() data representation
-    returns status code 200 and json {"success": True, "drinks": drinks} where drinks is the list of drinks
+        it should accept the limit, cursor, fields, total, q and ingredient query arguments (see get_listing_args)
+    returns status code 200 and json {"success": True, "drinks": drinks, "total": total} where drinks is the list of drinks
+        and "next_cursor" when more drinks follow
         or appropriate status code indicating reason for failure
     """
-    queryset = get_all_drinks()
-    return jsonify(drinks=drinks_schema.dump(queryset), success=True)
+    return list_drinks(DrinkSchema, "drinks-detail")
 
 
 @drink_api.route("/drinks/<int:drink_id>", methods=["GET"])
@@ -69,101 +282,428 @@ def drinks_detail(drink_id):
     GET /drinks/<id>
         where <id> is the existing model id
         it should respond with a 404 error if <id> is not found
+        it should send the drink's version as its ETag, for If-Match on PATCH and DELETE
+        it should respond with a 304 if the If-None-Match header matches the ETag
+            without querying the database, the ETag is cached per menu version
     returns status code 200 and json {"success": True, "drink": drink}
     """
+    # writes bump the menu version, so an ETag cached for this version is current
+    etag_name = f"drink-etag:{drink_id}"
+    if request.if_none_match:
+        etag = menu_cache.get_or_render(etag_name, lambda: render_drink_etag(drink_id))
+        etag = etag.decode() if isinstance(etag, bytes) else etag
+        matched = etag and matching_etag(request.if_none_match, etag)
+        if matched:
+            response = current_app.response_class(status=304)
+            response.set_etag(matched)
+            return cache_control(response)
+
     queryset = get_drink(drink_id)
     if not queryset:
         abort(404)
 
-    return jsonify(drink=drink_schema.dump(queryset), success=True)
+    etag = drink_etag(queryset)
+    menu_cache.get_or_render(etag_name, lambda: etag.encode())
+    with timed("dump"):
+        drink = drink_schema.dump(queryset)
+    with timed("jsonify"):
+        response = jsonify(drink=drink, success=True)
+
+    response.set_etag(etag)
+    return cache_control(response)
+
+
+def render_drink_etag(drink_id):
+    drink = get_drink(drink_id)
+    return drink_etag(drink).encode() if drink else b""
+
+
+def set_drink_etag(response, drink):
+    """
+    set_drink_etag(response, drink)
+        sets the Drink-ETag header of a write response: the ETag of GET /drinks/<id>,
+        to send back in If-Match. It is not the response's own ETag, the bodies differ
+        return the response
+    """
+    response.headers[DRINK_ETAG_HEADER] = quote_etag(drink_etag(drink))
+    return response
+
+
+def check_if_match(drink):
+    """
+    check_if_match(drink)
+        it should abort 412 if the If-Match header does not match the drink's ETag,
+            in any content-coding (a compressed GET sends it suffixed, see encoded_etag)
+    """
+    if request.if_match and not matching_etag(request.if_match, drink_etag(drink)):
+        abort(412)
 
 
 @drink_api.route("/drinks", methods=["POST"])
 @requires_auth(Permissions.POST_DRINKS)
+@idempotent
 def drinks_create():
     """
     POST /drinks
         it should create a new row in the drinks table
         it should require the 'post:drinks' permission
         it should contain the drink.long() data representation
+        it should respond with a 409 error if the title already exists
+        it should replay the first response of a request retried with its Idempotency-Key
+        it should send the drink's ETag in the Drink-ETag header
     returns status code 200 and json {"success": True, "drinks": drink} where drink an array containing only the newly created drink
         or appropriate status code indicating reason for failure
     """
-    drink_json = request.get_json()
-    errors = drink_schema.validate(drink_json)
-    if errors:
+    try:
+        drink_json = drink_schema.load(request.get_json())
+    except ValidationError:
         abort(422)
 
-    drink_json = drink_schema.load(drink_json)
-    drink_id = add_drink(drink_json)
+    try:
+        drink = add_drink(drink_json)
+    except exc.IntegrityError:
+        abort(409)
 
-    queryset = get_drink(drink_id)
-    return jsonify(drinks=drinks_schema.dump([queryset]), success=True)
+    response = jsonify(drinks=drinks_schema.dump([drink]), success=True)
+    return set_drink_etag(response, drink)
 
 
 @drink_api.route("/drinks/<drink_id>", methods=["PATCH"])
 @requires_auth(Permissions.PATCH_DRINKS)
+@idempotent
 def drinks_update(drink_id):
     """
     PATCH /drinks/<id>
         where <id> is the existing model id
         it should respond with a 404 error if <id> is not found
         it should update the corresponding row for <id>
+        it should respond with a 422 error if the body is invalid or empty
+        it should keep the drink and menu versions, and publish no change,
+            when the values equal the stored ones
+        it should respond with a 412 error if the If-Match header is not the drink's ETag
+        it should respond with a 409 error if the drink changed concurrently or the title exists
+        it should replay the first response of a request retried with its Idempotency-Key
         it should require the 'patch:drinks' permission
         it should contain the drink.long() data representation
+        it should send the drink's new ETag in the Drink-ETag header
     returns status code 200 and json {"success": True, "drinks": drink} where drink an array containing only the updated drink
         or appropriate status code indicating reason for failure
     """
-    queryset = get_drink(drink_id)
+    queryset = get_drink(drink_id, for_update=True)
     if not queryset:
         abort(404)
+    check_if_match(queryset)
 
-    drink_json = request.get_json()
-    errors = drink_schema.validate(drink_json, partial=True)
-    if errors:
+    try:
+        drink_json = drink_schema.load(request.get_json(), partial=True)
+    except ValidationError:
+        abort(422)
+    if not drink_json:
         abort(422)
 
-    drink_json = drink_schema.load(drink_json, partial=True)
-    updated_queryset = update_drink(queryset, drink_json)
+    try:
+        updated_queryset = update_drink(queryset, drink_json)
+    except (exc.IntegrityError, StaleDataError):
+        abort(409)
 
-    return jsonify(drinks=drinks_schema.dump([updated_queryset]), success=True)
+    response = jsonify(drinks=drinks_schema.dump([updated_queryset]), success=True)
+    return set_drink_etag(response, updated_queryset)
 
 
 @drink_api.route("/drinks/<int:drink_id>", methods=["DELETE"])
 @requires_auth(Permissions.DELETE_DRINKS)
+@idempotent
 def drinks_delete(drink_id):
     """
     DELETE /drinks/<id>
         where <id> is the existing model id
         it should respond with a 404 error if <id> is not found
         it should delete the corresponding row for <id>
+        it should respond with a 412 error if the If-Match header is not the drink's ETag
+        it should respond with a 409 error if the drink changed concurrently
+        it should replay the first response of a request retried with its Idempotency-Key
         it should require the 'delete:drinks' permission
     returns status code 200 and json {"success": True, "delete": id} where id is the id of the deleted record
         or appropriate status code indicating reason for failure
     """
-    queryset = get_drink(drink_id)
+    queryset = get_drink(drink_id, for_update=True)
     if not queryset:
         abort(404)
+    check_if_match(queryset)
 
-    delete_drink(queryset)
+    try:
+        delete_drink(queryset)
+    except StaleDataError:
+        abort(409)
     return jsonify(delete=drink_id, success=True)
 
 
-# Error Handling
-def register_errorhandlers(app):
-    def return_error_message(status_code, error_message, _):
+def get_bulk_payload():
+    """
+    get_bulk_payload()
+        it should read a json array, or one json object per line for application/x-ndjson
+        it should abort 422 if the body is neither
+        return the list of drinks
+    """
+    if request.mimetype == "application/x-ndjson":
+        try:
+            return [
+                json.loads(line)
+                for line in request.get_data(as_text=True).splitlines()
+                if line.strip()
+            ]
+        except ValueError:
+            abort(422)
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, list):
+        abort(422)
+    return payload
+
+
+@drink_api.route("/drinks/bulk", methods=["POST"])
+@requires_auth(Permissions.POST_DRINKS)
+def drinks_bulk_create():
+    """
+    POST /drinks/bulk
+        it should require the 'post:drinks' permission
+        it should accept a json array of drinks (or application/x-ndjson, one drink per line)
+        it should validate every drink in one pass and insert all of them in one transaction
+        it should respond with a 422 error listing the errors per item index if any drink is invalid
+            duplicate titles, in the batch or in the database, are reported per item too
+    returns status code 200 and json {"success": True, "created": count}
+        or appropriate status code indicating reason for failure
+    """
+    drinks_json = get_bulk_payload()
+    if not drinks_json:
+        abort(422)
+
+    payload = drinks_json
+    try:
+        drinks_json = drinks_schema.load(payload)
+        errors = {}
+    except ValidationError as error:
+        errors = error.messages
+
+    # the titles are checked on every item whose title loaded, so a client learns
+    # about its duplicates along with the other errors of the batch
+    titles = {
+        index: item["title"]
+        for index, item in enumerate(payload)
+        if isinstance(item, dict)
+        and isinstance(item.get("title"), str)
+        and "title" not in errors.get(index, {})
+    }
+    existing_titles = get_existing_titles(set(titles.values()))
+    seen_titles = set()
+    for index, title in titles.items():
+        if title in existing_titles or title in seen_titles:
+            errors.setdefault(index, {})["title"] = ["title already exists"]
+        seen_titles.add(title)
+
+    if errors:
         return (
-            jsonify(success=False, error=status_code, message=error_message),
-            status_code,
+            jsonify(success=False, error=422, message="unprocessable", errors=errors),
+            422,
+        )
+
+    try:
+        created = add_drinks(drinks_json)
+    except exc.IntegrityError:
+        abort(409)
+    return jsonify(created=created, success=True)
+
+
+@drink_api.route("/drinks/export", methods=["GET"])
+@requires_auth(Permissions.GET_DRINK_DETAILS)
+def drinks_export():
+    """
+    GET /drinks/export
+        it should require the 'get:drinks-detail' permission
+        it should stream every drink in the drink.long() data representation, one json object per line
+        it should read the drinks in batches instead of loading the table at once
+    returns status code 200 and an application/x-ndjson body
+    """
+
+    projection = get_projection(DrinkSchema)
+    dumps = get_json_dumps()
+
+    def generate():
+        for rows in iter_drink_batches(projection.columns):
+            yield b"".join(dumps(drink) + b"\n" for drink in projection.dump(rows))
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+def get_changes_args():
+    """
+    get_changes_args()
+        it should parse the change feed arguments
+            since: the last menu version the client has seen, from the query or the
+                Last-Event-ID header, defaults to the current version
+            timeout: seconds to wait for a change, capped at app.config["CHANGES_POLL_TIMEOUT"]
+        it should abort 400 on invalid values
+        return (since, timeout)
+    """
+    max_timeout = current_app.config.get("CHANGES_POLL_TIMEOUT", 25)
+    since = request.args.get("since", request.headers.get("Last-Event-ID"))
+    try:
+        since = menu_cache.version if since is None else int(since)
+        timeout = float(request.args.get("timeout", max_timeout))
+    except ValueError:
+        abort(400)
+    if since < 0 or timeout < 0:
+        abort(400)
+    return since, min(timeout, max_timeout)
+
+
+def is_stale(since):
+    """
+    is_stale(since)
+        return True if the changes after since cannot be replayed and the menu must be reloaded
+            since is ahead of the menu (it was reset) or older than every event kept
+    """
+    version = menu_cache.version
+    if since > version:
+        return True
+    events, reset = changes.since(since)
+    return reset or (since < version and not events)
+
+
+def get_resume_version():
+    """
+    get_resume_version()
+        return the version a client reloading the menu should follow the changes from
+    """
+    return max(changes.latest or 0, menu_cache.version)
+
+
+def follow_changes():
+    """
+    follow_changes()
+        return the callable giving back the slot taken to wait for changes (see ChangeFeed.follow)
+        it should raise ServiceUnavailable with Retry-After when CHANGES_MAX_FOLLOWERS
+        requests of this process already wait, instead of tying up one more thread
+    """
+    release = changes.follow()
+    if release is None:
+        raise ServiceUnavailable(
+            retry_after=current_app.config.get("CHANGES_RETRY_AFTER", 5)
         )
+    return release
+
+
+def stream_changes(since):
+    """
+    stream_changes(since)
+        return a text/event-stream response of the changes after since
+            each change is sent with its version as id and its type as event name
+            a reset event, carrying the version to resume from, asks the client to reload the menu
+            a comment is sent every CHANGES_HEARTBEAT seconds without changes
+            the stream ends after CHANGES_STREAM_TIMEOUT seconds, clients reconnect with Last-Event-ID
+        it should hold one of the feed slots while open (see follow_changes)
+    """
+    heartbeat = current_app.config.get("CHANGES_HEARTBEAT", 15)
+    deadline = time.monotonic() + current_app.config.get("CHANGES_STREAM_TIMEOUT", 300)
+    dumps = get_json_dumps()
+    stale = is_stale(since)
+
+    def reset():
+        version = get_resume_version()
+        return b"event: reset\ndata: %s\n\n" % dumps(dict(version=version))
+
+    def generate():
+        version = since
+        if stale:
+            yield reset()
+            return
+
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            events, stale_version = changes.wait(version, min(heartbeat, remaining))
+            if stale_version:
+                yield reset()
+                return
+            if not events:
+                yield b": keep-alive\n\n"
+            for event in events:
+                yield b"id: %d\nevent: %s\ndata: %s\n\n" % (
+                    event["version"],
+                    event["type"].encode(),
+                    dumps(event),
+                )
+                version = event["version"]
+
+    release = None if stale else follow_changes()
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    if release is not None:
+        response.call_on_close(release)
+    return response
+
+
+@drink_api.route("/drinks/changes", methods=["GET"])
+def drinks_changes():
+    """
+    GET /drinks/changes
+        it should be a public endpoint
+        it should return the menu changes (created, updated, deleted, reloaded) after the since version
+            each change carries its menu version and the drink.short() data representation
+        it should answer with server-sent events when the client accepts text/event-stream (see stream_changes)
+        it should otherwise wait up to timeout seconds for a change (long-poll)
+        it should answer 503 with Retry-After when too many requests wait already (see follow_changes)
+    returns status code 200 and json {"success": True, "version": version, "changes": changes, "reset": reset}
+        where version is the version to poll from next and reset asks the client to reload the menu
+        or appropriate status code indicating reason for failure
+    """
+    since, timeout = get_changes_args()
+    if request.accept_mimetypes.best == "text/event-stream":
+        return stream_changes(since)
+
+    if is_stale(since):
+        events, reset = [], True
+    elif not timeout:
+        events, reset = changes.since(since)
+    else:
+        release = follow_changes()
+        try:
+            events, reset = changes.wait(since, timeout)
+        finally:
+            release()
+
+    version = events[-1]["version"] if events else since
+    if reset:
+        version = get_resume_version()
+    response = json_response(
+        dict(changes=events, reset=reset, success=True, version=version)
+    )
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+# Error Handling
+def register_errorhandlers(app):
+    def return_error_message(status_code, error_message, error):
+        response = jsonify(success=False, error=status_code, message=error_message)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            response.headers["Retry-After"] = str(retry_after)
+        return response, status_code
 
     for status_code, error_message in [
         (400, "bad request"),
         (401, "unauthorized"),
         (404, "resource not found"),
         (403, "insufficient permissions"),
+        (409, "conflict"),
+        (412, "precondition failed"),
         (422, "unprocessable"),
+        (429, "too many requests"),
         (500, "server fault"),
+        (503, "service unavailable"),
     ]:
         handler_func = partial(return_error_message, status_code, error_message)
         app.register_error_handler(status_code, handler_func)
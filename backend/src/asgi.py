@@ -0,0 +1,146 @@
+import asyncio
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from src.api import create_app
+
+
+class AsgiAdapter:
+    """
+    AsgiAdapter(wsgi_app, threads=32)
+    serves a WSGI application to an ASGI server (e.g. uvicorn)
+        wsgi_app: the flask application
+        threads: size of the thread pool running the WSGI application
+
+    connections are accepted and read by the event loop, only the application
+    code runs in the pool, so idle and slow clients do not hold a worker thread
+    response bodies are forwarded chunk by chunk, streamed responses stay streamed
+    """
+
+    def __init__(self, wsgi_app, threads=32):
+        self.wsgi_app = wsgi_app
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="asgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+        if scope["type"] != "http":
+            raise ValueError(f"unsupported scope type {scope['type']}")
+
+        body = io.BytesIO()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body.write(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+
+        loop = asyncio.get_running_loop()
+        environ = build_environ(scope, body)
+        # chunked uploads carry no Content-Length, werkzeug would read nothing
+        environ.setdefault("CONTENT_LENGTH", str(body.getbuffer().nbytes))
+        await loop.run_in_executor(
+            self.executor, self.run_wsgi_app, environ, loop, send
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send(dict(type="lifespan.startup.complete"))
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send(dict(type="lifespan.shutdown.complete"))
+                return
+
+    def run_wsgi_app(self, environ, loop, send):
+        """
+        run_wsgi_app(environ, loop, send)
+            runs in a pool thread, hands every message back to the event loop
+        """
+        response_start = {}
+
+        def sync_send(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            response_start.update(
+                type="http.response.start",
+                status=int(status.split(" ", 1)[0]),
+                headers=[
+                    (name.lower().encode("latin1"), value.encode("latin1"))
+                    for name, value in headers
+                ],
+            )
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            started = False
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not started:
+                    sync_send(response_start)
+                    started = True
+                sync_send(
+                    {"type": "http.response.body", "body": chunk, "more_body": True}
+                )
+            if not started:
+                sync_send(response_start)
+            sync_send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+
+
+def build_environ(scope, body):
+    """
+    build_environ(scope, body)
+        return the WSGI environ for an ASGI http scope and its request body
+    """
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = map(str, scope["client"])
+
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1").upper().replace("-", "_")
+        value = value.decode("latin1")
+        if name == "CONTENT_TYPE" or name == "CONTENT_LENGTH":
+            key = name
+        else:
+            key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def create_asgi_app(config=None, threads=None):
+    """
+    create_asgi_app(config=None, threads=None)
+        builds the flask application with create_app(config) and wraps it for ASGI servers
+            threads defaults to app.config["ASGI_THREADS"] (32)
+        run with: uvicorn --factory src.asgi:create_asgi_app
+    """
+    app = create_app(config)
+    return AsgiAdapter(app, threads=threads or app.config.get("ASGI_THREADS", 32))
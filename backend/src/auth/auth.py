@@ -1,15 +1,25 @@
 import base64
+import binascii
 import json
+import threading
+import time
+from collections import namedtuple
 from functools import wraps
 from os import getenv
 from urllib.request import urlopen
 
-import requests
-from dotenv import load_dotenv
 from flask import _request_ctx_stack, abort, request
-from jose import jwt
 
-load_dotenv()
+from ..config import load_environment
+from ..instrumentation import timed
+from ..ratelimit import rate_limiter
+from .cache import TokenCache
+from .jwks import JWKSKeyStore, JWKSUnavailable
+
+# sized from AUTH0_TOKEN_CACHE_SIZE when the settings are first read (see get_auth_settings)
+token_cache = TokenCache(maxsize=None)
+
+_payload_key = "coffee_shop.jwt_payload"
 
 # AuthError Exception
 class AuthError(Exception):
@@ -51,7 +61,7 @@ def check_permissions(permission, payload):
     check_permissions(permission, payload)
         @INPUTS
             permission: string permission (i.e. 'post:drink')
-            payload: decoded jwt payload
+            payload: decoded jwt payload, permissions may be a list or a frozenset
 
         it should raise an AuthError if permissions are not included in the payload
         it should raise an AuthError if the requested permission string is not in the payload permissions array
@@ -67,6 +77,124 @@ def check_permissions(permission, payload):
     return True
 
 
+# Auth Settings
+AuthSettings = namedtuple(
+    "AuthSettings",
+    ["domain", "audience", "algorithm", "jwks_url", "jwks_ttl", "jwks_min_refresh"],
+)
+
+_settings = None
+# guards the settings and the key store
+_key_store_lock = threading.Lock()
+
+
+def get_auth_settings():
+    """
+    get_auth_settings()
+        it should read the AUTH0_* variables once, from the environment and the .env file
+            AUTH0_JWKS_URL overrides the default {AUTH0_DOMAIN}/.well-known/jwks.json
+            AUTH0_JWKS_TTL sets the background refresh interval in seconds
+            AUTH0_JWKS_MIN_REFRESH sets the minimum seconds between kid-miss refetches
+            AUTH0_TOKEN_CACHE_SIZE sizes token_cache, unless it was sized already
+        it should read them again after reset_key_store
+        return the AuthSettings
+    """
+    global _settings
+
+    settings = _settings
+    if settings is not None:
+        return settings
+
+    with _key_store_lock:
+        if _settings is None:
+            load_environment()
+            domain = getenv("AUTH0_DOMAIN")
+            _settings = AuthSettings(
+                domain=domain,
+                audience=getenv("AUTH0_API_AUDIENCE"),
+                algorithm=getenv("AUTH0_JWT_ALGORITHM"),
+                jwks_url=getenv("AUTH0_JWKS_URL", f"{domain}/.well-known/jwks.json"),
+                jwks_ttl=float(getenv("AUTH0_JWKS_TTL", 600)),
+                jwks_min_refresh=float(getenv("AUTH0_JWKS_MIN_REFRESH", 30)),
+            )
+            if token_cache.maxsize is None:
+                token_cache.maxsize = int(getenv("AUTH0_TOKEN_CACHE_SIZE", 1024))
+        return _settings
+
+
+# JWKS Key Store
+_key_store = None
+
+
+def get_key_store():
+    """
+    get_key_store()
+        it should build the process-wide JWKS key store on first use, from get_auth_settings
+        return the shared key store
+    """
+    global _key_store
+
+    settings = get_auth_settings()
+    with _key_store_lock:
+        if _key_store is None:
+            _key_store = JWKSKeyStore(
+                settings.jwks_url,
+                ttl=settings.jwks_ttl,
+                min_refresh_interval=settings.jwks_min_refresh,
+            )
+        return _key_store
+
+
+def reset_key_store():
+    """
+    reset_key_store()
+        stops and discards the shared key store and the auth settings,
+        both are read again on next use
+    """
+    global _key_store, _settings
+
+    with _key_store_lock:
+        if _key_store is not None:
+            _key_store.close()
+        _key_store = None
+        _settings = None
+
+
+def b64url_decode(segment):
+    """
+    b64url_decode(segment)
+        return the bytes of an unpadded base64url segment of a jwt
+    """
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def validate_claims(claims, audience, issuer, leeway=0):
+    """
+    validate_claims(claims, audience, issuer, leeway=0)
+        it should raise an AuthError if the token expired, or is not valid yet
+        it should raise an AuthError if the audience or the issuer is not the expected one
+    """
+    now = time.time()
+    try:
+        if "exp" in claims and float(claims["exp"]) <= now - leeway:
+            raise AuthError("expired token", 401)
+        if "nbf" in claims and float(claims["nbf"]) > now + leeway:
+            raise AuthError("invalid claims", 401)
+    except (TypeError, ValueError):
+        raise AuthError("invalid claims", 401)
+
+    token_audience = claims.get("aud")
+    if isinstance(token_audience, str):
+        token_audience = [token_audience]
+    if audience and (
+        not isinstance(token_audience, list) or audience not in token_audience
+    ):
+        raise AuthError("invalid claims", 401)
+
+    if issuer and claims.get("iss") != issuer:
+        raise AuthError("invalid claims", 401)
+
+
 def verify_decode_jwt(token):
     """
     verify_decode_jwt(token)
@@ -74,64 +202,84 @@ def verify_decode_jwt(token):
             token: a json web token (string)
 
         it should be an Auth0 token with key id (kid)
-        it should verify the token using Auth0 /.well-known/jwks.json
-        it should decode the payload from the token
+        it should parse the header and the claims once, as unpadded base64url
+        it should verify the signature with the public key of the kid (built once, see get_key_store)
         it should validate the claims
         return the decoded payload
     """
-    auth_domain = getenv("AUTH0_DOMAIN")
-    auth_alg = getenv("AUTH0_JWT_ALGORITHM")
-    auth_audience = getenv("AUTH0_API_AUDIENCE")
+    settings = get_auth_settings()
+    auth_alg = settings.algorithm
 
     # ensure token matches pattern header.payload.signatured
     jwt_parts = token.split(".")
     if len(jwt_parts) != 3:
         raise AuthError("header malformed", 401)
 
-    header, payload, signature = jwt_parts
-    header = base64.b64decode(header)
-    header = json.loads(header)
+    header_segment, payload_segment, signature_segment = jwt_parts
+    try:
+        header = json.loads(b64url_decode(header_segment))
+        payload = json.loads(b64url_decode(payload_segment))
+        signature = b64url_decode(signature_segment)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise AuthError("header malformed", 401)
+    if not isinstance(header, dict) or not isinstance(payload, dict):
+        raise AuthError("header malformed", 401)
 
     # ensure kid is in the header
     if "kid" not in header:
         raise AuthError("Auth token not authentic", 401)
     kid = header["kid"]
 
-    # get jwt key store
+    # match rsa public key to kid
     try:
-        jwks = requests.get(f"{auth_domain}/.well-known/jwks.json")
-        jwks = jwks.json().get("keys", None)
-        assert jwks
-    except Exception:
+        public_key = get_key_store().get_public_key(kid, auth_alg)
+    except JWKSUnavailable:
         raise AuthError("could not connect to the sever", 500)
-
-    # match rsa public key to kid
-    matching_rsa = None
-    for key in jwks:
-        if key.get("kid", "") == kid:
-            matching_rsa = key
-    if not matching_rsa:
+    if public_key is None or header.get("alg") != auth_alg:
         raise AuthError("token not authentic", 401)
 
-    # decode jwt
+    signed = f"{header_segment}.{payload_segment}".encode()
     try:
-        payload = jwt.decode(
-            token,
-            matching_rsa,
-            algorithms=[auth_alg],
-            audience=auth_audience,
-            issuer=f"{auth_domain}/",
-        )
-    except jwt.ExpiredSignatureError:
-        raise AuthError("expired token", 401)
-    except jwt.JWTClaimsError:
-        raise AuthError("invalid claims", 401)
+        authentic = public_key.verify(signed, signature)
     except Exception:
-        raise AuthError("header malformed", 401)
+        authentic = False
+    if not authentic:
+        raise AuthError("token not authentic", 401)
 
+    validate_claims(payload, settings.audience, f"{settings.domain}/")
     return payload
 
 
+def decode_jwt(token):
+    """
+    decode_jwt(token)
+        @INPUTS
+            token: a json web token (string)
+
+        it should return the cached payload if the token was verified before and has not expired
+        it should use the verify_decode_jwt method otherwise and cache the result
+        return the decoded payload with its permissions as a frozenset
+    """
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = verify_decode_jwt(token)
+        if isinstance(payload, dict) and isinstance(
+            payload.get("permissions"), (list, tuple)
+        ):
+            payload = dict(payload, permissions=frozenset(payload["permissions"]))
+        token_cache.set(token, payload)
+
+    return payload
+
+
+def current_payload():
+    """
+    current_payload()
+        return the decoded jwt payload of the current request, None when it was not authenticated
+    """
+    return request.environ.get(_payload_key)
+
+
 def requires_auth(permission=""):
     """
     @requires_auth(permission) decorator
@@ -139,20 +287,28 @@ def requires_auth(permission=""):
             permission: string permission (i.e. 'post:drink')
 
         it should use the get_token_auth_header method to get the token
-        it should use the verify_decode_jwt method to decode the jwt
+        it should use the decode_jwt method to decode the jwt (verified once per token)
         it should use the check_permissions method validate claims and check the requested permission
+        it should take a token from the rate limit budget of the jwt sub for the permission
+            and refuse clients with too many failed authentications before verifying (see src.ratelimit)
         return the decorator which passes the decoded payload to the decorated method
     """
 
     def requires_auth_decorator(f):
         @wraps(f)
         def wrapper(*args, **kwargs):
+            rate_limiter.check_auth_failures()
             try:
-                token = get_token_auth_header()
-                payload = verify_decode_jwt(token)
-                check_permissions(permission, payload)
+                with timed("auth"):
+                    token = get_token_auth_header()
+                    payload = decode_jwt(token)
+                    check_permissions(permission, payload)
             except AuthError as exec:
+                if exec.status_code == 401:
+                    rate_limiter.record_auth_failure()
                 abort(exec.status_code)
+            rate_limiter.limit_subject(payload, permission)
+            request.environ[_payload_key] = payload
             return f(*args, **kwargs)
 
         return wrapper
@@ -0,0 +1,97 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    TokenCache(maxsize)
+    a bounded LRU cache of verified jwt payloads, keyed by the sha256 digest of the token
+        maxsize: maximum number of payloads kept, 0 (or None, until it is sized) disables the cache
+
+    it should only keep payloads that carry a numeric exp claim
+    it should drop an entry once its exp claim has passed
+    it should evict the least recently used entry when full
+    """
+
+    def __init__(self, maxsize=1024, clock=time.time):
+        self.maxsize = maxsize
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token):
+        """
+        get(token)
+            return the cached payload for token or None
+        """
+        if not token or not self.maxsize:
+            return None
+
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, payload = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                self._expirations += 1
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return payload
+
+    def set(self, token, payload):
+        """
+        set(token, payload)
+            stores payload until its exp claim
+            return True if the payload was cached
+        """
+        expires_at = payload.get("exp") if isinstance(payload, dict) else None
+        if not token or not self.maxsize or not isinstance(expires_at, (int, float)):
+            return False
+        if expires_at <= self.clock():
+            return False
+
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        stats()
+            return a dict of hits, misses, evictions, expirations, size and maxsize
+        """
+        with self._lock:
+            return dict(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries),
+                maxsize=self.maxsize,
+            )
@@ -0,0 +1,164 @@
+import json
+import threading
+import time
+from urllib.request import urlopen
+
+
+class JWKSUnavailable(Exception):
+    """
+    JWKSUnavailable Exception
+    raised when no key set has ever been fetched successfully
+    """
+
+
+class JWKSKeyStore:
+    """
+    JWKSKeyStore(url)
+    an in-process cache of a JSON Web Key Set, indexed by key id (kid)
+        url: any url urlopen understands (https://, http://, file://)
+        ttl: seconds between background refreshes
+        min_refresh_interval: minimum seconds between two fetches triggered by an unknown kid
+        timeout: seconds to wait for the key set endpoint
+
+    it should fetch the key set once and serve every lookup from memory
+    it should refresh the key set in the background every ttl seconds
+    it should refetch on an unknown kid, at most once per min_refresh_interval
+    it should keep serving the last good key set if a fetch fails
+    it should construct each public key once and reuse it (see get_public_key)
+    """
+
+    def __init__(
+        self, url, ttl=600, min_refresh_interval=30, timeout=5, background=True
+    ):
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.background = background
+
+        self._keys = {}
+        self._public_keys = {}
+        self._lock = threading.Lock()
+        self._fetched_at = None
+        self._attempted_at = None
+        self._timer = None
+
+    @property
+    def keys(self):
+        return dict(self._keys)
+
+    @property
+    def is_stale(self):
+        if self._fetched_at is None:
+            return True
+        return time.monotonic() - self._fetched_at >= self.ttl
+
+    def get_key(self, kid):
+        """
+        get_key(kid)
+            it should load the key set on first use
+            it should refetch (rate limited) when kid is unknown
+            it should raise JWKSUnavailable if no key set was ever loaded
+            return the matching jwk dict or None
+        """
+        if self._fetched_at is None or (not self.background and self.is_stale):
+            self.refresh()
+
+        key = self._keys.get(kid)
+        if key is None and self.refresh():
+            key = self._keys.get(kid)
+
+        if key is None and self._fetched_at is None:
+            raise JWKSUnavailable(self.url)
+        return key
+
+    def get_public_key(self, kid, algorithm):
+        """
+        get_public_key(kid, algorithm)
+            like get_key, but return the key constructed for algorithm, ready to verify signatures
+            it should construct it once per key set and serve it from memory afterwards
+            it should import python-jose (and its crypto backend) on the first construction only
+            return None if kid is unknown or its key cannot be used with algorithm
+        """
+        key = self.get_key(kid)
+        if key is None:
+            return None
+
+        # entries remember the jwk they were built from, a refreshed key set rebuilds them
+        source, public_key = self._public_keys.get((kid, algorithm), (None, None))
+        if source is not key:
+            from jose import jwk
+            from jose.exceptions import JWKError
+
+            try:
+                public_key = jwk.construct(key, algorithm)
+            except (JWKError, TypeError, ValueError):
+                public_key = None
+            self._public_keys[(kid, algorithm)] = (key, public_key)
+        return public_key
+
+    def refresh(self, force=False):
+        """
+        refresh(force=False)
+            it should skip the fetch if one was attempted less than min_refresh_interval ago
+            it should replace the key set only if the fetch succeeds
+            return True if a new key set was loaded
+        """
+        with self._lock:
+            now = time.monotonic()
+            if (
+                not force
+                and self._attempted_at is not None
+                and now - self._attempted_at < self.min_refresh_interval
+            ):
+                return False
+            self._attempted_at = now
+
+            try:
+                keys = self._fetch()
+            except Exception:
+                keys = None
+
+            if keys:
+                self._keys = keys
+                self._fetched_at = now
+
+            self._schedule()
+            return bool(keys)
+
+    def after_fork(self):
+        """
+        after_fork()
+            in a forked process, replaces the lock another thread may have held at fork time
+            and restarts the background refresh, timer threads do not survive a fork
+        """
+        self._lock = threading.Lock()
+        self._timer = None
+        if self._fetched_at is not None:
+            self._schedule()
+
+    def close(self):
+        """
+        close()
+            stops the background refresh
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _fetch(self):
+        with urlopen(self.url, timeout=self.timeout) as response:
+            document = json.load(response)
+
+        return {key["kid"]: key for key in document.get("keys", []) if key.get("kid")}
+
+    def _schedule(self):
+        if not self.background:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._timer = threading.Timer(self.ttl, self.refresh, kwargs=dict(force=True))
+        self._timer.daemon = True
+        self._timer.start()
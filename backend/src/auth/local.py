@@ -0,0 +1,97 @@
+import base64
+import json
+import os
+import time
+import uuid
+
+from Crypto.PublicKey import RSA
+from jose import jwk, jwt
+
+from .auth import reset_key_store, token_cache
+
+
+class LocalAuthority:
+    """
+    LocalAuthority(domain="https://coffee-shop.local", audience="coffee-shop")
+    an offline stand-in for the Auth0 tenant, for tests and benchmarks
+        it generates an RSA key pair and signs tokens carrying any permissions
+        its JWKS document is served from a data: url (see JWKSKeyStore)
+        settings() are the AUTH0_* variables pointing verify_decode_jwt at it
+
+    EXAMPLE
+        authority = LocalAuthority()
+        authority.install()
+        headers = dict(Authorization=f"Bearer {authority.token(['post:drinks'])}")
+    """
+
+    algorithm = "RS256"
+
+    def __init__(
+        self, domain="https://coffee-shop.local", audience="coffee-shop", key_size=2048
+    ):
+        self.domain = domain
+        self.audience = audience
+
+        key = RSA.generate(key_size)
+        self.private_key = key.exportKey().decode()
+
+        self.kid = uuid.uuid4().hex
+
+        public_key = jwk.construct(key.publickey().exportKey(), self.algorithm)
+        self.jwks = dict(
+            keys=[
+                dict(public_key.to_dict(), kid=self.kid, use="sig", alg=self.algorithm)
+            ]
+        )
+
+    @property
+    def jwks_url(self):
+        """
+        the JWKS document as a data: url
+        """
+        document = base64.b64encode(json.dumps(self.jwks).encode()).decode()
+        return f"data:application/json;base64,{document}"
+
+    def settings(self):
+        """
+        settings()
+            return the AUTH0_* environment variables verify_decode_jwt reads
+        """
+        return dict(
+            AUTH0_DOMAIN=self.domain,
+            AUTH0_API_AUDIENCE=self.audience,
+            AUTH0_JWT_ALGORITHM=self.algorithm,
+            AUTH0_JWKS_URL=self.jwks_url,
+        )
+
+    def install(self, environ=None):
+        """
+        install(environ=None)
+            sets settings() in environ (os.environ by default)
+            and drops the key store and verified tokens of the previous authority
+        """
+        (os.environ if environ is None else environ).update(self.settings())
+        reset_key_store()
+        token_cache.clear()
+
+    def token(self, permissions=(), subject="local|tester", ttl=3600, **claims):
+        """
+        token(permissions=(), subject="local|tester", ttl=3600, **claims)
+            return a signed token for subject, expiring in ttl seconds (negative for expired)
+            claims are added to, or override, the standard ones
+        """
+        now = int(time.time())
+        claims = dict(
+            dict(
+                iss=f"{self.domain}/",
+                sub=subject,
+                aud=self.audience,
+                iat=now,
+                exp=now + ttl,
+                permissions=list(permissions),
+            ),
+            **claims,
+        )
+        return jwt.encode(
+            claims, self.private_key, self.algorithm, headers=dict(kid=self.kid)
+        )
@@ -0,0 +1,381 @@
+import hashlib
+import math
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import current_app, has_request_context, request
+
+from .compression import (compression, encoded_etag, matching_etag,
+                          supported_encodings)
+
+DEFAULT_CACHE_CONTROL = {
+    "drinks.drinks_list": "public, no-cache",
+    "drinks.drinks_list_detail": "private, no-cache",
+    "drinks.drinks_detail": "private, no-cache",
+}
+
+MenuState = namedtuple("MenuState", ["epoch", "version", "last_modified"])
+
+
+# Cache Backends
+class DictCache:
+    """
+    DictCache(maxsize=None, sweep_interval=60)
+    the default in-process cache backend, a dict guarded by a lock
+        maxsize: entries with a ttl kept at most, the least recently used are evicted first,
+            None for no bound. Entries without a ttl (the menu state) are never evicted
+        sweep_interval: seconds between two removals of every expired entry, done by a write,
+            so keys that are never read again do not stay in memory
+    """
+
+    def __init__(self, maxsize=None, sweep_interval=60):
+        self.maxsize = maxsize
+        self.sweep_interval = sweep_interval
+
+        self._data = {}
+        # the keys with a ttl, least recently used first
+        self._expiring = OrderedDict()
+        self._lock = threading.Lock()
+        self._swept_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        return self.get_many(key)[0]
+
+    def get_many(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            values = []
+            for key in keys:
+                value, expires_at = self._data.get(key, (None, None))
+                if expires_at is not None:
+                    if expires_at <= now:
+                        self._remove(key)
+                        value = None
+                    else:
+                        self._expiring.move_to_end(key)
+                values.append(value)
+            return values
+
+    def set(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            self._store(key, value, now + ttl if ttl else None, now)
+
+    def add(self, key, value, ttl=None):
+        now = time.monotonic()
+        with self._lock:
+            _, expires_at = self._data.get(key, (None, None))
+            if key in self._data and (expires_at is None or expires_at > now):
+                return False
+            self._store(key, value, now + ttl if ttl else None, now)
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            value, expires_at = self._data.get(key, (0, None))
+            self._data[key] = (int(value) + 1, expires_at)
+            return int(value) + 1
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def _store(self, key, value, expires_at, now):
+        self._data[key] = (value, expires_at)
+        if expires_at is None:
+            self._expiring.pop(key, None)
+            return
+        self._expiring[key] = expires_at
+        self._expiring.move_to_end(key)
+
+        if now - self._swept_at >= self.sweep_interval:
+            self._swept_at = now
+            for expired in [k for k, at in self._expiring.items() if at <= now]:
+                self._remove(expired)
+        if self.maxsize is not None:
+            while len(self._expiring) > self.maxsize:
+                self._remove(next(iter(self._expiring)))
+
+    def _remove(self, key):
+        self._data.pop(key, None)
+        self._expiring.pop(key, None)
+
+
+class RedisCache:
+    """
+    RedisCache(client)
+    a cache backend shared between processes
+        client: any object with the redis-py get/mget/set/incr/delete methods
+        prefix: namespace prepended to every key
+    """
+
+    def __init__(self, client, prefix="coffee-shop:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def get_many(self, *keys):
+        return self.client.mget([self.prefix + key for key in keys])
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(self.prefix + key, value, ex=ttl, nx=True))
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+
+# Menu Cache
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def http_last_modified(last_modified):
+    """
+    http_last_modified(last_modified)
+        return the change time cut to the whole second an HTTP date can carry,
+        or None while that second is not over: a later change in the same second would
+        get the same date, and If-Modified-Since could not tell it apart
+    """
+    if time.time() < math.ceil(last_modified.timestamp()):
+        return None
+    return last_modified.replace(microsecond=0)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class MenuCache:
+    """
+    MenuCache
+    tracks the menu version and keeps rendered menu payloads as ready-to-send bytes
+        the version is bumped by every committed write in src.services
+        rendered payloads are keyed by version, so a bump invalidates all of them
+
+    app.config
+        MENU_CACHE_BACKEND: a DictCache (default) or RedisCache instance
+        MENU_CACHE_TTL: seconds a rendered payload is kept, defaults to one hour
+        MENU_CACHE_ENCODINGS: encodings to precompress for, e.g. ("br", "gzip"),
+            defaults to COMPRESSION_ENCODINGS (see src.compression)
+    """
+
+    _state_key = "coffee_shop.menu_state"
+
+    def __init__(self, backend=None):
+        self.backend = backend or DictCache()
+        self.ttl = 3600
+        self.encodings = ()
+        self._rendered = set()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.backend = app.config.get("MENU_CACHE_BACKEND") or DictCache()
+        self.ttl = app.config.get("MENU_CACHE_TTL", 3600)
+        self.encodings = supported_encodings(
+            app.config.get(
+                "MENU_CACHE_ENCODINGS", app.config.get("COMPRESSION_ENCODINGS", ())
+            )
+        )
+        with self._lock:
+            self._rendered.clear()
+
+    def state(self):
+        """
+        state()
+            it should read the epoch, version and last change time in one backend call
+            it should reuse the same snapshot for the rest of the request
+            return a MenuState
+        """
+        if has_request_context() and self._state_key in request.environ:
+            return request.environ[self._state_key]
+
+        epoch, version, modified = self.backend.get_many(
+            "menu:epoch", "menu:version", "menu:modified"
+        )
+        if epoch is None or modified is None:
+            self.backend.add("menu:epoch", uuid.uuid4().hex[:8])
+            self.backend.add("menu:modified", str(_now().timestamp()))
+            epoch, modified = self.backend.get_many("menu:epoch", "menu:modified")
+
+        state = MenuState(
+            epoch=_decode(epoch),
+            version=int(version or 0),
+            last_modified=datetime.fromtimestamp(float(modified), timezone.utc),
+        )
+        if has_request_context():
+            request.environ[self._state_key] = state
+        return state
+
+    @property
+    def version(self):
+        return self.state().version
+
+    def bump(self):
+        """
+        bump()
+            marks the menu as changed and drops the payloads rendered by this process
+            return the new version
+        """
+        version = self.backend.incr("menu:version")
+        self.backend.set("menu:modified", str(_now().timestamp()))
+        if has_request_context():
+            request.environ.pop(self._state_key, None)
+
+        with self._lock:
+            rendered, self._rendered = self._rendered, set()
+        self.backend.delete(*rendered)
+        return version
+
+    def etag(self, *parts):
+        """
+        etag(*parts)
+            return a strong etag for the current version, scoped by parts
+        """
+        state = self.state()
+        scope = hashlib.sha1("\0".join(parts).encode()).hexdigest()[:16]
+        return f"{state.epoch}-{state.version}-{scope}"
+
+    def get_or_render(self, name, render, encoding=None):
+        """
+        get_or_render(name, render, encoding=None)
+            @INPUTS
+                name: the payload name, e.g. 'drinks'
+                render: a callable returning the payload as bytes
+                encoding: None, 'gzip' or 'br'
+
+            it should return the cached bytes for the current version
+            it should call render (once per version) and cache the result otherwise
+        """
+        state = self.state()
+        key = f"menu:render:{state.epoch}.{state.version}:{name}:{encoding or ''}"
+
+        body = self.backend.get(key)
+        if body is None:
+            if encoding:
+                body = compression.compress(self.get_or_render(name, render), encoding)
+            else:
+                body = render()
+            self.backend.set(key, body, ttl=self.ttl)
+            with self._lock:
+                self._rendered.add(key)
+
+        return body
+
+    def response(self, name, render):
+        """
+        response(name, render)
+            @INPUTS
+                name: the payload name, e.g. 'drinks'
+                render: a callable returning a flask json response
+
+            return a json response built from the cached payload,
+            precompressed when the client accepts one of MENU_CACHE_ENCODINGS
+        """
+        encoding = None
+        if self.encodings:
+            encoding = request.accept_encodings.best_match(self.encodings)
+
+        body = self.get_or_render(name, lambda: render().get_data(), encoding)
+
+        response = current_app.response_class(body, mimetype="application/json")
+        if self.encodings:
+            response.vary.add("Accept-Encoding")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+
+menu_cache = MenuCache()
+
+
+def drink_etag(drink):
+    """
+    drink_etag(drink)
+        return the strong etag of one drink, it changes with every update of the drink
+    """
+    return f"drink-{drink.id}-{drink.version}"
+
+
+def cache_control(response):
+    """
+    cache_control(response)
+        sets the endpoint's Cache-Control, read from app.config["CACHE_CONTROL"]
+        return the response
+    """
+    cache_control = current_app.config.get("CACHE_CONTROL", DEFAULT_CACHE_CONTROL)
+    if request.endpoint in cache_control:
+        response.headers["Cache-Control"] = cache_control[request.endpoint]
+    return response
+
+
+def conditional_get(view):
+    """
+    @conditional_get decorator
+        it should answer 304 Not Modified, without calling the view, when
+            the If-None-Match header matches the current strong ETag, in any content-coding
+            or, without If-None-Match, If-Modified-Since is not older than the last menu change
+        it should set ETag, Last-Modified and the endpoint's Cache-Control on responses
+            Last-Modified only once the second of the last change is over (see http_last_modified)
+            Cache-Control values are read from app.config["CACHE_CONTROL"] per endpoint
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        # read the version before the view runs so a concurrent write can only
+        # make the etag older than the body, never newer
+        etag = menu_cache.etag(
+            request.endpoint, request.path, request.query_string.decode()
+        )
+        last_modified = http_last_modified(menu_cache.state().last_modified)
+
+        matched = None
+        if request.if_none_match:
+            matched = matching_etag(request.if_none_match, etag)
+            not_modified = matched is not None
+        else:
+            since = request.if_modified_since
+            if since is not None and since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            not_modified = (
+                since is not None
+                and last_modified is not None
+                and since >= last_modified
+            )
+
+        if not_modified:
+            response = current_app.response_class(status=304)
+            # without If-None-Match the coding the client holds is unknown, its cache
+            # matches the 304 by Last-Modified instead
+            if matched:
+                response.set_etag(matched)
+        else:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            # a precompressed payload (see MenuCache.response) is its own representation
+            response.set_etag(
+                encoded_etag(etag, response.headers.get("Content-Encoding"))
+            )
+
+        if last_modified is not None:
+            response.last_modified = last_modified
+        return cache_control(response)
+
+    return wrapper
@@ -0,0 +1,177 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+# Pub/Sub Backends
+class LocalPubSub:
+    """
+    LocalPubSub
+    the default pub/sub backend, delivers messages to the subscribers of this process
+    """
+
+    def __init__(self):
+        self._subscribers = []
+
+    def publish(self, message):
+        for callback in list(self._subscribers):
+            callback(message)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def close(self):
+        self._subscribers.clear()
+
+
+class RedisPubSub:
+    """
+    RedisPubSub(client)
+    a pub/sub backend shared between processes
+        client: any object with the redis-py publish/pubsub methods
+        channel: the channel the change events are published on
+    """
+
+    def __init__(self, client, channel="coffee-shop:changes"):
+        self.client = client
+        self.channel = channel
+        self._pubsub = None
+        self._thread = None
+
+    def publish(self, message):
+        self.client.publish(self.channel, json.dumps(message))
+
+    def subscribe(self, callback):
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+
+        def listen():
+            for item in self._pubsub.listen():
+                if item and item.get("type") == "message":
+                    callback(json.loads(item["data"]))
+
+        self._thread = threading.Thread(
+            target=listen, name="changes-subscriber", daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+
+# Change Feed
+class ChangeFeed:
+    """
+    ChangeFeed
+    the menu change events, numbered by the menu version (see src.caching.MenuCache)
+        events are published through the pub/sub backend and kept in a bounded history
+        so clients can catch up from the last version they have seen
+
+    app.config
+        CHANGES_BACKEND: a LocalPubSub (default) or RedisPubSub instance
+        CHANGES_HISTORY: events kept for catching up, older versions must reload the menu
+        CHANGES_MAX_FOLLOWERS: requests of this process allowed to wait for changes at once,
+            each holds a thread (see follow)
+    """
+
+    def __init__(self, backend=None, history=1000, max_followers=4):
+        self.backend = backend or LocalPubSub()
+        self._history = deque(maxlen=history)
+        self._condition = threading.Condition()
+        self._followers = threading.BoundedSemaphore(max_followers)
+        self.backend.subscribe(self.receive)
+
+    def init_app(self, app):
+        self.backend.close()
+        self.backend = app.config.get("CHANGES_BACKEND") or LocalPubSub()
+        with self._condition:
+            self._history = deque(maxlen=app.config.get("CHANGES_HISTORY", 1000))
+        self._followers = threading.BoundedSemaphore(
+            app.config.get("CHANGES_MAX_FOLLOWERS", 4)
+        )
+        self.backend.subscribe(self.receive)
+
+    def follow(self):
+        """
+        follow()
+            it should take one of the CHANGES_MAX_FOLLOWERS slots without blocking
+            return the callable giving the slot back, or None when they are all taken
+        """
+        followers = self._followers
+        if not followers.acquire(blocking=False):
+            return None
+        return followers.release
+
+    def publish(self, type, version, drink):
+        """
+        publish(type, version, drink)
+            @INPUTS
+                type: created, updated, deleted or reloaded (many drinks changed at once)
+                version: the menu version this change produced
+                drink: the public (brief) representation of the drink, or None
+        """
+        self.backend.publish(dict(version=version, type=type, drink=drink))
+
+    def receive(self, event):
+        with self._condition:
+            # concurrent writes may publish out of order, keep the history sorted
+            history = self._history
+            index = len(history)
+            while index and history[index - 1]["version"] > event["version"]:
+                index -= 1
+            if index and history[index - 1]["version"] == event["version"]:
+                return
+            if len(history) == history.maxlen:
+                if not index:
+                    return
+                history.popleft()
+                index -= 1
+            history.insert(index, event)
+            self._condition.notify_all()
+
+    @property
+    def latest(self):
+        """
+        the version of the newest event received, None before the first one
+        """
+        with self._condition:
+            return self._history[-1]["version"] if self._history else None
+
+    def since(self, version):
+        """
+        since(version)
+            return (events, reset), the events newer than version
+            reset is True when the history no longer reaches back to version
+        """
+        with self._condition:
+            return self._since(version)
+
+    def wait(self, version, timeout):
+        """
+        wait(version, timeout)
+            like since(version), but waits up to timeout seconds for an event newer than version
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            events, reset = self._since(version)
+            while not events and not reset:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+                events, reset = self._since(version)
+            return events, reset
+
+    def _since(self, version):
+        history = self._history
+        if not history or version >= history[-1]["version"]:
+            return [], False
+        if version < history[0]["version"] - 1:
+            return [], True
+        return [event for event in history if event["version"] > version], False
+
+
+changes = ChangeFeed()
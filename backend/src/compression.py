@@ -0,0 +1,230 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+DEFAULT_MIMETYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/event-stream",
+    "text/html",
+    "text/plain",
+)
+
+
+def supported_encodings(encodings):
+    """
+    supported_encodings(encodings)
+        return the encodings this process can produce, in the given order of preference
+    """
+    return tuple(
+        encoding
+        for encoding in encodings
+        if encoding == "gzip" or (encoding == "br" and brotli is not None)
+    )
+
+
+def encoded_etag(etag, encoding):
+    """
+    encoded_etag(etag, encoding)
+        return the strong etag of the representation compressed with encoding,
+        a different content-coding is a different representation (i.e. "v1" -> "v1-gzip")
+    """
+    return f"{etag}-{encoding}" if encoding else etag
+
+
+def matching_etag(etags, etag):
+    """
+    matching_etag(etags, etag)
+        return the tag of etags (If-None-Match, If-Match) naming etag in any content-coding,
+        or None if none does
+    """
+    for encoding in (None, "gzip", "br"):
+        tag = encoded_etag(etag, encoding)
+        if etags.contains(tag):
+            return tag
+    return None
+
+
+def compress(body, encoding, level=None):
+    """
+    compress(body, encoding, level=None)
+        return body compressed with gzip or br, the level defaults to each library's own
+    """
+    if encoding == "gzip":
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION if level is None else level,
+            zlib.DEFLATED,
+            31,
+        )
+        return compressor.compress(body) + compressor.flush()
+    if encoding == "br":
+        return brotli.compress(body, quality=11 if level is None else level)
+    return body
+
+
+def compress_stream(chunks, encoding, level=None):
+    """
+    compress_stream(chunks, encoding, level=None)
+        yield the chunks compressed, flushing after each so clients can decode as they arrive
+    """
+    if encoding == "gzip":
+        compressor = zlib.compressobj(
+            zlib.Z_DEFAULT_COMPRESSION if level is None else level,
+            zlib.DEFLATED,
+            31,
+        )
+        process = compressor.compress
+        finish = compressor.flush
+
+        def flush():
+            return compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    else:
+        compressor = brotli.Compressor(quality=11 if level is None else level)
+        process = compressor.process
+        flush = compressor.flush
+        finish = compressor.finish
+
+    try:
+        for chunk in chunks:
+            if chunk:
+                yield process(chunk) + flush()
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+class Compression:
+    """
+    Compression
+    compresses responses for clients sending a matching Accept-Encoding
+
+    it should only compress 2xx responses of COMPRESSION_MIMETYPES
+    it should leave bodies smaller than COMPRESSION_MIN_SIZE as they are
+    it should reuse the compressed bytes of GET responses carrying the same strong ETag
+        for the same url (an ETag only identifies a representation of one url)
+    it should compress streamed responses chunk by chunk
+    it should suffix a strong ETag with the encoding of the body (see encoded_etag)
+
+    app.config
+        COMPRESSION_ENCODINGS: encodings offered, by preference, e.g. ("br", "gzip"), empty disables
+        COMPRESSION_MIN_SIZE: smallest body compressed, in bytes
+        COMPRESSION_GZIP_LEVEL: 1 (fastest) to 9 (smallest)
+        COMPRESSION_BROTLI_QUALITY: 0 (fastest) to 11 (smallest)
+        COMPRESSION_CACHE_SIZE: compressed bodies kept for reuse, by url and ETag
+        COMPRESSION_MIMETYPES: mimetypes worth compressing
+    """
+
+    def __init__(self):
+        self.encodings = ()
+        self.min_size = 500
+        self.levels = {}
+        self.cache_size = 256
+        self.mimetypes = DEFAULT_MIMETYPES
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.encodings = supported_encodings(
+            app.config.get("COMPRESSION_ENCODINGS", ())
+        )
+        self.min_size = app.config.get("COMPRESSION_MIN_SIZE", 500)
+        self.levels = dict(
+            gzip=app.config.get("COMPRESSION_GZIP_LEVEL"),
+            br=app.config.get("COMPRESSION_BROTLI_QUALITY"),
+        )
+        self.cache_size = app.config.get("COMPRESSION_CACHE_SIZE", 256)
+        self.mimetypes = tuple(
+            app.config.get("COMPRESSION_MIMETYPES", DEFAULT_MIMETYPES)
+        )
+        self.clear()
+
+        if self.encodings:
+            app.after_request(self.after_request)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def compress(self, body, encoding):
+        """
+        compress(body, encoding)
+            return body compressed at the configured level for encoding
+        """
+        return compress(body, encoding, self.levels.get(encoding))
+
+    def after_request(self, response):
+        if response.mimetype not in self.mimetypes:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        if (
+            not 200 <= response.status_code < 300
+            or response.status_code in (204, 206)
+            or request.method == "HEAD"
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if response.is_streamed:
+            response.response = compress_stream(
+                response.response, encoding, self.levels.get(encoding)
+            )
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
+            if etag and not weak:
+                response.set_etag(encoded_etag(etag, encoding))
+            return response
+
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+
+        key = None
+        if etag and not weak and request.method == "GET":
+            # writes answer with the ETag of another url's representation
+            key = (request.full_path, etag, encoding)
+        compressed = self._get(key)
+        if compressed is None:
+            compressed = self.compress(body, encoding)
+            self._set(key, compressed)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        if etag and not weak:
+            response.set_etag(encoded_etag(etag, encoding))
+        return response
+
+    def _get(self, key):
+        if key is None or not self.cache_size:
+            return None
+        with self._lock:
+            compressed = self._cache.get(key)
+            if compressed is not None:
+                self._cache.move_to_end(key)
+            return compressed
+
+    def _set(self, key, compressed):
+        if key is None or not self.cache_size:
+            return
+        with self._lock:
+            self._cache[key] = compressed
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+compression = Compression()
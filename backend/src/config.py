@@ -0,0 +1,210 @@
+import os
+import threading
+
+SQLITE_JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+SQLITE_SYNCHRONOUS = ("off", "normal", "full", "extra")
+
+POOL_OPTIONS = dict(
+    DATABASE_POOL_SIZE="pool_size",
+    DATABASE_MAX_OVERFLOW="max_overflow",
+    DATABASE_POOL_RECYCLE="pool_recycle",
+    DATABASE_POOL_TIMEOUT="pool_timeout",
+)
+
+
+RATE_LIMIT_PERMISSIONS = {
+    "get:drinks-detail": "600/minute",
+    "post:drinks": "120/minute",
+    "patch:drinks": "120/minute",
+    "delete:drinks": "120/minute",
+}
+
+
+class ConfigError(Exception):
+    """
+    ConfigError Exception
+    raised by create_app when the configuration cannot work
+    """
+
+
+def _getbool(environ, name, default):
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _getint(environ, name, default=None):
+    value = environ.get(name)
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ConfigError(f"{name} must be an integer, got {value!r}")
+
+
+_environment_loaded = False
+_environment_lock = threading.Lock()
+
+
+def load_environment(override=False):
+    """
+    load_environment(override=False)
+        it should read the .env file into os.environ once per process, not on import
+        @INPUTS
+            override: read it again, its values replacing the environment (on reload)
+    """
+    global _environment_loaded
+
+    with _environment_lock:
+        if _environment_loaded and not override:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv(override=override)
+        _environment_loaded = True
+
+
+class Config:
+    """
+    Config(environ=None)
+    the application settings, read once from the environment
+        (os.environ and the .env file by default, see load_environment)
+        DATABASE_URL: the SQLAlchemy database uri, defaults to the bundled sqlite file
+        DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_POOL_RECYCLE,
+        DATABASE_POOL_TIMEOUT, DATABASE_POOL_PRE_PING: connection pool tuning
+        DATABASE_REPLICA_URLS: comma separated read replica uris
+        DATABASE_REPLICA_STICKY_SECONDS: how long reads stay on the primary after a write,
+            by any worker (the replica lag to cover)
+        SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT,
+        SQLITE_MMAP_SIZE: pragmas applied to every sqlite connection
+        ASGI_THREADS: size of the thread pool behind the ASGI entry point (src.asgi)
+        SERVER_BIND, SERVER_WORKERS, SERVER_THREADS,
+        SERVER_GRACEFUL_TIMEOUT: address, processes, threads per process and seconds
+            to finish requests on reload of the preforking server (src.server)
+        SERVER_CONFIG: package.module:name of the settings given to create_app by the
+            preforking server, more than one worker needs shared cache backends there
+        DRINKS_STREAMING: stream full drink listings instead of caching them
+        DRINKS_STREAM_BATCH_SIZE: drinks fetched and written per chunk of a streamed listing
+        COMPRESSION_ENCODINGS: comma separated encodings offered to clients, by preference
+        COMPRESSION_MIN_SIZE, COMPRESSION_GZIP_LEVEL, COMPRESSION_BROTLI_QUALITY,
+        COMPRESSION_CACHE_SIZE: response compression tuning (src.compression)
+        CHANGES_HISTORY: menu change events kept for clients catching up (GET /drinks/changes)
+        CHANGES_POLL_TIMEOUT, CHANGES_HEARTBEAT,
+        CHANGES_STREAM_TIMEOUT: long-poll and server-sent events timings, in seconds
+        CHANGES_MAX_FOLLOWERS: long-polls and event streams waiting at once in a process
+        CHANGES_RETRY_AFTER: seconds the requests over that limit are told to wait (503)
+        RATE_LIMIT_PER_IP: requests per client ip, e.g. 1200/minute, empty disables
+        RATE_LIMIT_AUTH_FAILURES: failed authentications per client ip
+        RATE_LIMIT_PERMISSIONS: comma separated permission=rate budgets per jwt sub,
+            e.g. post:drinks=60/minute, merged into the defaults
+        IDEMPOTENCY_TTL: seconds a response is replayed for a repeated Idempotency-Key
+        IDEMPOTENCY_MAX_ENTRIES: responses kept for replays by one process without a shared backend
+        JSON_BACKEND: json (default), orjson or ujson, encodes the drink listings
+        INSTRUMENTATION: per request timings, Server-Timing headers and /metrics (src.instrumentation)
+    """
+
+    def __init__(self, environ=None):
+        if environ is None:
+            load_environment()
+            environ = os.environ
+
+        self.SQLALCHEMY_DATABASE_URI = environ.get("DATABASE_URL")
+        self.SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+        engine_options = dict(
+            pool_pre_ping=_getbool(environ, "DATABASE_POOL_PRE_PING", True)
+        )
+        for name, option in POOL_OPTIONS.items():
+            value = _getint(environ, name)
+            if value is not None:
+                engine_options[option] = value
+        self.SQLALCHEMY_ENGINE_OPTIONS = engine_options
+
+        replica_urls = [
+            url.strip()
+            for url in environ.get("DATABASE_REPLICA_URLS", "").split(",")
+            if url.strip()
+        ]
+        self.SQLALCHEMY_BINDS = {
+            f"replica{index}": url for index, url in enumerate(replica_urls)
+        }
+        self.SQLALCHEMY_REPLICA_BINDS = list(self.SQLALCHEMY_BINDS)
+        self.SQLALCHEMY_REPLICA_STICKY_SECONDS = _getint(
+            environ, "DATABASE_REPLICA_STICKY_SECONDS", 5
+        )
+
+        self.SQLITE_PRAGMAS = dict(
+            journal_mode=environ.get("SQLITE_JOURNAL_MODE", "wal"),
+            synchronous=environ.get("SQLITE_SYNCHRONOUS", "normal"),
+            busy_timeout=_getint(environ, "SQLITE_BUSY_TIMEOUT", 5000),
+            mmap_size=_getint(environ, "SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        )
+
+        self.ASGI_THREADS = _getint(environ, "ASGI_THREADS", 32)
+        self.SERVER_BIND = environ.get("SERVER_BIND", "127.0.0.1:5000")
+        self.SERVER_WORKERS = _getint(environ, "SERVER_WORKERS", 1)
+        self.SERVER_THREADS = _getint(environ, "SERVER_THREADS", 8)
+        self.SERVER_GRACEFUL_TIMEOUT = _getint(environ, "SERVER_GRACEFUL_TIMEOUT", 30)
+        self.SERVER_CONFIG = environ.get("SERVER_CONFIG")
+        self.DRINKS_STREAMING = _getbool(environ, "DRINKS_STREAMING", False)
+        self.DRINKS_STREAM_BATCH_SIZE = _getint(
+            environ, "DRINKS_STREAM_BATCH_SIZE", 500
+        )
+        self.COMPRESSION_ENCODINGS = tuple(
+            encoding.strip()
+            for encoding in environ.get("COMPRESSION_ENCODINGS", "br,gzip").split(",")
+            if encoding.strip()
+        )
+        self.COMPRESSION_MIN_SIZE = _getint(environ, "COMPRESSION_MIN_SIZE", 500)
+        self.COMPRESSION_GZIP_LEVEL = _getint(environ, "COMPRESSION_GZIP_LEVEL", 6)
+        self.COMPRESSION_BROTLI_QUALITY = _getint(
+            environ, "COMPRESSION_BROTLI_QUALITY", 5
+        )
+        self.COMPRESSION_CACHE_SIZE = _getint(environ, "COMPRESSION_CACHE_SIZE", 256)
+        self.CHANGES_HISTORY = _getint(environ, "CHANGES_HISTORY", 1000)
+        self.CHANGES_POLL_TIMEOUT = _getint(environ, "CHANGES_POLL_TIMEOUT", 25)
+        self.CHANGES_HEARTBEAT = _getint(environ, "CHANGES_HEARTBEAT", 15)
+        self.CHANGES_STREAM_TIMEOUT = _getint(environ, "CHANGES_STREAM_TIMEOUT", 300)
+        self.CHANGES_MAX_FOLLOWERS = _getint(environ, "CHANGES_MAX_FOLLOWERS", 4)
+        self.CHANGES_RETRY_AFTER = _getint(environ, "CHANGES_RETRY_AFTER", 5)
+        self.RATE_LIMIT_PER_IP = environ.get("RATE_LIMIT_PER_IP", "1200/minute")
+        self.RATE_LIMIT_AUTH_FAILURES = environ.get(
+            "RATE_LIMIT_AUTH_FAILURES", "30/minute"
+        )
+        self.RATE_LIMIT_PERMISSIONS = dict(RATE_LIMIT_PERMISSIONS)
+        for budget in environ.get("RATE_LIMIT_PERMISSIONS", "").split(","):
+            if budget.strip():
+                permission, _, rate = budget.partition("=")
+                self.RATE_LIMIT_PERMISSIONS[permission.strip()] = rate.strip()
+        self.IDEMPOTENCY_TTL = _getint(environ, "IDEMPOTENCY_TTL", 86400)
+        self.IDEMPOTENCY_MAX_ENTRIES = _getint(
+            environ, "IDEMPOTENCY_MAX_ENTRIES", 10000
+        )
+        self.JSON_BACKEND = environ.get("JSON_BACKEND", "json")
+        self.INSTRUMENTATION = _getbool(environ, "INSTRUMENTATION", False)
+
+
+def validate_database_config(config, dialect):
+    """
+    validate_database_config(config, dialect)
+        it should raise a ConfigError for pool options sqlite cannot use
+        it should raise a ConfigError for unknown sqlite pragma values
+    """
+    if dialect != "sqlite":
+        return
+
+    options = config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+    unsupported = {"pool_size", "max_overflow", "pool_timeout"} & set(options)
+    if unsupported:
+        raise ConfigError(
+            f"{', '.join(sorted(unsupported))} cannot be used with sqlite, "
+            "set DATABASE_URL to a database server to pool connections"
+        )
+
+    pragmas = config.get("SQLITE_PRAGMAS") or {}
+    if str(pragmas.get("journal_mode", "wal")).lower() not in SQLITE_JOURNAL_MODES:
+        raise ConfigError(f"unknown sqlite journal_mode {pragmas['journal_mode']}")
+    if str(pragmas.get("synchronous", "normal")).lower() not in SQLITE_SYNCHRONOUS:
+        raise ConfigError(f"unknown sqlite synchronous {pragmas['synchronous']}")
@@ -0,0 +1,123 @@
+import hashlib
+import json
+from functools import wraps
+
+from flask import abort, current_app, request
+
+from .auth.auth import current_payload
+from .caching import DictCache, menu_cache
+
+REPLAYED_HEADERS = ("Content-Type", "Drink-ETag", "Location")
+
+
+class Idempotency:
+    """
+    Idempotency
+    replays the stored response of a write retried with the same Idempotency-Key header
+        keys are scoped by the jwt sub, the method and the path of the request
+        a key is held for pending_ttl seconds while its first request runs
+
+    app.config
+        IDEMPOTENCY_BACKEND: a DictCache or RedisCache instance (see src.caching),
+            defaults to the menu cache backend when it is shared (not a DictCache),
+            to a DictCache of IDEMPOTENCY_MAX_ENTRIES otherwise
+        IDEMPOTENCY_TTL: seconds a response is kept for replays
+        IDEMPOTENCY_MAX_ENTRIES: responses kept in process, the least recently used go first
+    """
+
+    pending_ttl = 60
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 86400
+
+    def init_app(self, app):
+        self.backend = app.config.get("IDEMPOTENCY_BACKEND") or menu_cache.backend
+        if isinstance(self.backend, DictCache):
+            # keys are rarely read again, in process they need a bound of their own
+            self.backend = DictCache(
+                maxsize=app.config.get("IDEMPOTENCY_MAX_ENTRIES", 10000)
+            )
+        self.ttl = app.config.get("IDEMPOTENCY_TTL", 86400)
+
+    def run(self, key, view):
+        """
+        run(key, view)
+            it should abort 400 if the key is empty or longer than 255 characters
+            it should call view once per key and store its response, unless it failed
+            it should replay the stored response, with an Idempotent-Replayed header, afterwards
+            it should abort 409 while the first request with the key is still running
+            it should abort 422 if the key is reused with a different body
+            return the response
+        """
+        if not key or len(key) > 255:
+            abort(400)
+
+        payload = current_payload()
+        subject = payload.get("sub") if isinstance(payload, dict) else None
+        scope = "\0".join((str(subject), request.method, request.path, key))
+        store_key = "idempotency:" + hashlib.sha1(scope.encode()).hexdigest()
+        fingerprint = hashlib.sha1(request.get_data()).hexdigest()
+
+        pending = json.dumps(dict(fingerprint=fingerprint))
+        if not self.backend.add(store_key, pending, ttl=self.pending_ttl):
+            stored = self.backend.get(store_key)
+            if stored is None:
+                abort(409)
+            stored = json.loads(stored)
+            if stored["fingerprint"] != fingerprint:
+                abort(422)
+            if "status" not in stored:
+                abort(409)
+            return self.replay(stored)
+
+        try:
+            response = current_app.make_response(view())
+        except Exception:
+            # aborted requests are not stored, a retry runs them again
+            self.backend.delete(store_key)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            self.backend.delete(store_key)
+            return response
+
+        stored = dict(
+            fingerprint=fingerprint,
+            status=response.status_code,
+            headers=[
+                (name, response.headers[name])
+                for name in REPLAYED_HEADERS
+                if name in response.headers
+            ],
+            body=response.get_data(as_text=True),
+        )
+        self.backend.set(store_key, json.dumps(stored), ttl=self.ttl)
+        return response
+
+    def replay(self, stored):
+        response = current_app.response_class(
+            stored["body"], status=stored["status"], headers=stored["headers"]
+        )
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+
+idempotency = Idempotency()
+
+
+def idempotent(view):
+    """
+    @idempotent decorator
+        it should run the view as usual without an Idempotency-Key header
+        it should run it through idempotency.run otherwise (see Idempotency.run)
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return view(*args, **kwargs)
+        return idempotency.run(key, lambda: view(*args, **kwargs))
+
+    return wrapper
@@ -0,0 +1,297 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_timings_key = "coffee_shop.timings"
+_query_start_key = "coffee_shop.query_start"
+
+
+class RequestTimings:
+    """
+    RequestTimings
+    the phase timings and sql statistics collected for one request
+    """
+
+    __slots__ = ("started", "phases", "sql_count", "sql_duration")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.sql_count = 0
+        self.sql_duration = 0.0
+
+    def add(self, phase, duration):
+        self.phases[phase] = self.phases.get(phase, 0.0) + duration
+
+
+def current_timings():
+    """
+    current_timings()
+        return the RequestTimings of the current request, None when it is not instrumented
+    """
+    if not has_request_context():
+        return None
+    return request.environ.get(_timings_key)
+
+
+@contextmanager
+def timed(phase):
+    """
+    timed(phase)
+        a context manager (or decorator) adding the time spent inside it to phase
+        it should do nothing outside instrumented requests
+    """
+    timings = current_timings()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(phase, time.perf_counter() - started)
+
+
+# Metrics
+def _format_labels(labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+class Histogram:
+    """
+    Histogram(name, help, buckets=DEFAULT_BUCKETS)
+    a prometheus histogram with one series per label set
+    """
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted(
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._series.items()
+            )
+
+        for key, counts, total, count in series:
+            labels = _format_labels(key)
+            separator = "," if labels else ""
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(
+                    f'{self.name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{self.name}_bucket{{{labels}{separator}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{labels}}} {total}")
+            lines.append(f"{self.name}_count{{{labels}}} {count}")
+        return lines
+
+
+class Counter:
+    """
+    Counter(name, help)
+    a prometheus counter with one series per label set
+    """
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for key, value in series:
+            lines.append(f"{self.name}{{{_format_labels(key)}}} {value}")
+        return lines
+
+
+class Instrumentation:
+    """
+    Instrumentation
+    opt-in per request timing of the flask application
+        phases are recorded with timed(), e.g. auth, db, dump and jsonify
+        sql statements are counted and timed through SQLAlchemy engine events
+
+    it should add a Server-Timing header to every response
+    it should log one structured (json) line per request
+    it should serve prometheus histograms per route at /metrics
+
+    app.config
+        INSTRUMENTATION: enables the instrumentation, off by default
+        INSTRUMENTATION_METRICS_PATH: where the metrics are served, defaults to /metrics
+    """
+
+    def __init__(self):
+        self.request_duration = Histogram(
+            "coffee_shop_request_duration_seconds", "Time spent serving a request"
+        )
+        self.phase_duration = Histogram(
+            "coffee_shop_phase_duration_seconds", "Time spent in a phase of a request"
+        )
+        self.sql_queries = Histogram(
+            "coffee_shop_sql_queries",
+            "SQL statements run by a request",
+            buckets=QUERY_BUCKETS,
+        )
+        self.sql_duration = Histogram(
+            "coffee_shop_sql_duration_seconds", "Time spent in SQL by a request"
+        )
+        self.responses = Counter(
+            "coffee_shop_responses_total", "Responses sent, by status code"
+        )
+        self._listening = False
+        self._lock = threading.Lock()
+
+    @property
+    def metrics(self):
+        return (
+            self.request_duration,
+            self.phase_duration,
+            self.sql_queries,
+            self.sql_duration,
+            self.responses,
+        )
+
+    def init_app(self, app):
+        if not app.config.get("INSTRUMENTATION"):
+            return
+
+        metrics_path = app.config.get("INSTRUMENTATION_METRICS_PATH", "/metrics")
+        app.add_url_rule(metrics_path, "metrics", self.metrics_view)
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        self.listen()
+
+    def listen(self):
+        with self._lock:
+            if self._listening:
+                return
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            self._listening = True
+
+    def before_request(self):
+        if request.endpoint != "metrics":
+            request.environ[_timings_key] = RequestTimings()
+
+    def after_request(self, response):
+        timings = request.environ.pop(_timings_key, None)
+        if timings is None:
+            return response
+
+        duration = time.perf_counter() - timings.started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+
+        response.headers["Server-Timing"] = server_timing(timings, duration)
+        self.observe(route, request.method, response.status_code, timings, duration)
+
+        logger.info(
+            json.dumps(
+                dict(
+                    event="request",
+                    method=request.method,
+                    route=route,
+                    status=response.status_code,
+                    duration_ms=round(duration * 1000, 3),
+                    sql_count=timings.sql_count,
+                    sql_ms=round(timings.sql_duration * 1000, 3),
+                    phases_ms={
+                        phase: round(value * 1000, 3)
+                        for phase, value in timings.phases.items()
+                    },
+                )
+            )
+        )
+        return response
+
+    def observe(self, route, method, status, timings, duration):
+        self.request_duration.observe(duration, route=route, method=method)
+        for phase, value in timings.phases.items():
+            self.phase_duration.observe(value, route=route, phase=phase)
+        self.sql_queries.observe(timings.sql_count, route=route)
+        self.sql_duration.observe(timings.sql_duration, route=route)
+        self.responses.inc(route=route, method=method, status=status)
+
+    def expose(self):
+        """
+        expose()
+            return the metrics in the prometheus text format
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        return Response(self.expose(), mimetype="text/plain; version=0.0.4")
+
+
+def server_timing(timings, duration):
+    """
+    server_timing(timings, duration)
+        return the Server-Timing header value, durations in milliseconds
+    """
+    entries = [
+        f"{phase};dur={value * 1000:.3f}" for phase, value in timings.phases.items()
+    ]
+    entries.append(
+        f'sql;desc="{timings.sql_count} queries";dur={timings.sql_duration * 1000:.3f}'
+    )
+    entries.append(f"total;dur={duration * 1000:.3f}")
+    return ", ".join(entries)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_timings() is not None:
+        conn.info.setdefault(_query_start_key, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = current_timings()
+    starts = conn.info.get(_query_start_key)
+    if timings is None or not starts:
+        return
+    timings.sql_count += 1
+    timings.sql_duration += time.perf_counter() - starts.pop()
+
+
+instrumentation = Instrumentation()
@@ -1,28 +1,151 @@
 import json
 import os
+import random
+import time
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
 
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, Integer, String
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import JSON, Column, Integer, String, event, inspect, orm
+from sqlalchemy.exc import ArgumentError
 from sqlalchemy.types import BigInteger
 
+from .config import ConfigError, validate_database_config
+
 project_dir = Path(__name__).parent / "database"
 database_filename = "database.db"
 database_path = "sqlite:///{}".format(project_dir / database_filename)
 
-db = SQLAlchemy()
+
+class RoutingSession(SignallingSession):
+    """
+    RoutingSession
+    a session sending the reads made inside read_replica() to a replica engine
+        SQLALCHEMY_REPLICA_BINDS: names of SQLALCHEMY_BINDS entries that serve reads
+        SQLALCHEMY_REPLICA_STICKY_SECONDS: reads stay on the primary this long after a write
+    everything else, including every flush, goes to the primary
+    """
+
+    def __init__(self, db, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if self.info.get("read_replica") and not self._flushing:
+            engine = self.db.get_replica_engine(
+                self.app, self.info.get("replica_changed_at")
+            )
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    RoutingSQLAlchemy
+    a SQLAlchemy service whose sessions can read from replicas (see RoutingSession)
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def get_replica_engine(self, app, changed_at=None):
+        """
+        get_replica_engine(app, changed_at=None)
+            @INPUTS
+                app: the flask application
+                changed_at: the time.time() of the last committed write, None if unknown
+
+            return a random replica engine, or None to use the primary
+            the primary is used when no replica is configured or the last write happened
+            less than SQLALCHEMY_REPLICA_STICKY_SECONDS ago, a replica may not have it yet
+        """
+        replicas = app.config.get("SQLALCHEMY_REPLICA_BINDS")
+        if not replicas:
+            return None
+
+        sticky_seconds = app.config.get("SQLALCHEMY_REPLICA_STICKY_SECONDS", 5)
+        if changed_at is not None and time.time() - changed_at < sticky_seconds:
+            return None
+
+        return self.get_engine(app, bind=random.choice(replicas))
+
+
+# objects keep their loaded state after commit, so a mutation can return the
+# row it just wrote without a refresh SELECT
+db = RoutingSQLAlchemy(session_options=dict(expire_on_commit=False))
+
+
+@contextmanager
+def read_replica(changed_at=None):
+    """
+    read_replica(changed_at=None)
+        a context manager routing the queries run inside it to a replica, when configured
+            changed_at: the time.time() of the last committed write, by any process;
+            the queries stay on the primary while it is recent (see get_replica_engine)
+    """
+    session = db.session()
+    previous = (
+        session.info.get("read_replica", False),
+        session.info.get("replica_changed_at"),
+    )
+    session.info["read_replica"] = True
+    session.info["replica_changed_at"] = changed_at
+    try:
+        yield
+    finally:
+        session.info["read_replica"], session.info["replica_changed_at"] = previous
 
 
 def setup_db(app):
     """
     setup_db(app)
         binds a flask application and a SQLAlchemy service
+            SQLALCHEMY_DATABASE_URI defaults to the bundled sqlite database
+            SQLALCHEMY_ENGINE_OPTIONS is passed to create_engine (pool size, recycle, pre-ping...)
+            SQLITE_PRAGMAS are applied to every new sqlite connection
+            SQLALCHEMY_REPLICA_BINDS name the SQLALCHEMY_BINDS used by read_replica()
+        it should create the engine right away and raise a ConfigError if it cannot work
     """
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_path
-    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    if not app.config.get("SQLALCHEMY_DATABASE_URI"):
+        app.config["SQLALCHEMY_DATABASE_URI"] = database_path
+    app.config.setdefault("SQLALCHEMY_TRACK_MODIFICATIONS", False)
     db.app = app
     db.init_app(app)
 
+    binds = [None, *(app.config.get("SQLALCHEMY_BINDS") or {})]
+    unknown_replicas = set(app.config.get("SQLALCHEMY_REPLICA_BINDS") or ()) - set(
+        binds
+    )
+    if unknown_replicas:
+        raise ConfigError(
+            f"replica binds {unknown_replicas} are not in SQLALCHEMY_BINDS"
+        )
+
+    with app.app_context():
+        for bind in binds:
+            try:
+                engine = db.get_engine(app, bind=bind)
+            except (ArgumentError, ImportError, TypeError) as error:
+                raise ConfigError(f"invalid database configuration: {error}") from error
+
+            validate_database_config(app.config, engine.dialect.name)
+            if engine.dialect.name == "sqlite":
+                pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+                event.listen(engine, "connect", partial(set_sqlite_pragmas, pragmas))
+
+
+def set_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    """
+    set_sqlite_pragmas(pragmas, dbapi_connection, connection_record)
+        a "connect" event listener running PRAGMA name=value for each pragma
+    """
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
 
 def db_drop_and_create_all():
     """
@@ -35,6 +158,37 @@ def db_drop_and_create_all():
     db.create_all()
 
 
+def db_migrate():
+    """
+    db_migrate()
+        upgrades the tables of an existing database in place, it is safe to run repeatedly
+            drink.recipe: json text in a VARCHAR(180) -> native JSON column
+                sqlite needs no change, its JSON type is stored as text and parsed on load
+            drink.version: added, existing drinks start at version 1
+    """
+    engine = db.get_engine()
+    columns = {
+        column["name"]: column for column in inspect(engine).get_columns("drink")
+    }
+
+    statements = []
+    if not isinstance(columns["recipe"]["type"], JSON):
+        statements.append(
+            {
+                "postgresql": "ALTER TABLE drink ALTER COLUMN recipe TYPE JSON USING recipe::json",
+                "mysql": "ALTER TABLE drink MODIFY recipe JSON NOT NULL",
+            }.get(engine.dialect.name)
+        )
+    if "version" not in columns:
+        statements.append(
+            "ALTER TABLE drink ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+        )
+
+    with engine.begin() as connection:
+        for statement in filter(None, statements):
+            connection.execute(statement)
+
+
 class Drink(db.Model):
     """
     Drink
@@ -46,9 +200,15 @@ class Drink(db.Model):
     # String Title
     title = Column(String(80), unique=True)
 
-    # the ingredients blob - this stores a lazy json blob
+    # the ingredients - a native json column, parsed once when the row is loaded
     # the required datatype is [{'color': string, 'name':string, 'parts':number}]
-    recipe = Column(String(180), nullable=False)
+    recipe = Column(JSON, nullable=False)
+
+    # bumped by every update, an UPDATE or DELETE of an older version matches no row
+    # and raises StaleDataError instead of overwriting a concurrent change
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
 
     def insert(self):
         """
@@ -84,7 +244,8 @@ class Drink(db.Model):
             drink = Drink.query.filter(Drink.id == id).one_or_none()
             drink.update({title='Black Coffee'})
         """
-        db.session.query(Drink).filter(Drink.id == self.id).update(data)
+        for key, value in data.items():
+            setattr(self, key, value)
         db.session.commit()
 
     def __repr__(self):
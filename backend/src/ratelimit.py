@@ -0,0 +1,198 @@
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import request
+from werkzeug.exceptions import TooManyRequests
+
+from .config import ConfigError
+
+PERIODS = dict(second=1, minute=60, hour=3600, day=86400)
+
+Rate = namedtuple("Rate", ["limit", "period"])
+
+
+def parse_rate(value):
+    """
+    parse_rate(value)
+        @INPUTS
+            value: "<limit>/<second|minute|hour|day>", e.g. "60/minute", or None
+
+        it should raise a ConfigError for malformed values
+        return a Rate, or None when value is empty
+    """
+    if not value:
+        return None
+    if isinstance(value, Rate):
+        return value
+    try:
+        limit, period = value.split("/")
+        rate = Rate(int(limit), PERIODS[period.strip()])
+    except (KeyError, ValueError):
+        raise ConfigError(f"invalid rate limit {value!r}, expected e.g. 60/minute")
+    if rate.limit < 1:
+        raise ConfigError(f"invalid rate limit {value!r}, the limit must be positive")
+    return rate
+
+
+# Limiter Stores
+class MemoryStore:
+    """
+    MemoryStore(maxsize=10000)
+    the default in-process token bucket store, the least recently used buckets are dropped
+    """
+
+    def __init__(self, maxsize=10000, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, cost=1):
+        """
+        take(key, rate, cost=1)
+            it should refill the bucket at rate.limit tokens per rate.period, up to rate.limit
+            it should take cost tokens if there are enough, cost=0 only checks for one token
+            return (allowed, retry_after) where retry_after is in seconds
+        """
+        now = self.clock()
+        refill = rate.limit / rate.period
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (rate.limit, now))
+            tokens = min(rate.limit, tokens + (now - updated_at) * refill)
+
+            needed = cost or 1
+            allowed = tokens >= needed
+            if allowed:
+                tokens -= cost
+
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+
+        return allowed, 0 if allowed else (needed - tokens) / refill
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisStore:
+    """
+    RedisStore(client)
+    a token bucket store shared between processes, updated atomically by a lua script
+        client: any object with the redis-py eval method
+        prefix: namespace prepended to every key
+    """
+
+    script = """
+    local limit = tonumber(ARGV[1])
+    local period = tonumber(ARGV[2])
+    local cost = tonumber(ARGV[3])
+    local now = tonumber(ARGV[4])
+    local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+    local tokens = tonumber(bucket[1]) or limit
+    local updated_at = tonumber(bucket[2]) or now
+    local refill = limit / period
+    tokens = math.min(limit, tokens + math.max(0, now - updated_at) * refill)
+    local needed = math.max(cost, 1)
+    local allowed = tokens >= needed
+    if allowed then
+        tokens = tokens - cost
+    end
+    redis.call("HSET", KEYS[1], "tokens", tokens, "updated_at", now)
+    redis.call("EXPIRE", KEYS[1], math.ceil(period))
+    if allowed then
+        return {1, "0"}
+    end
+    return {0, tostring((needed - tokens) / refill)}
+    """
+
+    def __init__(self, client, prefix="coffee-shop:ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key, rate, cost=1):
+        allowed, retry_after = self.client.eval(
+            self.script,
+            1,
+            self.prefix + key,
+            rate.limit,
+            rate.period,
+            cost,
+            time.time(),
+        )
+        return bool(allowed), float(retry_after)
+
+    def clear(self):
+        pass
+
+
+class RateLimiter:
+    """
+    RateLimiter
+    token bucket admission control, answering 429 Too Many Requests with Retry-After
+        every request takes a token from its client ip bucket before any other work
+        authenticated requests take a token from the bucket of their jwt sub and permission
+        failed authentications take a token from the client ip auth bucket,
+        once it is empty tokens are refused without being verified
+
+    app.config
+        RATE_LIMIT_STORE: a MemoryStore (default) or RedisStore instance
+        RATE_LIMIT_PER_IP: e.g. "600/minute", empty disables
+        RATE_LIMIT_AUTH_FAILURES: failed authentications allowed per client ip
+        RATE_LIMIT_PERMISSIONS: {permission: rate} budgets per jwt sub,
+            "default" applies to the other permissions
+    """
+
+    def __init__(self):
+        self.store = MemoryStore()
+        self.per_ip = None
+        self.auth_failures = None
+        self.permissions = {}
+
+    def init_app(self, app):
+        self.store = app.config.get("RATE_LIMIT_STORE") or MemoryStore()
+        self.store.clear()
+        self.per_ip = parse_rate(app.config.get("RATE_LIMIT_PER_IP"))
+        self.auth_failures = parse_rate(app.config.get("RATE_LIMIT_AUTH_FAILURES"))
+        self.permissions = {
+            permission: parse_rate(rate)
+            for permission, rate in (
+                app.config.get("RATE_LIMIT_PERMISSIONS") or {}
+            ).items()
+        }
+
+        if self.per_ip:
+            app.before_request(self.limit_client)
+
+    def hit(self, key, rate, cost=1):
+        """
+        hit(key, rate, cost=1)
+            it should raise TooManyRequests, with the seconds to wait, once the bucket is empty
+        """
+        if rate is None:
+            return
+        allowed, retry_after = self.store.take(key, rate, cost)
+        if not allowed:
+            raise TooManyRequests(retry_after=max(1, math.ceil(retry_after)))
+
+    def limit_client(self):
+        self.hit(f"ip:{request.remote_addr}", self.per_ip)
+
+    def check_auth_failures(self):
+        self.hit(f"auth:{request.remote_addr}", self.auth_failures, cost=0)
+
+    def record_auth_failure(self):
+        if self.auth_failures is not None:
+            self.store.take(f"auth:{request.remote_addr}", self.auth_failures)
+
+    def limit_subject(self, payload, permission):
+        rate = self.permissions.get(permission, self.permissions.get("default"))
+        subject = payload.get("sub") if isinstance(payload, dict) else None
+        if rate is not None and subject:
+            self.hit(f"sub:{subject}:{permission}", rate)
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,188 @@
+"""
+recipe validation, shared by the single and bulk drink writes (see src.serializers.DrinkSchema)
+"""
+import re
+from functools import lru_cache
+
+INGREDIENT_FIELDS = frozenset(("color", "name", "parts"))
+
+# the named colors of CSS Color Module Level 4, the frontend paints them as is
+CSS_COLOR_NAMES = frozenset(
+    """
+    aliceblue antiquewhite aqua aquamarine azure beige bisque black blanchedalmond
+    blue blueviolet brown burlywood cadetblue chartreuse chocolate coral
+    cornflowerblue cornsilk crimson cyan darkblue darkcyan darkgoldenrod darkgray
+    darkgreen darkgrey darkkhaki darkmagenta darkolivegreen darkorange darkorchid
+    darkred darksalmon darkseagreen darkslateblue darkslategray darkslategrey
+    darkturquoise darkviolet deeppink deepskyblue dimgray dimgrey dodgerblue
+    firebrick floralwhite forestgreen fuchsia gainsboro ghostwhite gold goldenrod
+    gray green greenyellow grey honeydew hotpink indianred indigo ivory khaki
+    lavender lavenderblush lawngreen lemonchiffon lightblue lightcoral lightcyan
+    lightgoldenrodyellow lightgray lightgreen lightgrey lightpink lightsalmon
+    lightseagreen lightskyblue lightslategray lightslategrey lightsteelblue
+    lightyellow lime limegreen linen magenta maroon mediumaquamarine mediumblue
+    mediumorchid mediumpurple mediumseagreen mediumslateblue mediumspringgreen
+    mediumturquoise mediumvioletred midnightblue mintcream mistyrose moccasin
+    navajowhite navy oldlace olive olivedrab orange orangered orchid palegoldenrod
+    palegreen paleturquoise palevioletred papayawhip peachpuff peru pink plum
+    powderblue purple rebeccapurple red rosybrown royalblue saddlebrown salmon
+    sandybrown seagreen seashell sienna silver skyblue slateblue slategray slategrey
+    snow springgreen steelblue tan teal thistle tomato transparent turquoise violet
+    wheat white whitesmoke yellow yellowgreen
+    """.split()
+)
+
+_NUMBER = r"[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?"
+_PARTS = re.compile(_NUMBER)
+_HEX_COLOR = re.compile(r"#(?:[0-9a-fA-F]{3,4}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})")
+# rgb(0, 128, 255), rgba(0 128 255 / 50%), hsl(120deg 100% 50%)...
+_COMPONENT = rf"{_NUMBER}(?:%|deg|grad|rad|turn)?"
+_FUNCTION_COLOR = re.compile(
+    rf"(?:rgba?|hsla?)\(\s*{_COMPONENT}(?:(?:\s*,\s*|\s+){_COMPONENT}){{2}}"
+    rf"(?:\s*[,/]\s*{_COMPONENT})?\s*\)",
+    re.IGNORECASE,
+)
+
+
+def is_color(value):
+    """
+    is_color(value)
+        return True if value is a css color: a name, #hex, rgb(), rgba(), hsl() or hsla()
+    """
+    return isinstance(value, str) and _is_color(value)
+
+
+# a menu repeats the same few colors, each is parsed once
+@lru_cache(maxsize=1024)
+def _is_color(value):
+    if value.startswith("#"):
+        return _HEX_COLOR.fullmatch(value) is not None
+    if value.endswith(")"):
+        return _FUNCTION_COLOR.fullmatch(value) is not None
+    return value.lower() in CSS_COLOR_NAMES
+
+
+def is_parts(value):
+    """
+    is_parts(value)
+        return True if value is a positive number, or a string of one (i.e. "1", see parts_number)
+    """
+    if type(value) is int:
+        return value > 0
+    if isinstance(value, str):
+        if _PARTS.fullmatch(value) is None:
+            return False
+        value = float(value)
+    elif isinstance(value, bool) or not isinstance(value, (int, float)):
+        return False
+    # nan compares false, inf is not a quantity
+    return 0 < value < float("inf")
+
+
+def parts_number(value):
+    """
+    parts_number(value)
+        return the number of a valid numeric string (i.e. "1" -> 1, "0.5" -> 0.5),
+        any other value as is
+    """
+    if not isinstance(value, str) or not is_parts(value):
+        return value
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+def store_parts(recipe):
+    """
+    store_parts(recipe)
+        return the recipe with its numeric string parts converted to numbers,
+        the recipe itself when it has none, the invalid ones are left to recipe_errors
+    """
+    if isinstance(recipe, dict):
+        ingredients = [recipe]
+    elif isinstance(recipe, list):
+        ingredients = recipe
+    else:
+        return recipe
+    if not any(
+        isinstance(ingredient, dict) and isinstance(ingredient.get("parts"), str)
+        for ingredient in ingredients
+    ):
+        return recipe
+
+    stored = [
+        dict(ingredient, parts=parts_number(ingredient["parts"]))
+        if isinstance(ingredient, dict) and "parts" in ingredient
+        else ingredient
+        for ingredient in ingredients
+    ]
+    return stored[0] if isinstance(recipe, dict) else stored
+
+
+def is_ingredient(ingredient):
+    """
+    is_ingredient(ingredient)
+        return True if ingredient is valid, the fast path of ingredient_errors
+    """
+    return (
+        type(ingredient) is dict
+        and ingredient.keys() == INGREDIENT_FIELDS
+        and is_parts(ingredient["parts"])
+        and is_color(ingredient["color"])
+        and isinstance(ingredient["name"], str)
+        and ingredient["name"].strip() != ""
+    )
+
+
+def ingredient_errors(ingredient):
+    """
+    ingredient_errors(ingredient)
+        return the list of error messages of one ingredient, empty if it is valid
+    """
+    if is_ingredient(ingredient):
+        return []
+    if not isinstance(ingredient, dict):
+        return ["must be an object"]
+    if ingredient.keys() != INGREDIENT_FIELDS:
+        return [f"must have exactly the fields {', '.join(sorted(INGREDIENT_FIELDS))}"]
+
+    errors = []
+    name = ingredient["name"]
+    if not isinstance(name, str) or not name.strip():
+        errors.append("name must be a non empty string")
+    if not is_parts(ingredient["parts"]):
+        errors.append("parts must be a positive number")
+    if not is_color(ingredient["color"]):
+        errors.append("color must be a css color name, #hex, rgb() or hsl()")
+    return errors
+
+
+def recipe_errors(recipe):
+    """
+    recipe_errors(recipe)
+        @INPUTS
+            recipe: one ingredient (dict) or a list of ingredients, as parsed from the request
+
+        it should check every ingredient in one pass, without copying or converting the recipe
+            an ingredient has exactly the color, name and parts fields
+            its name is a non empty string
+            its parts a positive number, or a string of one (i.e. "1", stored as a number)
+            its color a css color name, #hex, rgb(), rgba(), hsl() or hsla()
+        it should prefix the errors of a list with the index of their ingredient
+        return the list of error messages, empty if the recipe is valid
+    """
+    if isinstance(recipe, dict):
+        return ingredient_errors(recipe)
+    if not isinstance(recipe, list):
+        return ["must be an ingredient or a list of ingredients"]
+    if not recipe:
+        return ["must have at least one ingredient"]
+
+    errors = []
+    for index, ingredient in enumerate(recipe):
+        # the messages are only built for the invalid ingredients
+        if not is_ingredient(ingredient):
+            errors.extend(
+                f"ingredient {index}: {error}"
+                for error in ingredient_errors(ingredient)
+            )
+    return errors
@@ -0,0 +1,175 @@
+import bisect
+import re
+import threading
+
+_token_pattern = re.compile(r"#?\w+")
+
+
+def tokenize(value):
+    """
+    tokenize(value)
+        return the lowercase words of value, hex colors keep their #
+    """
+    if not isinstance(value, str):
+        return []
+    return _token_pattern.findall(value.lower())
+
+
+def _ingredients(recipe):
+    if isinstance(recipe, dict):
+        return [recipe]
+    if isinstance(recipe, list):
+        return [ingredient for ingredient in recipe if isinstance(ingredient, dict)]
+    return []
+
+
+class PrefixIndex:
+    """
+    PrefixIndex
+    an inverted index from words to drink ids, searched by word prefix
+    """
+
+    def __init__(self):
+        self._postings = {}
+        self._words = []
+
+    def add(self, drink_id, words):
+        for word in words:
+            ids = self._postings.get(word)
+            if ids is None:
+                ids = self._postings[word] = set()
+                bisect.insort(self._words, word)
+            ids.add(drink_id)
+
+    def remove(self, drink_id, words):
+        for word in words:
+            ids = self._postings.get(word)
+            if ids is None:
+                continue
+            ids.discard(drink_id)
+            if not ids:
+                del self._postings[word]
+                del self._words[bisect.bisect_left(self._words, word)]
+
+    def match(self, prefix):
+        """
+        match(prefix)
+            return the ids of the drinks with a word starting with prefix
+        """
+        ids = set()
+        index = bisect.bisect_left(self._words, prefix)
+        while index < len(self._words) and self._words[index].startswith(prefix):
+            ids |= self._postings[self._words[index]]
+            index += 1
+        return ids
+
+
+class SearchIndex:
+    """
+    SearchIndex
+    an in-memory index of the drink titles, ingredient names and colors
+        it is stamped with the menu epoch and version it reflects (see src.caching.MenuCache)
+        writes in src.services apply their change and advance the stamp,
+        any other change (bulk imports, other processes) leaves it stale until rebuilt
+
+    it should match drinks having every word of q as a prefix of a title,
+    ingredient name or color word
+    it should match drinks having every word of each ingredient as a prefix of an ingredient name word
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clear()
+
+    def _clear(self):
+        self._documents = {}
+        self._terms = PrefixIndex()
+        self._ingredient_terms = PrefixIndex()
+        self.epoch = None
+        self.version = None
+
+    def is_current(self, epoch, version):
+        return self.epoch == epoch and self.version == version
+
+    def rebuild(self, rows, epoch, version):
+        """
+        rebuild(rows, epoch, version)
+            replaces the index with the (id, title, recipe) rows of the given menu version
+        """
+        with self._lock:
+            self._clear()
+            for drink_id, title, recipe in rows:
+                self._add(drink_id, title, recipe)
+            self.epoch, self.version = epoch, version
+
+    def add(self, drink_id, title, recipe, version):
+        """
+        add(drink_id, title, recipe, version)
+            indexes a created or updated drink, the write that produced version
+        """
+        with self._lock:
+            if self._advance(version):
+                self._remove(drink_id)
+                self._add(drink_id, title, recipe)
+
+    def remove(self, drink_id, version):
+        """
+        remove(drink_id, version)
+            drops a deleted drink, the write that produced version
+        """
+        with self._lock:
+            if self._advance(version):
+                self._remove(drink_id)
+
+    def search(self, q=None, ingredients=()):
+        """
+        search(q=None, ingredients=())
+            return the sorted ids of the matching drinks
+        """
+        queries = [(self._terms, word) for word in tokenize(q)]
+        for ingredient in ingredients:
+            queries.extend(
+                (self._ingredient_terms, word) for word in tokenize(ingredient)
+            )
+
+        with self._lock:
+            ids = None
+            for index, word in queries:
+                ids = index.match(word) if ids is None else ids & index.match(word)
+                if not ids:
+                    break
+        return sorted(ids or ())
+
+    def _advance(self, version):
+        # only a write directly after the indexed version can be applied in place
+        if self.version is None or version != self.version + 1:
+            self.version = None
+            return False
+        self.version = version
+        return True
+
+    def _add(self, drink_id, title, recipe):
+        ingredients = _ingredients(recipe)
+        ingredient_terms = {
+            word
+            for ingredient in ingredients
+            for word in tokenize(ingredient.get("name"))
+        }
+        terms = set(tokenize(title)) | ingredient_terms
+        terms.update(
+            word
+            for ingredient in ingredients
+            for word in tokenize(ingredient.get("color"))
+        )
+
+        self._documents[drink_id] = (terms, ingredient_terms)
+        self._terms.add(drink_id, terms)
+        self._ingredient_terms.add(drink_id, ingredient_terms)
+
+    def _remove(self, drink_id):
+        terms, ingredient_terms = self._documents.pop(drink_id, ((), ()))
+        self._terms.remove(drink_id, terms)
+        self._ingredient_terms.remove(drink_id, ingredient_terms)
+
+
+search_index = SearchIndex()
@@ -1,9 +1,23 @@
-import json
+from collections import namedtuple
+from functools import lru_cache
 
+from flask import current_app, jsonify
 from flask_marshmallow import Marshmallow
 from marshmallow import EXCLUDE, ValidationError, fields, validates
 
+from .config import ConfigError
 from .models import Drink
+from .recipes import recipe_errors, store_parts
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover - ujson is optional
+    ujson = None
 
 ma = Marshmallow()
 
@@ -13,46 +27,159 @@ class DrinkSchema(ma.SQLAlchemyAutoSchema):
         model = Drink
         include_fk = True
         unknown = EXCLUDE
+        # the version is sent as the drink's ETag (see src.caching.drink_etag)
+        exclude = ("version",)
 
     id = ma.auto_field(dump_only=True)
     title = ma.auto_field(required=True)
     recipe = fields.Method("get_recipe", deserialize="store_recipe", required=True)
 
     def get_recipe(self, obj):
-        full_recipe = json.loads(obj.recipe)
-        return full_recipe
+        return obj.recipe
 
     def store_recipe(self, value):
-        return json.dumps(value)
+        # numeric string parts are stored as numbers, readers always get one type
+        return store_parts(value)
 
     @validates("recipe")
     def validate_recipe(self, value):
-        def validate_ingredient(ingredient):
-            incoming_fields = sorted(ingredient.keys())
-            required_fields = ["color", "name", "parts"]
-            if required_fields != incoming_fields:
-                raise ValidationError("invalid recipe")
-
-        try:
-            incoming_recipe = json.loads(value)
-        except json.JSONDecodeError as exec:
-            raise ValidationError("invalid recipe")
-
-        map(validate_ingredient, incoming_recipe)
+        errors = recipe_errors(value)
+        if errors:
+            raise ValidationError(errors)
 
 
 drink_schema = DrinkSchema()
 drinks_schema = DrinkSchema(many=True)
 
 
+def brief_recipe(recipe):
+    """
+    brief_recipe(recipe)
+        return the recipe without the ingredient names
+    """
+
+    def brief_ingredient(ingredient):
+        return dict(
+            color=ingredient.get("color", ""), parts=ingredient.get("parts", "")
+        )
+
+    if isinstance(recipe, dict):
+        return brief_ingredient(recipe)
+    return [brief_ingredient(ingredient) for ingredient in recipe]
+
+
 class DrinkBriefSchema(DrinkSchema):
     def get_recipe(self, obj):
-        full_recipe = json.loads(obj.recipe)
-        return [
-            dict(color=ingredient.get("color", ""), parts=ingredient.get("parts", ""))
-            for ingredient in full_recipe
-        ]
+        return brief_recipe(obj.recipe)
 
 
 drink_brief_schema = DrinkBriefSchema()
 drinks_brief_schema = DrinkBriefSchema(many=True)
+
+
+# Projections
+# the dump of each schema as one converter per column, None keeps the value as is
+PROJECTIONS = {
+    DrinkSchema: dict(id=None, title=None, recipe=None),
+    DrinkBriefSchema: dict(id=None, title=None, recipe=brief_recipe),
+}
+
+Projection = namedtuple("Projection", ["columns", "dump"])
+
+
+def get_projection(schema_class, only=None):
+    """
+    get_projection(schema_class, only=None)
+        @INPUTS
+            schema_class: DrinkSchema or DrinkBriefSchema
+            only: the fields to dump, all of them by default
+
+        it should dump rows of plain column tuples exactly as schema_class dumps models
+        it should compile the dump once per schema and set of fields
+            only is reduced to its distinct fields in the schema's order first,
+            so requested duplicates or orderings share one compiled dump
+        return a Projection of the columns to select (id first) and the dump(rows) function
+    """
+    if only is not None:
+        only = tuple(name for name in PROJECTIONS[schema_class] if name in only)
+        if len(only) == len(PROJECTIONS[schema_class]):
+            only = None
+    return _compile_projection(schema_class, only)
+
+
+@lru_cache(maxsize=None)
+def _compile_projection(schema_class, only):
+    converters = PROJECTIONS[schema_class]
+    names = list(converters if only is None else only)
+    columns = ("id",) + tuple(name for name in names if name != "id")
+
+    namespace = {}
+    items = []
+    for name in names:
+        value = f"row[{columns.index(name)}]"
+        if converters[name] is not None:
+            namespace[f"convert_{name}"] = converters[name]
+            value = f"convert_{name}({value})"
+        items.append(f"{name!r}: {value}")
+
+    source = f"def dump(rows):\n    return [{{{', '.join(items)}}} for row in rows]\n"
+    exec(compile(source, f"<projection {schema_class.__name__}>", "exec"), namespace)
+    return Projection(columns, namespace["dump"])
+
+
+# JSON Backends
+JSON_BACKENDS = dict(
+    orjson=lambda body: orjson.dumps(body, option=orjson.OPT_SORT_KEYS),
+    ujson=lambda body: ujson.dumps(
+        body, sort_keys=True, ensure_ascii=False, escape_forward_slashes=False
+    ).encode(),
+)
+
+
+def validate_json_backend(config):
+    """
+    validate_json_backend(config)
+        it should raise a ConfigError if JSON_BACKEND is unknown or not installed
+    """
+    backend = config.get("JSON_BACKEND") or "json"
+    if backend == "json":
+        return
+    if backend not in JSON_BACKENDS:
+        raise ConfigError(f"unknown JSON_BACKEND {backend}")
+    if globals()[backend] is None:
+        raise ConfigError(f"JSON_BACKEND {backend} is not installed")
+
+
+def get_json_dumps():
+    """
+    get_json_dumps()
+        return a function encoding one value as compact json bytes, as jsonify would,
+        with the app.config["JSON_BACKEND"] encoder
+    """
+    backend = current_app.config.get("JSON_BACKEND") or "json"
+    if backend != "json":
+        return JSON_BACKENDS[backend]
+
+    # flask.json.dumps builds an encoder per call, build it once with the same settings
+    encoder = current_app.json_encoder(
+        separators=(",", ":"),
+        ensure_ascii=current_app.config["JSON_AS_ASCII"],
+        sort_keys=current_app.config["JSON_SORT_KEYS"],
+    )
+    return lambda value: encoder.encode(value).encode()
+
+
+def json_response(body):
+    """
+    json_response(body)
+        return the body as a json response, encoded by app.config["JSON_BACKEND"]
+            json (default) is flask's jsonify, orjson and ujson are optional
+    """
+    backend = current_app.config.get("JSON_BACKEND") or "json"
+    if backend == "json":
+        return jsonify(body)
+
+    return current_app.response_class(
+        JSON_BACKENDS[backend](body) + b"\n",
+        mimetype=current_app.config["JSONIFY_MIMETYPE"],
+    )
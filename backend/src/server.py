@@ -0,0 +1,398 @@
+"""
+python -m src.server [--bind HOST:PORT] [--workers N] [--threads N] [--config MODULE:NAME]
+
+a preforking server for the flask application
+    the master process binds the listening socket and builds the application once,
+    then forks SERVER_WORKERS workers that accept connections on the shared socket
+    and handle them in a pool of SERVER_THREADS threads each
+    more than one worker needs the menu state shared between them (see check_workers),
+    --config names the settings object or dict, passed to create_app, that provides it
+
+signals (to the master)
+    SIGTERM, SIGINT: stop, workers finish their requests first
+    SIGHUP: graceful reload, the settings are read again and a new generation of
+        workers replaces the old one, which finishes its requests before leaving
+"""
+import argparse
+import importlib
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import configure_mappers
+from werkzeug.serving import BaseWSGIServer
+
+from src.api import create_app
+from src.auth.auth import get_auth_settings, get_key_store, reset_key_store
+from src.caching import DictCache
+from src.changes import LocalPubSub, changes
+from src.config import Config, ConfigError, load_environment
+from src.models import db
+from src.ratelimit import MemoryStore
+from src.serializers import DrinkBriefSchema, DrinkSchema, get_projection
+
+logger = logging.getLogger(__name__)
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """
+    PooledWSGIServer(host, port, app, threads=8, fd=None)
+    a werkzeug server handling each connection in a bounded pool of threads
+        fd: an already listening socket to accept on, shared by every worker
+    """
+
+    multithread = True
+    multiprocess = True
+
+    def __init__(self, host, port, app, threads=8, fd=None, **kwargs):
+        super().__init__(host, port, app, fd=fd, **kwargs)
+        # the socket is shared, a worker woken for a connection another one
+        # accepted first must not block in accept()
+        self.socket.setblocking(False)
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix="worker"
+        )
+
+    def get_request(self):
+        request, client_address = super().get_request()
+        request.setblocking(True)
+        return request, client_address
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+
+
+def parse_bind(value):
+    """
+    parse_bind(value)
+        return (host, port) from "host:port", "[ipv6]:port" or ":port"
+        it should raise a ConfigError for malformed values
+    """
+    host, _, port = value.rpartition(":")
+    try:
+        port = int(port)
+    except ValueError:
+        raise ConfigError(f"invalid bind address {value!r}, expected host:port")
+    return host.strip("[]") or "0.0.0.0", port
+
+
+def bind_socket(host, port, backlog=2048):
+    """
+    bind_socket(host, port, backlog=2048)
+        return a listening socket the forked workers inherit
+    """
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def load_config(path):
+    """
+    load_config(path)
+        return the object named by "package.module:name"
+        it should raise a ConfigError if it cannot be imported
+    """
+    module_name, _, name = path.partition(":")
+    try:
+        return getattr(importlib.import_module(module_name), name)
+    except (ImportError, AttributeError, ValueError) as error:
+        raise ConfigError(f"cannot load the settings {path!r}: {error}")
+
+
+def check_workers(app, workers):
+    """
+    check_workers(app, workers)
+        it should raise a ConfigError if several workers would each keep their own menu state
+            MENU_CACHE_BACKEND holds the menu version, every write bumps it: a worker with
+                its own DictCache serves its stale listings and 304s after another one's write
+            IDEMPOTENCY_BACKEND (the menu cache backend by default) holds the stored replies
+            CHANGES_BACKEND delivers the change events to the feeds of every worker
+            RATE_LIMIT_STORE holds the token buckets, when any budget is set: with its own
+                MemoryStore each worker would grant the whole budget again
+    """
+    if workers <= 1:
+        return
+
+    config = app.config
+    backends = [
+        ("MENU_CACHE_BACKEND", config.get("MENU_CACHE_BACKEND"), DictCache),
+        (
+            "IDEMPOTENCY_BACKEND",
+            config.get("IDEMPOTENCY_BACKEND") or config.get("MENU_CACHE_BACKEND"),
+            DictCache,
+        ),
+        ("CHANGES_BACKEND", config.get("CHANGES_BACKEND"), LocalPubSub),
+    ]
+    if (
+        config.get("RATE_LIMIT_PER_IP")
+        or config.get("RATE_LIMIT_AUTH_FAILURES")
+        or any((config.get("RATE_LIMIT_PERMISSIONS") or {}).values())
+    ):
+        backends.append(
+            ("RATE_LIMIT_STORE", config.get("RATE_LIMIT_STORE"), MemoryStore)
+        )
+
+    unshared = [
+        name
+        for name, value, local in backends
+        if value is None or isinstance(value, local)
+    ]
+    if unshared:
+        raise ConfigError(
+            f"{workers} workers need a shared {', '.join(unshared)} "
+            "(e.g. RedisCache, RedisPubSub, RedisStore) set with --config, or --workers 1"
+        )
+
+
+def get_engines(app):
+    with app.app_context():
+        return [
+            db.get_engine(app, bind=bind)
+            for bind in [None, *(app.config.get("SQLALCHEMY_BINDS") or {})]
+        ]
+
+
+def preload(config=None):
+    """
+    preload(config=None)
+        return the application built and warmed up in the master, before forking
+            the mappers and the listing projections are compiled
+            every database is connected to once, then the pools are emptied
+                so no connection is shared between processes
+            the JWKS is fetched and its public keys built (python-jose is imported then),
+                its background refresh restarts in each worker
+    """
+    app = create_app(config)
+    configure_mappers()
+    for schema_class in (DrinkBriefSchema, DrinkSchema):
+        get_projection(schema_class)
+
+    for engine in get_engines(app):
+        engine.connect().close()
+        engine.dispose()
+
+    algorithm = get_auth_settings().algorithm
+    key_store = get_key_store()
+    if not key_store.refresh(force=True):
+        logger.warning("could not fetch the JWKS from %s", key_store.url)
+    for kid in key_store.keys:
+        key_store.get_public_key(kid, algorithm)
+    key_store.close()
+    return app
+
+
+def post_fork(app):
+    """
+    post_fork(app)
+        resets, in a new worker, the state that does not survive a fork
+    """
+    for engine in get_engines(app):
+        engine.dispose()
+    get_key_store().after_fork()
+    changes.init_app(app)
+
+
+def run_worker(app, sock, threads):
+    """
+    run_worker(app, sock, threads)
+        serves app on the shared socket until SIGTERM, then finishes the requests in flight
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    post_fork(app)
+
+    host, port = sock.getsockname()[:2]
+    server = PooledWSGIServer(host, port, app, threads=threads, fd=sock.fileno())
+
+    def stop(signum, frame):
+        # shutdown() waits for serve_forever, which runs in this (the main) thread
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, stop)
+    server.serve_forever()
+
+
+class Arbiter:
+    """
+    Arbiter(sock, workers, threads, graceful_timeout=30, config=None)
+    the master process, keeps `workers` workers running and reloads them on SIGHUP
+    """
+
+    def __init__(self, sock, workers, threads, graceful_timeout=30, config=None):
+        self.sock = sock
+        self.workers = workers
+        self.threads = threads
+        self.graceful_timeout = graceful_timeout
+        self.config = config
+
+        self.app = None
+        self.children = {}
+        self.retiring = {}
+        self._signals = []
+
+    def run(self):
+        self.app = preload(self.config)
+        check_workers(self.app, self.workers)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+
+        self.spawn()
+        while True:
+            self.reap()
+            while self._signals:
+                signum = self._signals.pop(0)
+                if signum == signal.SIGHUP:
+                    self.reload()
+                else:
+                    return self.stop()
+            self.spawn()
+            self.kill_late()
+            time.sleep(0.1)
+
+    def spawn(self):
+        while len(self.children) < self.workers:
+            pid = os.fork()
+            if pid == 0:
+                status = 0
+                try:
+                    run_worker(self.app, self.sock, self.threads)
+                except Exception:
+                    logger.exception("worker %d failed", os.getpid())
+                    status = 1
+                finally:
+                    os._exit(status)
+            self.children[pid] = None
+            logger.info("booted worker %d", pid)
+
+    def reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+            if self.children.pop(pid, 1) is None:
+                logger.warning("worker %d exited with status %d", pid, status)
+            self.retiring.pop(pid, None)
+
+    def retire(self, pids):
+        deadline = time.monotonic() + self.graceful_timeout
+        for pid in pids:
+            self.children.pop(pid, None)
+            self.retiring[pid] = deadline
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.retiring.pop(pid)
+
+    def kill_late(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if deadline <= now:
+                logger.warning("worker %d did not stop in time, killing it", pid)
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                self.retiring[pid] = float("inf")
+
+    def reload(self):
+        """
+        reload()
+            reads the settings again, starts new workers, then retires the old ones
+            it should keep the current workers running if the new settings do not load
+        """
+        logger.info("reloading")
+        load_environment(override=True)
+        reset_key_store()
+        try:
+            app = preload(self.config)
+            check_workers(app, self.workers)
+        except Exception:
+            logger.exception("reload failed, the current workers keep running")
+            return
+
+        old = list(self.children)
+        self.app = app
+        self.children = {}
+        self.spawn()
+        self.retire(old)
+
+    def stop(self):
+        logger.info("stopping")
+        self.retire(list(self.children))
+        while self.retiring:
+            self.reap()
+            self.kill_late()
+            time.sleep(0.1)
+        self.sock.close()
+
+
+def main(argv=None):
+    settings = Config()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bind", default=settings.SERVER_BIND)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS)
+    parser.add_argument("--threads", type=int, default=settings.SERVER_THREADS)
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=settings.SERVER_GRACEFUL_TIMEOUT
+    )
+    parser.add_argument(
+        "--config",
+        default=settings.SERVER_CONFIG,
+        help="settings object or dict passed to create_app, as package.module:name",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO, format="[%(process)d] %(levelname)s %(message)s"
+    )
+    try:
+        config = load_config(args.config) if args.config else None
+        host, port = parse_bind(args.bind)
+    except ConfigError as error:
+        parser.error(str(error))
+
+    sock = bind_socket(host, port)
+    logger.info(
+        "listening on %s:%d, %d workers of %d threads",
+        *sock.getsockname()[:2],
+        args.workers,
+        args.threads,
+    )
+
+    arbiter = Arbiter(
+        sock, args.workers, args.threads, args.graceful_timeout, config=config
+    )
+    try:
+        arbiter.run()
+    except ConfigError as error:
+        logger.error("%s", error)
+        sock.close()
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,222 @@
-from .models import Drink
+import bisect
+import logging
+from itertools import islice
 
+from sqlalchemy import exc, func
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.exc import StaleDataError
 
-def get_all_drinks():
-    all_drinks = Drink.query.all()
+from .caching import menu_cache
+from .changes import changes
+from .instrumentation import timed
+from .models import Drink, db, read_replica
+from .search import search_index
+from .serializers import DrinkBriefSchema, get_projection
+
+logger = logging.getLogger(__name__)
+
+
+def brief_drink(drink):
+    """
+    brief_drink(drink)
+        return the public representation of drink, as listed by GET /drinks
+    """
+    projection = get_projection(DrinkBriefSchema)
+    return projection.dump([(drink.id, drink.title, drink.recipe)])[0]
+
+
+def menu_replica():
+    """
+    menu_replica()
+        read_replica() for reads of the menu
+            every worker bumps the shared menu version on commit, the reads stay on the
+            primary while a replica may lag behind that change, so that no payload is
+            stamped with the new version but rendered from the previous menu
+    """
+    return read_replica(menu_cache.state().last_modified.timestamp())
+
+
+@timed("db")
+def get_all_drinks(limit=None, after=None, fields=None):
+    query = Drink.query.order_by(Drink.id)
+    if fields:
+        query = query.options(load_only(*fields))
+    if after is not None:
+        query = query.filter(Drink.id > after)
+    if limit is not None:
+        query = query.limit(limit)
+
+    with menu_replica():
+        all_drinks = query.all()
     return all_drinks
 
 
-def get_drink(drink_id):
-    drink = Drink.query.filter_by(id=drink_id).one_or_none()
+@timed("db")
+def get_drink_rows(columns, limit=None, after=None, ids=None, chunk_size=500):
+    """
+    get_drink_rows(columns, limit=None, after=None, ids=None, chunk_size=500)
+        return the column tuples of the drinks ordered by id
+        ids: sorted drink ids to select only, fetched chunk_size at a time
+    """
+    if ids is not None:
+        ids = ids[bisect.bisect_right(ids, after) :] if after is not None else ids
+        ids, after, limit = ids[:limit], None, None
+        if not ids:
+            return []
+
+    query = db.session.query(*[getattr(Drink, column) for column in columns])
+    query = query.order_by(Drink.id)
+    if after is not None:
+        query = query.filter(Drink.id > after)
+    if limit is not None:
+        query = query.limit(limit)
+
+    with menu_replica():
+        if ids is None:
+            return query.all()
+        rows = []
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start : start + chunk_size]
+            rows.extend(query.filter(Drink.id.in_(chunk)))
+    return rows
+
+
+def iter_drink_batches(columns, after=None, batch_size=500):
+    """
+    iter_drink_batches(columns, after=None, batch_size=500)
+        yield lists of at most batch_size column tuples, ordered by id,
+        fetched through a server side cursor where the database supports one
+    """
+    query = db.session.query(*[getattr(Drink, column) for column in columns])
+    query = query.order_by(Drink.id)
+    if after is not None:
+        query = query.filter(Drink.id > after)
+
+    with menu_replica():
+        rows = iter(query.yield_per(batch_size))
+        batch = list(islice(rows, batch_size))
+        while batch:
+            yield batch
+            batch = list(islice(rows, batch_size))
+
+
+@timed("db")
+def get_existing_titles(titles, chunk_size=500):
+    titles = list(titles)
+    existing = set()
+    for start in range(0, len(titles), chunk_size):
+        chunk = titles[start : start + chunk_size]
+        rows = db.session.query(Drink.title).filter(Drink.title.in_(chunk))
+        existing.update(title for title, in rows)
+    return existing
+
+
+@timed("db")
+def search_drinks(q=None, ingredients=()):
+    """
+    search_drinks(q=None, ingredients=())
+        it should rebuild the search index when it does not reflect the current menu version
+        return the sorted ids of the matching drinks (see src.search.SearchIndex)
+    """
+    state = menu_cache.state()
+    if not search_index.is_current(state.epoch, state.version):
+        rows = [
+            row
+            for batch in iter_drink_batches(("id", "title", "recipe"))
+            for row in batch
+        ]
+        search_index.rebuild(rows, state.epoch, state.version)
+    return search_index.search(q, ingredients)
+
+
+@timed("db")
+def count_drinks():
+    with menu_replica():
+        return db.session.query(func.count(Drink.id)).scalar()
+
+
+@timed("db")
+def get_drink(drink_id, for_update=False):
+    query = Drink.query.filter_by(id=drink_id)
+    if for_update:
+        return query.one_or_none()
+
+    with menu_replica():
+        drink = query.one_or_none()
     return drink
 
 
+def menu_changed(type, drink):
+    """
+    menu_changed(type, drink)
+        bumps the menu version and publishes the change of a committed write (see ChangeFeed.publish)
+        it should log a failure of the cache or pub/sub backend instead of raising it:
+            the write is committed, an error would make the client retry a write that stands
+        return the new version, or None if it could not be bumped
+    """
+    try:
+        version = menu_cache.bump()
+    except Exception:
+        logger.exception("could not bump the menu version after a %s change", type)
+        return None
+    try:
+        changes.publish(type, version, drink)
+    except Exception:
+        logger.exception("could not publish the %s change of version %d", type, version)
+    return version
+
+
+@timed("db")
 def add_drink(payload):
     drink = Drink(**payload)
-    drink.insert()
-    return drink.id
+    try:
+        drink.insert()
+    except exc.IntegrityError:
+        db.session.rollback()
+        raise
+    # a None version drops the search index, it is rebuilt on the next search
+    version = menu_changed("created", brief_drink(drink))
+    search_index.add(drink.id, drink.title, drink.recipe, version)
+    return drink
 
 
+@timed("db")
+def add_drinks(payloads):
+    try:
+        db.session.bulk_insert_mappings(Drink, payloads)
+        db.session.commit()
+    except exc.IntegrityError:
+        db.session.rollback()
+        raise
+    menu_changed("reloaded", None)
+    return len(payloads)
+
+
+@timed("db")
 def update_drink(instance, payload):
-    instance.update(payload)
+    # values equal to the stored ones issue no UPDATE, the drink and the menu keep
+    # their versions, and the rendered payloads stay valid
+    if all(getattr(instance, key) == value for key, value in payload.items()):
+        return instance
+
+    # the UPDATE is conditional on the version the instance was loaded at
+    try:
+        instance.update(payload)
+    except (exc.IntegrityError, StaleDataError):
+        db.session.rollback()
+        raise
+    version = menu_changed("updated", brief_drink(instance))
+    search_index.add(instance.id, instance.title, instance.recipe, version)
     return instance
 
 
+@timed("db")
 def delete_drink(instance):
-    instance.delete()
+    try:
+        instance.delete()
+    except StaleDataError:
+        db.session.rollback()
+        raise
+    version = menu_changed("deleted", dict(id=instance.id))
+    search_index.remove(instance.id, version)
     return True
@@ -1,15 +1,19 @@
-from os import getenv
+from contextlib import contextmanager
 
 import pytest
-import requests
-from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
 from src.api import create_app, db_drop_and_create_all
+from src.auth.auth import reset_key_store, token_cache
+from src.auth.constants import Permissions
+from src.auth.local import LocalAuthority
+from src.config import load_environment
 from src.models import Drink
 
 from .factories import DrinkFactory
 
-load_dotenv()
+load_environment()
 
 
 @pytest.fixture
@@ -19,25 +23,61 @@ def app():
     return app
 
 
-@pytest.fixture(scope="module")
-def jwt_token():
-    auth_domain = getenv("AUTH0_DOMAIN")
-    auth_audience = getenv("AUTH0_API_AUDIENCE")
-    client_id = getenv("AUTH0_CLIENT_ID")
-    client_secret = getenv("AUTH0_CLIENT_SECRET")
-
-    response = requests.post(
-        f"{auth_domain}/oauth/token",
-        dict(
-            client_id=client_id,
-            client_secret=client_secret,
-            audience=auth_audience,
-            grant_type="client_credentials",
-        ),
-    )
+@pytest.fixture
+def assert_num_queries():
+    """
+    assert_num_queries(expected)
+        a context manager asserting that exactly `expected` sql statements run inside it
+        yields the list of executed statements
+    """
+
+    @contextmanager
+    def assert_num_queries(expected):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+        assert len(statements) == expected, statements
+
+    return assert_num_queries
+
 
-    token = response.json().get("access_token", None)
-    return token
+@pytest.fixture(scope="session")
+def local_authority():
+    return LocalAuthority()
+
+
+@pytest.fixture
+def authority(local_authority, monkeypatch):
+    """
+    the offline token authority (see src.auth.local), trusted by verify_decode_jwt for one test
+    """
+    for name, value in local_authority.settings().items():
+        monkeypatch.setenv(name, value)
+    reset_key_store()
+    token_cache.clear()
+    yield local_authority
+    reset_key_store()
+    token_cache.clear()
+
+
+@pytest.fixture
+def jwt_token(authority):
+    return authority.token(
+        [
+            Permissions.POST_DRINKS,
+            Permissions.PATCH_DRINKS,
+            Permissions.DELETE_DRINKS,
+            Permissions.GET_DRINK_DETAILS,
+        ]
+    )
 
 
 @pytest.fixture
@@ -1,5 +1,3 @@
-import json
-
 import factory
 from factory.faker import faker
 
@@ -17,10 +15,8 @@ class DrinkFactory(factory.alchemy.SQLAlchemyModelFactory):
     def recipe(self):
         gen = faker.Faker()
 
-        recipe_dict = dict(
+        return dict(
             name=gen.lexify(),
             color=gen.color(),
-            parts=gen.random_digit(),
+            parts=gen.random_int(1, 9),
         )
-
-        return json.dumps(recipe_dict)
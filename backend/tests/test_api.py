@@ -121,7 +121,29 @@ def test_post_new_drink(client):
     assert drink_json["title"] == payload["title"]
     assert drink_json["recipe"]["name"] == payload["recipe"]["name"]
     assert drink_json["recipe"]["color"] == payload["recipe"]["color"]
-    assert drink_json["recipe"]["parts"] == payload["recipe"]["parts"]
+    assert drink_json["recipe"]["parts"] == 1
+
+
+@pytest.mark.usefixtures("disable_auth")
+@pytest.mark.parametrize(
+    "ingredient",
+    [
+        dict(name="Test Recipe", color="#ffffff", parts="a splash"),
+        dict(name="Test Recipe", color="not a color", parts=1),
+        dict(name="", color="#ffffff", parts=1),
+    ],
+)
+def test_post_new_drink_invalid_ingredient(client, ingredient):
+    """POST /drinks: returns 422 on an invalid ingredient"""
+
+    payload = dict(title="Test Drink", recipe=[ingredient])
+
+    # make request at POST /drinks
+    res = client.post(url_for("drinks.drinks_create"), json=payload)
+
+    # assert correct data return
+    assert res.json.get("success", None) == False
+    assert res.json.get("error", None) == 422
 
 
 @pytest.mark.usefixtures("disable_auth")
@@ -177,7 +199,7 @@ def test_patch_drink_success(client):
     assert drink_json["title"] == payload["title"]
     assert drink_json["recipe"][0]["name"] == payload["recipe"][0]["name"]
     assert drink_json["recipe"][0]["color"] == payload["recipe"][0]["color"]
-    assert drink_json["recipe"][0]["parts"] == payload["recipe"][0]["parts"]
+    assert drink_json["recipe"][0]["parts"] == 1
 
 
 @pytest.mark.usefixtures("disable_auth")
@@ -229,7 +251,7 @@ def test_patch_drink_partial_recipe(client):
     drink_json = res.json["drinks"][0]
     assert drink_json["recipe"]["name"] == payload["recipe"]["name"]
     assert drink_json["recipe"]["color"] == payload["recipe"]["color"]
-    assert drink_json["recipe"]["parts"] == payload["recipe"]["parts"]
+    assert drink_json["recipe"]["parts"] == 1
 
 
 @pytest.mark.usefixtures("disable_auth")
@@ -117,3 +117,29 @@ def test_delete_drink_as_barista(client):
 def test_delete_drink_as_customer(client):
     res = client.patch(url_for("drinks.drinks_update", drink_id=1), json=dict())
     assert res.status_code == 403
+
+
+# signed token tests ======================================
+def _bearer(token):
+    return dict(Authorization=f"Bearer {token}")
+
+
+def test_signed_token_with_permission(client, jwt_token):
+    res = client.get(url_for("drinks.drinks_list_detail"), headers=_bearer(jwt_token))
+    assert res.status_code == 200
+
+
+def test_signed_token_without_permission(client, authority):
+    token = authority.token(["get:drinks-detail"])
+
+    res = client.post(
+        url_for("drinks.drinks_create"), json=dict(), headers=_bearer(token)
+    )
+    assert res.status_code == 403
+
+
+def test_signed_token_expired(client, authority):
+    token = authority.token(["get:drinks-detail"], ttl=-60)
+
+    res = client.get(url_for("drinks.drinks_list_detail"), headers=_bearer(token))
+    assert res.status_code == 401
@@ -0,0 +1,131 @@
+import json
+
+import pytest
+from flask import url_for
+
+from src.models import Drink
+
+from .factories import DrinkFactory
+
+
+def _drink(title):
+    return dict(title=title, recipe=[dict(name="milk", color="white", parts=1)])
+
+
+# POST /drinks/bulk tests =================================
+@pytest.mark.usefixtures("disable_auth")
+def test_bulk_create(client):
+    payload = [_drink(f"Drink {index}") for index in range(20)]
+
+    res = client.post(url_for("drinks.drinks_bulk_create"), json=payload)
+
+    assert res.json.get("success", None) == True
+    assert res.json.get("created", None) == 20
+    assert Drink.query.count() == 20
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_bulk_create_ndjson(client):
+    body = "\n".join(json.dumps(_drink(f"Drink {index}")) for index in range(3))
+
+    res = client.post(
+        url_for("drinks.drinks_bulk_create"),
+        data=body,
+        content_type="application/x-ndjson",
+    )
+
+    assert res.json.get("created", None) == 3
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_bulk_create_reports_errors_per_item(client):
+    payload = [_drink("Latte"), dict(title="Mocha"), _drink("Latte")]
+
+    res = client.post(url_for("drinks.drinks_bulk_create"), json=payload)
+
+    assert res.status_code == 422
+    assert sorted(res.json["errors"].keys()) == ["1", "2"]
+    assert "recipe" in res.json["errors"]["1"]
+    assert res.json["errors"]["2"] == dict(title=["title already exists"])
+    assert Drink.query.count() == 0
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_bulk_create_merges_errors_of_an_item(client):
+    DrinkFactory.create(title="Latte")
+    payload = [dict(title="Latte"), dict(title=5, recipe=[])]
+
+    res = client.post(url_for("drinks.drinks_bulk_create"), json=payload)
+
+    assert res.status_code == 422
+    assert res.json["errors"]["0"]["title"] == ["title already exists"]
+    assert "recipe" in res.json["errors"]["0"]
+    assert "title already exists" not in res.json["errors"]["1"]["title"]
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_bulk_create_reports_invalid_ingredients(client):
+    invalid = dict(title="Mocha", recipe=[dict(name="milk", color="white", parts=0)])
+    payload = [_drink("Latte"), invalid]
+
+    res = client.post(url_for("drinks.drinks_bulk_create"), json=payload)
+
+    assert res.status_code == 422
+    assert res.json["errors"] == {
+        "1": dict(recipe=["ingredient 0: parts must be a positive number"])
+    }
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_bulk_create_reports_duplicate_titles(client):
+    DrinkFactory.create(title="Latte")
+    payload = [_drink("Latte"), _drink("Mocha"), _drink("Mocha")]
+
+    res = client.post(url_for("drinks.drinks_bulk_create"), json=payload)
+
+    assert res.status_code == 422
+    assert sorted(res.json["errors"].keys()) == ["0", "2"]
+    assert Drink.query.count() == 1
+
+
+@pytest.mark.usefixtures("disable_auth")
+@pytest.mark.parametrize("payload", [dict(title="Latte"), []])
+def test_bulk_create_requires_array(client, payload):
+    res = client.post(url_for("drinks.drinks_bulk_create"), json=payload)
+
+    assert res.status_code == 422
+
+
+@pytest.mark.usefixtures("make_request_as_barista")
+def test_bulk_create_as_barista(client):
+    res = client.post(url_for("drinks.drinks_bulk_create"), json=[_drink("Latte")])
+
+    assert res.status_code == 403
+
+
+# GET /drinks/export tests ================================
+@pytest.mark.usefixtures("disable_auth")
+def test_export(client):
+    drinks = DrinkFactory.create_batch(5)
+
+    res = client.get(url_for("drinks.drinks_export"))
+
+    assert res.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in res.data.decode().splitlines()]
+    assert [line["id"] for line in lines] == [drink.id for drink in drinks]
+    assert sorted(lines[0].keys()) == ["id", "recipe", "title"]
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_export_round_trip(client):
+    DrinkFactory.create_batch(3)
+    exported = client.get(url_for("drinks.drinks_export")).data.decode()
+
+    Drink.query.delete()
+    res = client.post(
+        url_for("drinks.drinks_bulk_create"),
+        data=exported,
+        content_type="application/x-ndjson",
+    )
+
+    assert res.json.get("created", None) == 3
@@ -0,0 +1,163 @@
+import time
+from email.utils import formatdate
+
+import pytest
+from flask import url_for
+
+from src.caching import menu_cache
+
+from .factories import DrinkFactory
+
+
+@pytest.fixture
+def block_queries(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("the database should not be queried")
+
+    def block():
+        monkeypatch.setattr("src.api.get_drink_rows", fail)
+        monkeypatch.setattr("src.api.get_drink", fail)
+
+    return block
+
+
+@pytest.fixture
+def changed_at(monkeypatch):
+    """
+    changed_at(seconds_ago)
+        dates the last menu change seconds_ago in the past
+    """
+    # halfway through a second, a change 0.2 seconds ago falls in that second
+    now = int(time.time()) + 0.5
+    monkeypatch.setattr("src.caching.time.time", lambda: now)
+
+    def changed_at(seconds_ago):
+        menu_cache.state()
+        menu_cache.backend.set("menu:modified", str(now - seconds_ago))
+        return now - seconds_ago
+
+    return changed_at
+
+
+# ETag tests ==============================================
+def test_get_all_sets_etag(client, changed_at):
+    changed_at(10)
+    res = client.get(url_for("drinks.drinks_list"))
+
+    assert res.status_code == 200
+    assert res.headers.get("ETag", "").startswith('"')
+    assert res.headers.get("Last-Modified") is not None
+    assert res.headers.get("Cache-Control") == "public, no-cache"
+
+
+def test_get_all_if_none_match_not_modified(client, block_queries):
+    res = client.get(url_for("drinks.drinks_list"))
+    etag = res.headers["ETag"]
+    block_queries()
+
+    res = client.get(url_for("drinks.drinks_list"), headers={"If-None-Match": etag})
+
+    assert res.status_code == 304
+    assert res.data == b""
+    assert res.headers["ETag"] == etag
+
+
+def test_get_all_if_none_match_stale_etag(client):
+    res = client.get(url_for("drinks.drinks_list"))
+    etag = res.headers["ETag"]
+
+    menu_cache.bump()
+    res = client.get(url_for("drinks.drinks_list"), headers={"If-None-Match": etag})
+
+    assert res.status_code == 200
+    assert res.headers["ETag"] != etag
+
+
+def test_get_all_if_modified_since(client, block_queries, changed_at):
+    changed_at(10)
+    res = client.get(url_for("drinks.drinks_list"))
+    last_modified = res.headers["Last-Modified"]
+    block_queries()
+
+    res = client.get(
+        url_for("drinks.drinks_list"), headers={"If-Modified-Since": last_modified}
+    )
+
+    assert res.status_code == 304
+
+
+def test_get_all_last_modified_waits_for_the_second_to_end(client, changed_at):
+    # a change less than a second ago, another may follow within the same second
+    changed = changed_at(0.2)
+    since = formatdate(int(changed), usegmt=True)
+
+    res = client.get(url_for("drinks.drinks_list"))
+    assert "Last-Modified" not in res.headers
+
+    res = client.get(
+        url_for("drinks.drinks_list"), headers={"If-Modified-Since": since}
+    )
+    assert res.status_code == 200
+
+
+def test_etag_is_scoped_to_query_string(client):
+    full = client.get(url_for("drinks.drinks_list"))
+    projected = client.get(url_for("drinks.drinks_list", fields="id"))
+
+    assert full.headers["ETag"] != projected.headers["ETag"]
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_get_all_detail_if_none_match_not_modified(client, block_queries):
+    res = client.get(url_for("drinks.drinks_list_detail"))
+    etag = res.headers["ETag"]
+    block_queries()
+
+    res = client.get(
+        url_for("drinks.drinks_list_detail"), headers={"If-None-Match": etag}
+    )
+
+    assert res.status_code == 304
+    assert res.headers.get("Cache-Control") == "private, no-cache"
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_write_changes_etag(client):
+    res = client.get(url_for("drinks.drinks_list"))
+    etag = res.headers["ETag"]
+
+    payload = dict(
+        title="Test Drink",
+        recipe=[dict(name="Test Recipe", color="#ffffff", parts="1")],
+    )
+    client.post(url_for("drinks.drinks_create"), json=payload)
+
+    res = client.get(url_for("drinks.drinks_list"), headers={"If-None-Match": etag})
+    assert res.status_code == 200
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_get_one_etag_is_per_drink(client):
+    first, second = DrinkFactory.create_batch(2)
+    DrinkFactory._meta.sqlalchemy_session.commit()
+
+    res_1 = client.get(url_for("drinks.drinks_detail", drink_id=first.id))
+    res_2 = client.get(url_for("drinks.drinks_detail", drink_id=second.id))
+
+    assert res_1.headers["ETag"] != res_2.headers["ETag"]
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_get_one_not_found_has_no_etag(client):
+    res = client.get(url_for("drinks.drinks_detail", drink_id=1))
+
+    assert res.status_code == 404
+    assert res.headers.get("ETag") is None
+
+
+def test_cache_control_is_configurable(app, client):
+    app.config["CACHE_CONTROL"] = {"drinks.drinks_list": "public, max-age=30"}
+
+    res = client.get(url_for("drinks.drinks_list"))
+
+    assert res.headers.get("Cache-Control") == "public, max-age=30"
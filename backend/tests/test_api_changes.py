@@ -0,0 +1,283 @@
+import json
+import threading
+import time
+
+import pytest
+from flask import url_for
+
+from src.caching import menu_cache
+from src.changes import ChangeFeed, RedisPubSub, changes
+from src.services import add_drink, delete_drink, update_drink
+
+RECIPE = [dict(name="milk", color="white", parts=1)]
+
+
+def _poll(client, headers=None, **args):
+    args.setdefault("timeout", 0)
+    return client.get(url_for("drinks.drinks_changes", **args), headers=headers or {})
+
+
+def _stream(client, app, **args):
+    app.config["CHANGES_HEARTBEAT"] = 0.01
+    app.config["CHANGES_STREAM_TIMEOUT"] = 0.05
+    res = client.get(
+        url_for("drinks.drinks_changes", **args),
+        headers={"Accept": "text/event-stream"},
+    )
+    events = []
+    for block in res.get_data(as_text=True).split("\n\n"):
+        fields = dict(
+            line.split(": ", 1)
+            for line in block.splitlines()
+            if not line.startswith(":")
+        )
+        if fields:
+            events.append(fields)
+    return res, events
+
+
+# long-poll tests =========================================
+def test_no_changes(client):
+    res = _poll(client)
+
+    assert res.status_code == 200
+    assert res.json == dict(changes=[], reset=False, success=True, version=0)
+    assert res.headers["Cache-Control"] == "no-cache"
+
+
+def test_changes_since(app, client):
+    drink = add_drink(dict(title="Latte", recipe=RECIPE))
+    update_drink(drink, dict(title="Flat White"))
+    delete_drink(drink)
+
+    res = _poll(client, since=0)
+
+    assert [change["type"] for change in res.json["changes"]] == [
+        "created",
+        "updated",
+        "deleted",
+    ]
+    assert res.json["changes"][1] == dict(
+        version=2,
+        type="updated",
+        drink=dict(
+            id=drink.id, title="Flat White", recipe=[dict(color="white", parts=1)]
+        ),
+    )
+    assert res.json["changes"][2]["drink"] == dict(id=drink.id)
+    assert res.json["version"] == 3
+
+    assert _poll(client, since=2).json["changes"][0]["type"] == "deleted"
+    assert _poll(client, since=3).json["changes"] == []
+
+
+def test_waits_for_a_change(app, client):
+    def publish():
+        time.sleep(0.05)
+        changes.publish("created", menu_cache.bump(), dict(id=1))
+
+    threading.Thread(target=publish).start()
+    started = time.monotonic()
+    res = _poll(client, since=0, timeout=5)
+
+    assert res.json["changes"][0]["version"] == 1
+    assert time.monotonic() - started < 5
+
+
+def test_reset_when_history_is_too_short(app, client):
+    app.config["CHANGES_HISTORY"] = 2
+    changes.init_app(app)
+    for index in range(4):
+        add_drink(dict(title=f"Drink {index}", recipe=RECIPE))
+
+    res = _poll(client, since=0)
+
+    assert res.json["reset"] is True
+    assert res.json["version"] == 4
+    assert len(_poll(client, since=2).json["changes"]) == 2
+
+
+def test_reset_when_changes_were_missed(client):
+    menu_cache.bump()
+
+    res = _poll(client, since=0)
+
+    assert res.json == dict(changes=[], reset=True, success=True, version=1)
+
+
+def test_reset_when_ahead(client):
+    res = _poll(client, since=10)
+
+    assert res.json["reset"] is True
+    assert res.json["version"] == 0
+
+
+def test_waits_are_limited(app, client):
+    app.config["CHANGES_MAX_FOLLOWERS"] = 1
+    changes.init_app(app)
+    release = changes.follow()
+
+    res = _poll(client, since=0, timeout=5)
+
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "5"
+    # polls without waiting do not need a slot
+    assert _poll(client, since=0).status_code == 200
+
+    release()
+    assert _poll(client, since=0, timeout=0.01).status_code == 200
+    assert changes.follow() is not None
+
+
+@pytest.mark.parametrize("args", [dict(since="x"), dict(since=-1), dict(timeout="x")])
+def test_bad_arguments(client, args):
+    assert _poll(client, **args).status_code == 400
+
+
+# server-sent events tests ================================
+def test_event_stream(app, client):
+    drink = add_drink(dict(title="Latte", recipe=RECIPE))
+
+    res, events = _stream(client, app, since=0)
+
+    assert res.mimetype == "text/event-stream"
+    assert events[0]["id"] == "1"
+    assert events[0]["event"] == "created"
+    assert json.loads(events[0]["data"])["drink"]["id"] == drink.id
+    assert ": keep-alive" in res.get_data(as_text=True)
+
+
+def test_event_stream_last_event_id(app, client):
+    add_drink(dict(title="Latte", recipe=RECIPE))
+    add_drink(dict(title="Mocha", recipe=RECIPE))
+
+    app.config["CHANGES_STREAM_TIMEOUT"] = 0.05
+    res = client.get(
+        url_for("drinks.drinks_changes"),
+        headers={"Accept": "text/event-stream", "Last-Event-ID": "1"},
+    )
+
+    assert "id: 1\n" not in res.get_data(as_text=True)
+    assert "id: 2\n" in res.get_data(as_text=True)
+
+
+def test_event_stream_reset(app, client):
+    menu_cache.bump()
+
+    res, events = _stream(client, app, since=0)
+
+    assert events == [dict(event="reset", data='{"version":1}')]
+
+
+def test_event_streams_are_limited(app, client):
+    app.config["CHANGES_MAX_FOLLOWERS"] = 1
+    changes.init_app(app)
+
+    res, _ = _stream(client, app, since=0)
+    assert res.status_code == 200
+    assert changes.follow() is None
+
+    res_over = client.get(
+        url_for("drinks.drinks_changes", since=0),
+        headers={"Accept": "text/event-stream"},
+    )
+    assert res_over.status_code == 503
+    assert res_over.headers["Retry-After"] == "5"
+
+    res.close()
+    assert changes.follow() is not None
+
+
+# backend failure tests ===================================
+@pytest.mark.usefixtures("disable_auth")
+def test_publish_failure_keeps_the_write(client, monkeypatch):
+    def publish(type, version, drink):
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(changes, "publish", publish)
+    version = menu_cache.version
+
+    res = client.post(
+        url_for("drinks.drinks_create"),
+        json=dict(title="Latte", recipe=RECIPE),
+        headers={"Idempotency-Key": "latte"},
+    )
+
+    assert res.status_code == 200
+    assert int(menu_cache.backend.get("menu:version")) == version + 1
+    retried = client.post(
+        url_for("drinks.drinks_create"),
+        json=dict(title="Latte", recipe=RECIPE),
+        headers={"Idempotency-Key": "latte"},
+    )
+    assert retried.json == res.json
+
+
+def test_bump_failure_keeps_the_write(app, monkeypatch):
+    def bump():
+        raise ConnectionError("redis is down")
+
+    monkeypatch.setattr(menu_cache, "bump", bump)
+
+    drink = add_drink(dict(title="Latte", recipe=RECIPE))
+    update_drink(drink, dict(title="Mocha"))
+    delete_drink(drink)
+
+    assert changes.latest is None
+
+
+# backend tests ===========================================
+def test_feed_keeps_versions_sorted():
+    feed = ChangeFeed()
+    for version in (1, 3, 2, 3):
+        feed.receive(dict(version=version, type="updated", drink=None))
+
+    events, reset = feed.since(0)
+
+    assert [event["version"] for event in events] == [1, 2, 3]
+    assert not reset
+
+
+def test_feed_follow():
+    feed = ChangeFeed(max_followers=2)
+
+    releases = [feed.follow(), feed.follow()]
+    assert feed.follow() is None
+
+    releases[0]()
+    assert feed.follow() is not None
+
+
+def test_redis_pubsub():
+    class FakeRedis:
+        def __init__(self):
+            self.published = []
+
+        def publish(self, channel, message):
+            self.published.append((channel, message))
+
+        def pubsub(self, **kwargs):
+            client = self
+
+            class FakePubSub:
+                def subscribe(self, channel):
+                    pass
+
+                def listen(self):
+                    for channel, message in client.published:
+                        yield dict(type="message", data=message)
+
+                def close(self):
+                    pass
+
+            return FakePubSub()
+
+    client = FakeRedis()
+    backend = RedisPubSub(client)
+    backend.publish(dict(version=1, type="created", drink=None))
+
+    feed = ChangeFeed(backend)
+    backend._thread.join(1)
+
+    assert client.published[0][0] == "coffee-shop:changes"
+    assert feed.since(0)[0] == [dict(version=1, type="created", drink=None)]
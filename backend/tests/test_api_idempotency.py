@@ -0,0 +1,218 @@
+import pytest
+from flask import url_for
+
+from src.caching import DictCache, menu_cache
+from src.changes import changes
+from src.idempotency import idempotency
+from src.models import Drink, db
+from src.services import add_drink, update_drink
+
+from .factories import DrinkFactory
+
+RECIPE = [dict(name="milk", color="white", parts=1)]
+
+
+@pytest.fixture
+def drink():
+    drink = DrinkFactory()
+    db.session.commit()
+    return drink
+
+
+def _create(client, title="Latte", key=None):
+    headers = {"Idempotency-Key": key} if key else {}
+    return client.post(
+        url_for("drinks.drinks_create"),
+        json=dict(title=title, recipe=RECIPE),
+        headers=headers,
+    )
+
+
+# idempotency key tests ===================================
+@pytest.mark.usefixtures("disable_auth")
+def test_create_is_replayed(client):
+    first = _create(client, key="retry-1")
+    second = _create(client, key="retry-1")
+
+    assert second.status_code == 200
+    assert second.json == first.json
+    assert second.headers["Drink-ETag"] == first.headers["Drink-ETag"]
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert Drink.query.count() == 1
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_key_reused_with_another_body(client):
+    _create(client, key="retry-1")
+    res = _create(client, title="Mocha", key="retry-1")
+
+    assert res.status_code == 422
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_key_is_scoped_to_the_path(client, drink):
+    _create(client, key="retry-1")
+    res = client.delete(
+        url_for("drinks.drinks_delete", drink_id=drink.id),
+        headers={"Idempotency-Key": "retry-1"},
+    )
+
+    assert res.status_code == 200
+    assert "Idempotent-Replayed" not in res.headers
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_delete_is_replayed(client, drink):
+    url = url_for("drinks.drinks_delete", drink_id=drink.id)
+    client.delete(url, headers={"Idempotency-Key": "retry-1"})
+    res = client.delete(url, headers={"Idempotency-Key": "retry-1"})
+
+    assert res.status_code == 200
+    assert res.json == dict(delete=drink.id, success=True)
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_failed_request_is_not_stored(client, drink):
+    url = url_for("drinks.drinks_update", drink_id=drink.id)
+    headers = {"Idempotency-Key": "retry-1", "If-Match": '"drink-0-0"'}
+    assert (
+        client.patch(url, json=dict(title="Mocha"), headers=headers).status_code == 412
+    )
+
+    headers["If-Match"] = f'"drink-{drink.id}-1"'
+    assert (
+        client.patch(url, json=dict(title="Mocha"), headers=headers).status_code == 200
+    )
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_key_in_progress(client, monkeypatch):
+    retries = []
+
+    def add_drink_while_retried(payload):
+        retries.append(_create(client, key="retry-1"))
+        return add_drink(payload)
+
+    monkeypatch.setattr("src.api.add_drink", add_drink_while_retried)
+    res = _create(client, key="retry-1")
+
+    assert res.status_code == 200
+    assert retries[0].status_code == 409
+
+
+def test_in_process_replies_are_bounded(app):
+    assert isinstance(idempotency.backend, DictCache)
+    assert idempotency.backend is not menu_cache.backend
+    assert idempotency.backend.maxsize == app.config["IDEMPOTENCY_MAX_ENTRIES"]
+
+
+# optimistic concurrency tests ============================
+@pytest.mark.usefixtures("disable_auth")
+def test_get_one_etag_follows_the_drink_version(client, drink):
+    url = url_for("drinks.drinks_detail", drink_id=drink.id)
+    etag = client.get(url).headers["ETag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    res = client.patch(
+        url_for("drinks.drinks_update", drink_id=drink.id), json=dict(title="Mocha")
+    )
+    assert "ETag" not in res.headers
+    assert res.headers["Drink-ETag"] != etag
+    assert client.get(url).headers["ETag"] == res.headers["Drink-ETag"]
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_versions_are_exposed_to_other_origins(client, drink):
+    res = client.get(
+        url_for("drinks.drinks_detail", drink_id=drink.id),
+        headers={"Origin": "https://shop.example"},
+    )
+    assert "ETag" in res.headers
+
+    exposed = {
+        header.strip().lower()
+        for header in res.headers["Access-Control-Expose-Headers"].split(",")
+    }
+    assert {"etag", "drink-etag", "retry-after"} <= exposed
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_update_to_the_same_values_changes_nothing(client, drink):
+    url = url_for("drinks.drinks_detail", drink_id=drink.id)
+    etag = client.get(url).headers["ETag"]
+    version, latest = menu_cache.version, changes.latest
+
+    res = client.patch(
+        url_for("drinks.drinks_update", drink_id=drink.id),
+        json=dict(title=drink.title, recipe=drink.recipe),
+    )
+
+    assert res.status_code == 200
+    assert res.headers["Drink-ETag"] == etag
+    assert (menu_cache.version, changes.latest) == (version, latest)
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_get_one_revalidation_skips_the_database(client, drink, assert_num_queries):
+    url = url_for("drinks.drinks_detail", drink_id=drink.id)
+    etag = client.get(url).headers["ETag"]
+
+    with assert_num_queries(0):
+        res = client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 304
+
+    client.patch(
+        url_for("drinks.drinks_update", drink_id=drink.id), json=dict(title="Mocha")
+    )
+    res = client.get(url, headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.json["drink"]["title"] == "Mocha"
+
+
+@pytest.mark.usefixtures("disable_auth")
+@pytest.mark.parametrize("method", ["patch", "delete"])
+def test_if_match(client, drink, method):
+    endpoint = "drinks.drinks_update" if method == "patch" else "drinks.drinks_delete"
+    url = url_for(endpoint, drink_id=drink.id)
+    etag = client.get(url_for("drinks.drinks_detail", drink_id=drink.id)).headers[
+        "ETag"
+    ]
+    Drink.query.filter_by(id=drink.id).update(dict(version=Drink.version + 1))
+    db.session.commit()
+
+    send = getattr(client, method)
+    res = send(url, json=dict(title="Mocha"), headers={"If-Match": etag})
+
+    assert res.status_code == 412
+    assert res.json["message"] == "precondition failed"
+
+    res = send(url, json=dict(title="Mocha"), headers={"If-Match": "*"})
+    assert res.status_code == 200
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_concurrent_update_conflicts(client, drink, monkeypatch):
+    def update_after_another_manager(instance, payload):
+        db.session.execute(
+            "UPDATE drink SET version = version + 1 WHERE id = :id", dict(id=drink.id)
+        )
+        return update_drink(instance, payload)
+
+    monkeypatch.setattr("src.api.update_drink", update_after_another_manager)
+    res = client.patch(
+        url_for("drinks.drinks_update", drink_id=drink.id), json=dict(title="Mocha")
+    )
+
+    assert res.status_code == 409
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_duplicate_title_conflicts(client):
+    _create(client)
+    res = _create(client)
+
+    assert res.status_code == 409
+    assert Drink.query.count() == 1
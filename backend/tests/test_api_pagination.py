@@ -0,0 +1,83 @@
+import pytest
+from flask import url_for
+
+from .factories import DrinkFactory
+
+
+@pytest.fixture
+def drinks():
+    return DrinkFactory.create_batch(5)
+
+
+# pagination tests ========================================
+@pytest.mark.usefixtures("drinks")
+def test_get_all_without_arguments_is_complete(client):
+    res = client.get(url_for("drinks.drinks_list"))
+
+    assert len(res.json["drinks"]) == 5
+    assert res.json["total"] == 5
+    assert "next_cursor" not in res.json
+    assert "Link" not in res.headers
+
+
+def test_get_all_limit(client, drinks):
+    res = client.get(url_for("drinks.drinks_list", limit=2))
+
+    assert [drink["id"] for drink in res.json["drinks"]] == [
+        drink.id for drink in drinks[:2]
+    ]
+    assert res.json["total"] == 5
+    assert res.json["next_cursor"] == str(drinks[1].id)
+    assert 'rel="next"' in res.headers["Link"]
+
+
+def test_get_all_follows_cursor(client, drinks):
+    seen = []
+    url = url_for("drinks.drinks_list", limit=2)
+    while url:
+        res = client.get(url)
+        seen += [drink["id"] for drink in res.json["drinks"]]
+        url = res.headers.get("Link", "").partition(">")[0][1:]
+
+    assert seen == [drink.id for drink in drinks]
+
+
+@pytest.mark.usefixtures("drinks")
+def test_get_all_total_can_be_disabled(client):
+    res = client.get(url_for("drinks.drinks_list", limit=2, total="false"))
+
+    assert "total" not in res.json
+
+
+@pytest.mark.usefixtures("drinks")
+def test_get_all_fields(client):
+    res = client.get(url_for("drinks.drinks_list", fields="id,title"))
+
+    assert sorted(res.json["drinks"][0].keys()) == ["id", "title"]
+
+
+@pytest.mark.usefixtures("drinks", "disable_auth")
+def test_get_all_detail_pagination(client):
+    res = client.get(url_for("drinks.drinks_list_detail", limit=3, fields="recipe"))
+
+    assert len(res.json["drinks"]) == 3
+    assert list(res.json["drinks"][0].keys()) == ["recipe"]
+    assert list(res.json["drinks"][0]["recipe"].keys()) == ["color", "name", "parts"]
+
+
+@pytest.mark.parametrize(
+    "args", [dict(limit="a"), dict(limit=0), dict(cursor="-1"), dict(fields="price")]
+)
+def test_get_all_invalid_arguments(client, args):
+    res = client.get(url_for("drinks.drinks_list", **args))
+
+    assert res.status_code == 400
+
+
+@pytest.mark.usefixtures("drinks")
+def test_get_all_limit_is_capped(app, client):
+    app.config["DRINKS_MAX_LIMIT"] = 2
+
+    res = client.get(url_for("drinks.drinks_list", limit=50))
+
+    assert len(res.json["drinks"]) == 2
@@ -0,0 +1,74 @@
+import pytest
+from flask import url_for
+
+from src.models import Drink, db
+
+from .factories import DrinkFactory
+
+RECIPE = [dict(name="Test Recipe", color="#ffffff", parts=1)]
+
+
+# write path query counts =================================
+@pytest.mark.usefixtures("disable_auth")
+def test_post_is_one_statement(client, assert_num_queries):
+    payload = dict(title="Test Drink", recipe=RECIPE)
+
+    with assert_num_queries(1) as statements:
+        res = client.post(url_for("drinks.drinks_create"), json=payload)
+
+    assert statements[0].startswith("INSERT")
+    assert res.json["drinks"][0]["id"] is not None
+    assert res.json["drinks"][0]["title"] == payload["title"]
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_patch_is_select_and_update(client, assert_num_queries):
+    drink = DrinkFactory.create()
+    drink.insert()
+    db.session.expunge_all()
+
+    with assert_num_queries(2) as statements:
+        res = client.patch(
+            url_for("drinks.drinks_update", drink_id=drink.id),
+            json=dict(title="Test Drink"),
+        )
+
+    assert statements[1].startswith("UPDATE")
+    assert res.json["drinks"][0]["title"] == "Test Drink"
+    assert Drink.query.get(drink.id).title == "Test Drink"
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_patch_returns_refreshed_row(client):
+    drink = DrinkFactory.create()
+    drink.insert()
+
+    res = client.patch(
+        url_for("drinks.drinks_update", drink_id=drink.id), json=dict(recipe=RECIPE)
+    )
+
+    assert res.json["drinks"][0]["recipe"] == RECIPE
+    assert res.json["drinks"][0]["title"] == drink.title
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_delete_is_select_and_delete(client, assert_num_queries):
+    drink = DrinkFactory.create()
+    drink.insert()
+    db.session.expunge_all()
+
+    with assert_num_queries(2) as statements:
+        client.delete(url_for("drinks.drinks_delete", drink_id=drink.id))
+
+    assert statements[1].startswith("DELETE")
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_bulk_create_is_one_insert(client, assert_num_queries):
+    payload = [dict(title=f"Drink {index}", recipe=RECIPE) for index in range(10)]
+
+    # one SELECT for existing titles, one executemany INSERT
+    with assert_num_queries(2) as statements:
+        client.post(url_for("drinks.drinks_bulk_create"), json=payload)
+
+    assert statements[1].startswith("INSERT")
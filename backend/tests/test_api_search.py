@@ -0,0 +1,157 @@
+import pytest
+from flask import url_for
+
+from src.search import SearchIndex, search_index
+from src.services import add_drink, add_drinks, delete_drink, update_drink
+
+from .factories import DrinkFactory
+
+
+@pytest.fixture
+def drinks():
+    return [
+        DrinkFactory(
+            title="Flat White",
+            recipe=[
+                dict(name="espresso", color="#3b2a1d", parts=1),
+                dict(name="steamed milk", color="white", parts=2),
+            ],
+        ),
+        DrinkFactory(
+            title="Espresso Tonic",
+            recipe=[
+                dict(name="espresso", color="#3b2a1d", parts=1),
+                dict(name="tonic water", color="clear", parts=3),
+            ],
+        ),
+        DrinkFactory(
+            title="Matcha Latte", recipe=dict(name="matcha", color="green", parts=1)
+        ),
+    ]
+
+
+def _search(client, endpoint="drinks.drinks_list", **args):
+    return client.get(url_for(endpoint, **args))
+
+
+# index tests =============================================
+def test_index_matches_word_prefixes():
+    index = SearchIndex()
+    index.rebuild(
+        [(1, "Flat White", dict(name="steamed milk", color="white", parts=1))], "e", 0
+    )
+
+    assert index.search("fla") == [1]
+    assert index.search("fla whi") == [1]
+    assert index.search("lat") == []
+    assert index.search(ingredients=["milk"]) == [1]
+    assert index.search(ingredients=["flat"]) == []
+
+
+def test_index_applies_consecutive_writes_only():
+    index = SearchIndex()
+    index.rebuild([], "e", 3)
+
+    index.add(1, "Mocha", [], 4)
+    assert index.search("mocha") == [1]
+    assert index.is_current("e", 4)
+
+    index.add(2, "Cortado", [], 6)
+    assert not index.is_current("e", 6)
+
+
+# endpoint tests ==========================================
+@pytest.mark.usefixtures("drinks")
+@pytest.mark.parametrize(
+    "args,titles",
+    [
+        (dict(q="espresso"), ["Flat White", "Espresso Tonic"]),
+        (dict(q="ESP ton"), ["Espresso Tonic"]),
+        (dict(q="green"), ["Matcha Latte"]),
+        (dict(q="#3b2a"), ["Flat White", "Espresso Tonic"]),
+        (dict(ingredient="milk"), ["Flat White"]),
+        (dict(ingredient=["espresso", "tonic"]), ["Espresso Tonic"]),
+        (dict(q="latte", ingredient="espresso"), []),
+        (dict(q="mocha"), []),
+    ],
+)
+def test_search(client, args, titles):
+    res = _search(client, **args)
+
+    assert res.status_code == 200
+    assert [drink["title"] for drink in res.json["drinks"]] == titles
+    assert res.json["total"] == len(titles)
+
+
+@pytest.mark.usefixtures("drinks")
+def test_search_paginates(client):
+    res = _search(client, q="espresso", limit=1)
+
+    assert [drink["title"] for drink in res.json["drinks"]] == ["Flat White"]
+    assert res.json["total"] == 2
+
+    res = _search(client, q="espresso", limit=1, cursor=res.json["next_cursor"])
+
+    assert [drink["title"] for drink in res.json["drinks"]] == ["Espresso Tonic"]
+    assert "next_cursor" not in res.json
+
+
+@pytest.mark.usefixtures("drinks", "disable_auth")
+def test_search_detail(client):
+    res = _search(client, "drinks.drinks_list_detail", ingredient="tonic water")
+
+    assert res.json["drinks"][0]["recipe"][1]["name"] == "tonic water"
+
+
+@pytest.mark.usefixtures("drinks")
+def test_search_cannot_stream(client):
+    res = _search(client, q="espresso", stream="true")
+
+    assert res.status_code == 400
+
+
+@pytest.mark.usefixtures("drinks")
+def test_search_does_not_scan_recipes(client, assert_num_queries):
+    _search(client, q="espresso")
+
+    with assert_num_queries(1) as statements:
+        _search(client, q="espresso")
+
+    assert "IN" in statements[0]
+
+
+@pytest.mark.usefixtures("drinks")
+def test_search_follows_service_writes(app, client):
+    _search(client, q="espresso")
+
+    with app.test_request_context():
+        drink = add_drink(
+            dict(title="Mocha", recipe=[dict(name="espresso", color="brown", parts=1)])
+        )
+        update_drink(drink, dict(title="Cafe Mocha"))
+    assert search_index.version is not None
+
+    res = _search(client, q="cafe")
+    assert [drink["title"] for drink in res.json["drinks"]] == ["Cafe Mocha"]
+
+    with app.test_request_context():
+        delete_drink(drink)
+    assert _search(client, q="cafe").json["drinks"] == []
+
+
+@pytest.mark.usefixtures("drinks")
+def test_search_rebuilds_after_bulk_writes(app, client):
+    _search(client, q="espresso")
+
+    with app.test_request_context():
+        add_drinks(
+            [
+                dict(
+                    title="Irish Coffee",
+                    recipe=dict(name="whiskey", color="amber", parts=1),
+                )
+            ]
+        )
+
+    res = _search(client, ingredient="whiskey")
+    assert [drink["title"] for drink in res.json["drinks"]] == ["Irish Coffee"]
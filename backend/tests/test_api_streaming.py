@@ -0,0 +1,79 @@
+import pytest
+from flask import url_for
+
+from src.models import Drink, db
+
+
+def _is_streamed(response):
+    # streamed responses are sent without a Content-Length
+    return "Content-Length" not in response.headers
+
+
+@pytest.fixture
+def drinks(app):
+    drinks = [
+        Drink(
+            title=f"Drink {index}", recipe=[dict(name="milk", color="white", parts=1)]
+        )
+        for index in range(7)
+    ]
+    db.session.add_all(drinks)
+    db.session.commit()
+    return drinks
+
+
+# stream tests ============================================
+@pytest.mark.parametrize(
+    "args", [dict(), dict(fields="title"), dict(total="false"), dict(cursor=3)]
+)
+def test_stream_matches_jsonify(client, app, drinks, args):
+    app.config["DRINKS_STREAM_BATCH_SIZE"] = 3
+
+    expected = client.get(url_for("drinks.drinks_list", **args))
+    res = client.get(url_for("drinks.drinks_list", stream="true", **args))
+
+    assert res.status_code == 200
+    assert _is_streamed(res)
+    assert res.mimetype == "application/json"
+    assert res.get_data() == expected.get_data()
+
+
+@pytest.mark.usefixtures("make_request_as_barista")
+def test_stream_detail_listing(client, drinks):
+    headers = dict(Authorization="Bearer token")
+
+    res = client.get(url_for("drinks.drinks_list_detail", stream="1"), headers=headers)
+
+    assert _is_streamed(res)
+    assert res.json["total"] == 7
+    assert res.json["drinks"][0]["recipe"][0]["name"] == "milk"
+
+
+def test_stream_empty_menu(client):
+    res = client.get(url_for("drinks.drinks_list", stream="true"))
+
+    assert res.json == dict(drinks=[], success=True, total=0)
+
+
+def test_stream_by_default(client, app, drinks):
+    app.config["DRINKS_STREAMING"] = True
+
+    assert _is_streamed(client.get(url_for("drinks.drinks_list")))
+    assert not _is_streamed(client.get(url_for("drinks.drinks_list", limit=2)))
+    assert not _is_streamed(client.get(url_for("drinks.drinks_list", stream="false")))
+
+
+def test_stream_keeps_conditional_get(client, drinks):
+    res = client.get(url_for("drinks.drinks_list", stream="true"))
+
+    res = client.get(
+        url_for("drinks.drinks_list", stream="true"),
+        headers={"If-None-Match": res.headers["ETag"]},
+    )
+    assert res.status_code == 304
+
+
+def test_stream_with_limit(client):
+    res = client.get(url_for("drinks.drinks_list", stream="true", limit=2))
+
+    assert res.status_code == 400
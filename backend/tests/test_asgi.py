@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+
+from src.asgi import AsgiAdapter, build_environ
+
+from .factories import DrinkFactory
+
+
+def _request(adapter, method, path, body=b"", headers=(), query_string=b""):
+    scope = dict(
+        type="http",
+        method=method,
+        path=path,
+        query_string=query_string,
+        headers=[(name.encode(), value.encode()) for name, value in headers],
+        server=("testserver", 80),
+        client=("127.0.0.1", 5000),
+    )
+    messages = [dict(type="http.request", body=body, more_body=False)]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(adapter(scope, receive, send))
+    return sent
+
+
+@pytest.fixture
+def adapter(app):
+    adapter = AsgiAdapter(app, threads=4)
+    yield adapter
+    adapter.executor.shutdown()
+
+
+# AsgiAdapter tests =======================================
+def test_get(adapter):
+    DrinkFactory.create_batch(3)
+    DrinkFactory._meta.sqlalchemy_session.commit()
+
+    sent = _request(adapter, "GET", "/drinks")
+
+    assert sent[0]["type"] == "http.response.start"
+    assert sent[0]["status"] == 200
+    assert (b"content-type", b"application/json") in sent[0]["headers"]
+
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    assert len(json.loads(body)["drinks"]) == 3
+    assert sent[-1] == {"type": "http.response.body", "body": b""}
+
+
+@pytest.mark.usefixtures("disable_auth")
+def test_post_body(adapter):
+    payload = dict(title="Latte", recipe=[dict(name="milk", color="white", parts=1)])
+
+    sent = _request(
+        adapter,
+        "POST",
+        "/drinks",
+        body=json.dumps(payload).encode(),
+        headers=[("Content-Type", "application/json")],
+    )
+
+    assert sent[0]["status"] == 200
+    body = b"".join(message.get("body", b"") for message in sent[1:])
+    assert json.loads(body)["drinks"][0]["title"] == "Latte"
+
+
+def test_not_found(adapter):
+    sent = _request(adapter, "GET", "/teas")
+
+    assert sent[0]["status"] == 404
+
+
+def test_lifespan(adapter):
+    messages = [dict(type="lifespan.startup"), dict(type="lifespan.shutdown")]
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(adapter(dict(type="lifespan"), receive, send))
+
+    assert [message["type"] for message in sent] == [
+        "lifespan.startup.complete",
+        "lifespan.shutdown.complete",
+    ]
+
+
+# build_environ tests =====================================
+def test_build_environ():
+    scope = dict(
+        method="GET",
+        path="/drinks",
+        query_string=b"limit=2",
+        headers=[
+            (b"content-type", b"application/json"),
+            (b"accept-encoding", b"gzip"),
+            (b"accept-encoding", b"br"),
+        ],
+        server=("cafe", 8000),
+    )
+
+    environ = build_environ(scope, None)
+
+    assert environ["QUERY_STRING"] == "limit=2"
+    assert environ["CONTENT_TYPE"] == "application/json"
+    assert environ["HTTP_ACCEPT_ENCODING"] == "gzip,br"
+    assert environ["SERVER_PORT"] == "8000"
@@ -1,7 +1,12 @@
+import base64
+import json
+
 import pytest
 from flask import url_for
+from jose import jwk
 
 from src.auth import auth
+from src.auth.local import LocalAuthority
 
 from .factories import DrinkFactory
 
@@ -48,11 +53,79 @@ def test_get_token_auth_header_success(client):
 
 # verify_decode_jwt test ==================================
 def test_verify_decode_jwt(jwt_token):
-    if not jwt_token:
-        pytest.skip("unsupported configuration")
-
     response = auth.verify_decode_jwt(jwt_token)
 
+    assert response["sub"] == "local|tester"
+    assert "post:drinks" in response["permissions"]
+
+
+@pytest.mark.parametrize(
+    "claims",
+    [
+        dict(ttl=-60),
+        dict(aud="another-api"),
+        dict(iss="https://another-tenant.local/"),
+    ],
+)
+def test_verify_decode_jwt_invalid_claims(authority, claims):
+    token = authority.token(["post:drinks"], **claims)
+
+    with pytest.raises(auth.AuthError) as error:
+        auth.verify_decode_jwt(token)
+    assert error.value.status_code == 401
+
+
+def test_verify_decode_jwt_unpadded_segments(jwt_token):
+    header = jwt_token.split(".")[0]
+    assert len(header) % 4
+
+    assert auth.verify_decode_jwt(jwt_token)["sub"] == "local|tester"
+
+
+@pytest.mark.parametrize(
+    "token",
+    ["a.b", "!!!.e30.sig", "e30.e30.sig", "WyJraWQiXQ.e30.sig"],
+)
+def test_verify_decode_jwt_malformed(authority, token):
+    with pytest.raises(auth.AuthError) as error:
+        auth.verify_decode_jwt(token)
+    assert error.value.status_code == 401
+
+
+def test_verify_decode_jwt_tampered(jwt_token):
+    header, payload, signature = jwt_token.split(".")
+    claims = json.loads(auth.b64url_decode(payload))
+    claims["permissions"].append("admin")
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).decode()
+
+    with pytest.raises(auth.AuthError) as error:
+        auth.verify_decode_jwt(".".join((header, payload.rstrip("="), signature)))
+    assert error.value.status_code == 401
+
+
+def test_verify_decode_jwt_builds_keys_once(authority, monkeypatch):
+    constructed = []
+    construct = jwk.construct
+    monkeypatch.setattr(
+        jwk,
+        "construct",
+        lambda *args: constructed.append(args) or construct(*args),
+    )
+
+    for ttl in (60, 120, 180):
+        auth.verify_decode_jwt(authority.token(ttl=ttl))
+
+    # signing constructs keys too, count the jwks (dict) keys only
+    assert len([args for args in constructed if isinstance(args[0], dict)]) == 1
+
+
+def test_verify_decode_jwt_foreign_key(authority):
+    token = LocalAuthority(key_size=1024).token(["post:drinks"])
+
+    with pytest.raises(auth.AuthError) as error:
+        auth.verify_decode_jwt(token)
+    assert error.value.status_code == 401
+
 
 # check_permissions test ==================================
 def test_check_permissions_invalid_payload():
@@ -0,0 +1,213 @@
+import gzip
+import json
+
+import pytest
+from flask import url_for
+
+from src.api import create_app
+from src.compression import compress, compression
+from src.models import Drink, db
+
+RECIPE = [dict(name="steamed milk", color="white", parts=2)]
+
+
+@pytest.fixture
+def drinks(app):
+    drinks = [Drink(title=f"Drink {index}", recipe=RECIPE) for index in range(30)]
+    db.session.add_all(drinks)
+    db.session.commit()
+    return drinks
+
+
+@pytest.fixture
+def count_compressions(monkeypatch):
+    calls = []
+    original = compression.compress
+
+    def counted(body, encoding):
+        calls.append(encoding)
+        return original(body, encoding)
+
+    monkeypatch.setattr(compression, "compress", counted)
+    return calls
+
+
+def _get(client, headers=None, **args):
+    return client.get(url_for("drinks.drinks_list", **args), headers=headers or {})
+
+
+# negotiation tests =======================================
+@pytest.mark.usefixtures("drinks")
+def test_gzip(client):
+    plain = _get(client, limit=20)
+    res = _get(client, {"Accept-Encoding": "gzip"}, limit=20)
+
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["Vary"]
+    assert int(res.headers["Content-Length"]) == len(res.data) < len(plain.data)
+    assert gzip.decompress(res.data) == plain.data
+
+
+@pytest.mark.usefixtures("drinks")
+def test_brotli_is_preferred(client):
+    brotli = pytest.importorskip("brotli")
+
+    plain = _get(client, limit=20)
+    res = _get(client, {"Accept-Encoding": "gzip, br"}, limit=20)
+
+    assert res.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(res.data) == plain.data
+
+
+@pytest.mark.usefixtures("drinks")
+def test_identity_without_accept_encoding(client):
+    res = _get(client, limit=20)
+
+    assert "Content-Encoding" not in res.headers
+    assert res.json["success"]
+
+
+def test_small_bodies_are_not_compressed(client):
+    res = _get(client, {"Accept-Encoding": "gzip"}, limit=20)
+
+    assert "Content-Encoding" not in res.headers
+
+
+def test_errors_are_not_compressed(client):
+    res = _get(client, {"Accept-Encoding": "gzip"}, limit="many")
+
+    assert res.status_code == 400
+    assert "Content-Encoding" not in res.headers
+
+
+@pytest.mark.usefixtures("drinks")
+def test_disabled(monkeypatch):
+    monkeypatch.setenv("COMPRESSION_ENCODINGS", "")
+
+    with create_app().test_client() as client:
+        res = client.get("/drinks?limit=20", headers={"Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in res.headers
+
+
+# reuse tests =============================================
+@pytest.mark.usefixtures("drinks")
+def test_compressed_bytes_are_reused(client, count_compressions):
+    first = _get(client, {"Accept-Encoding": "gzip"}, limit=20)
+    second = _get(client, {"Accept-Encoding": "gzip"}, limit=20)
+
+    assert first.data == second.data
+    assert count_compressions == ["gzip"]
+
+
+@pytest.mark.usefixtures("drinks")
+def test_full_menu_is_precompressed(client, count_compressions):
+    plain = _get(client)
+    first = _get(client, {"Accept-Encoding": "gzip"})
+    second = _get(client, {"Accept-Encoding": "gzip"})
+
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(second.data) == plain.data
+    assert count_compressions == ["gzip"]
+
+
+@pytest.mark.usefixtures("drinks")
+def test_write_compresses_again(client, count_compressions, make_request_as_manager):
+    _get(client, {"Accept-Encoding": "gzip"}, limit=20)
+    client.patch(
+        url_for("drinks.drinks_update", drink_id=1),
+        json=dict(title="Flat White"),
+        headers=dict(Authorization="Bearer token"),
+    )
+    res = _get(client, {"Accept-Encoding": "gzip"}, limit=20)
+
+    assert b"Flat White" in gzip.decompress(res.data)
+    assert count_compressions == ["gzip", "gzip"]
+
+
+@pytest.mark.usefixtures("drinks")
+def test_write_response_is_not_reused(
+    client, count_compressions, make_request_as_manager
+):
+    headers = {"Accept-Encoding": "gzip", "Authorization": "Bearer token"}
+    recipe = [
+        dict(name=f"ingredient {index}", color="white", parts=1) for index in range(30)
+    ]
+    created = client.post(
+        url_for("drinks.drinks_create"),
+        json=dict(title="Flat White", recipe=recipe),
+        headers=headers,
+    )
+    drink_id = json.loads(gzip.decompress(created.data))["drinks"][0]["id"]
+
+    res = client.get(
+        url_for("drinks.drinks_detail", drink_id=drink_id), headers=headers
+    )
+
+    assert res.status_code == 200
+    assert json.loads(gzip.decompress(res.data))["drink"]["title"] == "Flat White"
+
+
+# ETag tests ==============================================
+@pytest.mark.usefixtures("drinks")
+@pytest.mark.parametrize("args", [dict(limit=20), dict()])
+def test_compressed_etag_names_the_encoding(client, args):
+    plain = _get(client, **args)
+    res = _get(client, {"Accept-Encoding": "gzip"}, **args)
+
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert res.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    revalidated = _get(
+        client,
+        {"Accept-Encoding": "gzip", "If-None-Match": res.headers["ETag"]},
+        **args,
+    )
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == res.headers["ETag"]
+
+
+@pytest.mark.usefixtures("drinks")
+def test_compressed_drink_etag_is_accepted_by_if_match(client, make_request_as_manager):
+    headers = {"Accept-Encoding": "gzip", "Authorization": "Bearer token"}
+    recipe = [
+        dict(name=f"ingredient {index}", color="white", parts=1) for index in range(30)
+    ]
+    created = client.post(
+        url_for("drinks.drinks_create"),
+        json=dict(title="Flat White", recipe=recipe),
+        headers=headers,
+    )
+    drink_id = json.loads(gzip.decompress(created.data))["drinks"][0]["id"]
+    url = url_for("drinks.drinks_detail", drink_id=drink_id)
+    etag = client.get(url, headers=headers).headers["ETag"]
+    assert etag.endswith('-gzip"')
+
+    assert (
+        client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+    )
+    res = client.patch(
+        url_for("drinks.drinks_update", drink_id=drink_id),
+        json=dict(title="Mocha"),
+        headers={**headers, "If-Match": etag},
+    )
+    assert res.status_code == 200
+
+
+# streaming tests =========================================
+@pytest.mark.usefixtures("drinks")
+def test_streamed_listing(client):
+    plain = _get(client, stream="true")
+    res = _get(client, {"Accept-Encoding": "gzip"}, stream="true")
+
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in res.headers
+    assert gzip.decompress(res.data) == plain.data
+
+
+def test_compress_levels():
+    body = b'{"drinks":[]}' * 100
+
+    assert gzip.decompress(compress(body, "gzip", 1)) == body
+    assert gzip.decompress(compress(body, "gzip", 9)) == body
+    assert compress(body, "identity") == body
@@ -0,0 +1,148 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src import config as config_module
+from src.api import create_app
+from src.config import Config, ConfigError, load_environment
+from src.models import db
+
+
+@pytest.fixture
+def sqlite_uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'test.db'}"
+
+
+def _pragma(app, name):
+    with app.app_context():
+        return db.session.execute(f"PRAGMA {name}").scalar()
+
+
+# Config tests ============================================
+def test_config_reads_environment():
+    config = Config(
+        dict(
+            DATABASE_URL="postgresql://coffee@db/coffee",
+            DATABASE_POOL_SIZE="20",
+            DATABASE_POOL_RECYCLE="1800",
+            DATABASE_POOL_PRE_PING="false",
+            SQLITE_SYNCHRONOUS="full",
+        )
+    )
+
+    assert config.SQLALCHEMY_DATABASE_URI == "postgresql://coffee@db/coffee"
+    assert config.SQLALCHEMY_ENGINE_OPTIONS == dict(
+        pool_size=20, pool_recycle=1800, pool_pre_ping=False
+    )
+    assert config.SQLITE_PRAGMAS["synchronous"] == "full"
+
+
+def test_config_replica_urls():
+    config = Config(
+        dict(
+            DATABASE_REPLICA_URLS="postgresql://replica-a/coffee, postgresql://replica-b/coffee"
+        )
+    )
+
+    assert config.SQLALCHEMY_BINDS == dict(
+        replica0="postgresql://replica-a/coffee",
+        replica1="postgresql://replica-b/coffee",
+    )
+    assert config.SQLALCHEMY_REPLICA_BINDS == ["replica0", "replica1"]
+
+
+def test_config_invalid_integer():
+    with pytest.raises(ConfigError):
+        Config(dict(DATABASE_POOL_SIZE="many"))
+
+
+def test_load_environment_reads_dotenv_once(monkeypatch):
+    import dotenv
+
+    calls = []
+    monkeypatch.setattr(config_module, "_environment_loaded", False)
+    monkeypatch.setattr(dotenv, "load_dotenv", lambda **kwargs: calls.append(kwargs))
+
+    for _ in range(3):
+        Config()
+        load_environment()
+    load_environment(override=True)
+
+    assert calls == [dict(override=False), dict(override=True)]
+
+
+# create_app tests ========================================
+def test_create_app_accepts_dict(sqlite_uri):
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=sqlite_uri))
+
+    assert app.config["SQLALCHEMY_DATABASE_URI"] == sqlite_uri
+
+
+def test_create_app_accepts_object(sqlite_uri):
+    class TestConfig:
+        SQLALCHEMY_DATABASE_URI = sqlite_uri
+
+    app = create_app(TestConfig)
+
+    assert app.config["SQLALCHEMY_DATABASE_URI"] == sqlite_uri
+
+
+def test_create_app_uses_environment(sqlite_uri, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", sqlite_uri)
+
+    app = create_app()
+
+    assert app.config["SQLALCHEMY_DATABASE_URI"] == sqlite_uri
+
+
+def test_sqlite_defaults_to_wal(sqlite_uri):
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=sqlite_uri))
+
+    assert _pragma(app, "journal_mode") == "wal"
+    assert _pragma(app, "synchronous") == 1  # NORMAL
+    assert _pragma(app, "busy_timeout") == 5000
+
+
+def test_sqlite_pragmas_are_configurable(sqlite_uri):
+    pragmas = dict(journal_mode="delete", synchronous="full", busy_timeout=100)
+    app = create_app(dict(SQLALCHEMY_DATABASE_URI=sqlite_uri, SQLITE_PRAGMAS=pragmas))
+
+    assert _pragma(app, "journal_mode") == "delete"
+    assert _pragma(app, "synchronous") == 2  # FULL
+    assert _pragma(app, "busy_timeout") == 100
+
+
+@pytest.mark.parametrize(
+    "config",
+    [
+        dict(SQLALCHEMY_ENGINE_OPTIONS=dict(pool_size=10)),
+        dict(SQLITE_PRAGMAS=dict(journal_mode="fast")),
+        dict(SQLALCHEMY_DATABASE_URI="nosuchdb://localhost/coffee"),
+    ],
+)
+def test_invalid_config_fails_at_startup(sqlite_uri, config):
+    config.setdefault("SQLALCHEMY_DATABASE_URI", sqlite_uri)
+
+    with pytest.raises(ConfigError):
+        create_app(config)
+
+
+# startup tests ===========================================
+def test_import_defers_optional_modules():
+    # python-jose and its crypto backend load with the first public key
+    deferred = ["jose", "Crypto", "pyasn1"]
+    script = (
+        f"import sys, src.api; print([m for m in {deferred!r} if m in sys.modules])"
+    )
+
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert output.strip() == "[]"
@@ -0,0 +1,120 @@
+import json
+import logging
+
+import pytest
+from flask import url_for
+
+from src.api import create_app, db_drop_and_create_all
+from src.instrumentation import Histogram
+
+from .factories import DrinkFactory
+
+
+@pytest.fixture
+def app():
+    app = create_app(dict(INSTRUMENTATION=True))
+    db_drop_and_create_all()
+    return app
+
+
+def _server_timing(response):
+    entries = {}
+    for entry in response.headers["Server-Timing"].split(", "):
+        name, *params = entry.split(";")
+        entries[name] = dict(param.split("=", 1) for param in params)
+    return entries
+
+
+# Server-Timing tests =====================================
+def test_server_timing_phases(client):
+    DrinkFactory.create_batch(3)
+    DrinkFactory._meta.sqlalchemy_session.commit()
+
+    res = client.get(url_for("drinks.drinks_list", limit=2))
+
+    timing = _server_timing(res)
+    assert {"db", "dump", "jsonify", "sql", "total"} <= set(timing)
+    assert timing["sql"]["desc"] == '"2 queries"'
+    assert float(timing["total"]["dur"]) >= float(timing["db"]["dur"])
+
+
+@pytest.mark.usefixtures("make_request_as_barista")
+def test_server_timing_auth(client):
+    drink = DrinkFactory.create()
+    drink.insert()
+
+    res = client.get(
+        url_for("drinks.drinks_detail", drink_id=drink.id),
+        headers=dict(Authorization="Bearer token"),
+    )
+
+    assert res.status_code == 200
+    assert "auth" in _server_timing(res)
+
+
+def test_server_timing_on_errors(client):
+    res = client.get("/teas")
+
+    assert res.status_code == 404
+    assert "total" in _server_timing(res)
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("INSTRUMENTATION", raising=False)
+    app = create_app()
+
+    with app.test_client() as client:
+        assert "Server-Timing" not in client.get("/drinks").headers
+        assert client.get("/metrics").status_code == 404
+
+
+# logs and metrics tests ==================================
+def test_structured_log(client, caplog):
+    with caplog.at_level(logging.INFO, logger="src.instrumentation"):
+        client.get(url_for("drinks.drinks_list"))
+
+    record = json.loads(caplog.records[-1].getMessage())
+    assert record["route"] == "/drinks"
+    assert record["status"] == 200
+    assert record["sql_count"] >= 0
+    assert "db" in record["phases_ms"]
+
+
+def test_metrics_endpoint(client):
+    client.get(url_for("drinks.drinks_list"))
+
+    res = client.get("/metrics")
+
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    body = res.get_data(as_text=True)
+    assert (
+        'coffee_shop_request_duration_seconds_bucket{method="GET",route="/drinks",le="+Inf"}'
+        in body
+    )
+    assert (
+        'coffee_shop_phase_duration_seconds_count{phase="db",route="/drinks"}' in body
+    )
+    assert (
+        'coffee_shop_responses_total{method="GET",route="/drinks",status="200"}' in body
+    )
+    assert 'route="/metrics"' not in body
+
+
+# Histogram tests =========================================
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency", "help", buckets=(1, 2, 5))
+    for value in (0.5, 1, 1.5, 3, 10):
+        histogram.observe(value, route="/drinks")
+
+    lines = histogram.expose()
+
+    assert lines[:2] == ["# HELP latency help", "# TYPE latency histogram"]
+    assert lines[2:] == [
+        'latency_bucket{route="/drinks",le="1"} 2',
+        'latency_bucket{route="/drinks",le="2"} 3',
+        'latency_bucket{route="/drinks",le="5"} 4',
+        'latency_bucket{route="/drinks",le="+Inf"} 5',
+        'latency_sum{route="/drinks"} 16.0',
+        'latency_count{route="/drinks"} 5',
+    ]
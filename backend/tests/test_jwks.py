@@ -0,0 +1,153 @@
+import json
+
+import pytest
+
+from src.auth import auth
+from src.auth.jwks import JWKSKeyStore, JWKSUnavailable
+
+
+def _write_jwks(path, *kids):
+    keys = [dict(kid=kid, kty="RSA", n="n", e="AQAB") for kid in kids]
+    path.write_text(json.dumps(dict(keys=keys)))
+
+
+@pytest.fixture
+def jwks_file(tmp_path):
+    path = tmp_path / "jwks.json"
+    _write_jwks(path, "key-1")
+    return path
+
+
+@pytest.fixture
+def key_store(jwks_file):
+    store = JWKSKeyStore(jwks_file.as_uri(), background=False)
+    yield store
+    store.close()
+
+
+# JWKSKeyStore tests ======================================
+def test_get_key_loads_once(key_store, monkeypatch):
+    """JWKSKeyStore: repeated lookups are served from memory"""
+
+    calls = []
+    fetch = key_store._fetch
+    monkeypatch.setattr(key_store, "_fetch", lambda: calls.append(1) or fetch())
+
+    for _ in range(10):
+        assert key_store.get_key("key-1")["kid"] == "key-1"
+
+    assert len(calls) == 1
+
+
+def test_get_key_refreshes_on_unknown_kid(key_store, jwks_file):
+    """JWKSKeyStore: an unknown kid triggers a refetch"""
+
+    key_store.min_refresh_interval = 0
+    assert key_store.get_key("key-1") is not None
+
+    # rotate keys at the source
+    _write_jwks(jwks_file, "key-1", "key-2")
+
+    assert key_store.get_key("key-2")["kid"] == "key-2"
+
+
+def test_get_key_unknown_kid_is_rate_limited(key_store, jwks_file):
+    """JWKSKeyStore: kid misses do not refetch within min_refresh_interval"""
+
+    key_store.min_refresh_interval = 60
+    assert key_store.get_key("key-1") is not None
+
+    _write_jwks(jwks_file, "key-1", "key-2")
+
+    assert key_store.get_key("key-2") is None
+
+
+def test_get_key_keeps_last_good_keyset(key_store, jwks_file):
+    """JWKSKeyStore: a failed fetch keeps serving the previous keys"""
+
+    assert key_store.get_key("key-1") is not None
+
+    jwks_file.unlink()
+
+    assert key_store.refresh(force=True) == False
+    assert key_store.get_key("key-1")["kid"] == "key-1"
+
+
+def test_get_key_stale_keyset_is_refreshed(key_store, jwks_file):
+    """JWKSKeyStore: keys older than the ttl are refetched on access"""
+
+    key_store.ttl = 0
+    key_store.min_refresh_interval = 0
+    assert key_store.get_key("key-1") is not None
+
+    _write_jwks(jwks_file, "key-2")
+
+    assert key_store.get_key("key-1") is None
+    assert key_store.get_key("key-2") is not None
+
+
+def test_get_key_unavailable(tmp_path):
+    """JWKSKeyStore: raises if the key set was never loaded"""
+
+    store = JWKSKeyStore((tmp_path / "missing.json").as_uri(), background=False)
+
+    with pytest.raises(JWKSUnavailable):
+        store.get_key("key-1")
+
+
+def test_background_refresh(jwks_file):
+    """JWKSKeyStore: a background timer refreshes the keys"""
+
+    store = JWKSKeyStore(jwks_file.as_uri(), ttl=0.05)
+    try:
+        assert store.get_key("key-1") is not None
+        _write_jwks(jwks_file, "key-2")
+
+        store._timer.join(1)
+        assert "key-2" in store.keys
+    finally:
+        store.close()
+
+
+# get_key_store tests =====================================
+def test_get_key_store_uses_env(jwks_file, monkeypatch):
+    monkeypatch.setenv("AUTH0_JWKS_URL", jwks_file.as_uri())
+    monkeypatch.setenv("AUTH0_JWKS_TTL", "120")
+    auth.reset_key_store()
+
+    try:
+        store = auth.get_key_store()
+        assert store is auth.get_key_store()
+        assert store.url == jwks_file.as_uri()
+        assert store.ttl == 120
+    finally:
+        auth.reset_key_store()
+
+
+def test_get_auth_settings_read_once(jwks_file, monkeypatch):
+    monkeypatch.setenv("AUTH0_API_AUDIENCE", "coffee-shop")
+    auth.reset_key_store()
+
+    try:
+        settings = auth.get_auth_settings()
+        monkeypatch.setenv("AUTH0_API_AUDIENCE", "another-audience")
+        assert auth.get_auth_settings() is settings
+
+        auth.reset_key_store()
+        assert auth.get_auth_settings().audience == "another-audience"
+    finally:
+        auth.reset_key_store()
+
+
+def test_verify_decode_jwt_unavailable_jwks(tmp_path, monkeypatch):
+    monkeypatch.setenv("AUTH0_JWKS_URL", (tmp_path / "missing.json").as_uri())
+    auth.reset_key_store()
+
+    # header {"kid": "key-1"} with empty payload and signature
+    token = "eyJraWQiOiAia2V5LTEifQ==.e30.sig"
+    try:
+        with pytest.raises(auth.AuthError) as error:
+            auth.verify_decode_jwt(token)
+        assert error.value.status_code == 500
+    finally:
+        auth.reset_key_store()
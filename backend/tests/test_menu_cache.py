@@ -0,0 +1,171 @@
+import gzip
+
+import pytest
+from flask import url_for
+
+from src.caching import DictCache, MenuCache, RedisCache, menu_cache
+from src.services import get_drink_rows
+
+from .factories import DrinkFactory
+
+
+class FakeRedis:
+    """a local stand-in implementing the subset of redis-py used by RedisCache"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+        return True
+
+    def incr(self, key):
+        value = int(self.data.get(key, 0)) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def count_renders(monkeypatch):
+    calls = []
+
+    def counted(*args, **kwargs):
+        calls.append(1)
+        return get_drink_rows(*args, **kwargs)
+
+    monkeypatch.setattr("src.api.get_drink_rows", counted)
+    return calls
+
+
+@pytest.fixture
+def drinks():
+    return DrinkFactory.create_batch(3, recipe=[dict(color="red", name="a", parts=1)])
+
+
+# response cache tests ====================================
+@pytest.mark.usefixtures("drinks")
+def test_get_all_is_rendered_once(client, count_renders):
+    first = client.get(url_for("drinks.drinks_list"))
+    second = client.get(url_for("drinks.drinks_list"))
+
+    assert len(count_renders) == 1
+    assert first.data == second.data
+    assert len(second.json["drinks"]) == 3
+
+
+@pytest.mark.usefixtures("drinks", "disable_auth")
+def test_write_rerenders(client, count_renders):
+    client.get(url_for("drinks.drinks_list"))
+
+    payload = dict(title="Test Drink", recipe=[dict(name="b", color="blue", parts=2)])
+    client.post(url_for("drinks.drinks_create"), json=payload)
+
+    res = client.get(url_for("drinks.drinks_list"))
+
+    assert len(count_renders) == 2
+    assert len(res.json["drinks"]) == 4
+
+
+@pytest.mark.usefixtures("drinks", "disable_auth")
+def test_brief_and_detail_are_cached_separately(client):
+    brief = client.get(url_for("drinks.drinks_list"))
+    detail = client.get(url_for("drinks.drinks_list_detail"))
+
+    assert "name" not in brief.json["drinks"][0]["recipe"][0]
+    assert "name" in detail.json["drinks"][0]["recipe"][0]
+
+
+@pytest.mark.usefixtures("drinks")
+def test_get_all_precompressed(app, client, count_renders):
+    app.config["MENU_CACHE_ENCODINGS"] = ("gzip",)
+    menu_cache.init_app(app)
+    headers = {"Accept-Encoding": "gzip"}
+
+    plain = client.get(url_for("drinks.drinks_list"))
+    first = client.get(url_for("drinks.drinks_list"), headers=headers)
+    second = client.get(url_for("drinks.drinks_list"), headers=headers)
+
+    assert first.headers.get("Content-Encoding") == "gzip"
+    assert "Accept-Encoding" in first.headers.get("Vary", "")
+    assert gzip.decompress(second.data) == plain.data
+    assert len(count_renders) == 1
+
+
+# backend tests ===========================================
+def test_dict_cache_ttl(monkeypatch):
+    backend = DictCache()
+    backend.set("key", b"value", ttl=10)
+    assert backend.get("key") == b"value"
+
+    monkeypatch.setattr("src.caching.time.monotonic", lambda: float("inf"))
+    assert backend.get("key") is None
+
+
+def test_dict_cache_evicts_least_recently_used():
+    backend = DictCache(maxsize=2)
+    backend.incr("menu:version")
+    backend.set("a", b"a", ttl=10)
+    backend.set("b", b"b", ttl=10)
+    backend.get("a")
+
+    backend.set("c", b"c", ttl=10)
+
+    assert backend.get_many("a", "b", "c") == [b"a", None, b"c"]
+    # entries without a ttl are not evicted
+    assert backend.get("menu:version") == 1
+
+
+def test_dict_cache_sweeps_expired_keys(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("src.caching.time.monotonic", lambda: clock[0])
+    backend = DictCache(sweep_interval=60)
+    for index in range(100):
+        backend.set(f"key-{index}", b"value", ttl=10)
+
+    clock[0] = 61.0
+    backend.set("fresh", b"value", ttl=10)
+
+    assert len(backend) == 1
+
+
+def test_redis_cache_shares_version_between_processes():
+    client = FakeRedis()
+    worker_1 = MenuCache(RedisCache(client))
+    worker_2 = MenuCache(RedisCache(client))
+
+    etag = worker_1.etag("drinks")
+    assert worker_2.etag("drinks") == etag
+
+    worker_2.bump()
+
+    assert worker_1.version == 1
+    assert worker_1.etag("drinks") != etag
+
+
+def test_redis_cache_rendered_payload():
+    cache = MenuCache(RedisCache(FakeRedis()))
+    calls = []
+
+    def render():
+        calls.append(1)
+        return b"[]"
+
+    assert cache.get_or_render("drinks", render) == b"[]"
+    assert cache.get_or_render("drinks", render) == b"[]"
+    assert len(calls) == 1
+
+    cache.bump()
+    cache.get_or_render("drinks", render)
+    assert len(calls) == 2
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy.orm.exc import StaleDataError
+
+from src.models import Drink, db, db_migrate
+
+
+# recipe column tests =====================================
+def test_recipe_is_stored_as_json(app):
+    recipe = [dict(name="milk", color="white", parts=1)] * 10
+    drink = Drink(title="Latte", recipe=recipe)
+    drink.insert()
+    db.session.expire_all()
+
+    assert Drink.query.one().recipe == recipe
+
+
+def test_legacy_recipe_rows_are_migrated(app):
+    # the pre-JSON schema stored the recipe as json text in a VARCHAR(180)
+    db.session.execute("DROP TABLE drink")
+    db.session.execute(
+        "CREATE TABLE drink ("
+        "id INTEGER PRIMARY KEY, title VARCHAR(80) UNIQUE, recipe VARCHAR(180) NOT NULL"
+        ")"
+    )
+    db.session.execute(
+        "INSERT INTO drink (title, recipe) "
+        """VALUES ('Water', '[{"name": "water", "color": "blue", "parts": 1}]')"""
+    )
+    db.session.commit()
+
+    db_migrate()
+
+    drink = Drink.query.one()
+    assert drink.recipe == [dict(name="water", color="blue", parts=1)]
+    assert drink.version == 1
+
+
+# version column tests ====================================
+def test_version_is_bumped_by_updates(app):
+    drink = Drink(title="Latte", recipe=[])
+    drink.insert()
+    assert drink.version == 1
+
+    drink.update(dict(title="Cafe Latte"))
+    assert drink.version == 2
+
+
+def test_stale_update_is_refused(app):
+    drink = Drink(title="Latte", recipe=[])
+    drink.insert()
+    db.session.execute("UPDATE drink SET version = version + 1")
+
+    with pytest.raises(StaleDataError):
+        drink.update(dict(title="Cafe Latte"))
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from flask import url_for
+
+from src import serializers
+from src.api import DRINK_FIELDS, create_app
+from src.config import ConfigError
+from src.models import Drink, db
+from src.serializers import (DrinkBriefSchema, DrinkSchema, get_projection,
+                             json_response)
+from src.services import get_drink_rows
+
+RECIPES = [
+    [
+        dict(name="milk", color="white", parts=1),
+        dict(name="coffee", color="brown", parts="2"),
+    ],
+    dict(name="water", color="#ffffff", parts=3),
+    [dict(name="foam")],
+    [],
+]
+
+
+@pytest.fixture
+def drinks(app):
+    drinks = [
+        Drink(title=f"Drink {index}", recipe=recipe)
+        for index, recipe in enumerate(RECIPES)
+    ]
+    db.session.add_all(drinks)
+    db.session.commit()
+    return drinks
+
+
+# get_projection tests ====================================
+@pytest.mark.parametrize("schema_class", [DrinkSchema, DrinkBriefSchema])
+@pytest.mark.parametrize(
+    "only", [None, ("title",), ("recipe",), ("id", "title"), ("recipe", "title")]
+)
+def test_projection_matches_schema(drinks, schema_class, only):
+    projection = get_projection(schema_class, only)
+
+    rows = get_drink_rows(projection.columns)
+
+    assert projection.columns[0] == "id"
+    assert projection.dump(rows) == schema_class(only=only, many=True).dump(drinks)
+
+
+def test_projection_is_compiled_once():
+    assert get_projection(DrinkSchema) is get_projection(DrinkSchema)
+
+
+def test_projection_fields_are_normalized():
+    projection = get_projection(DrinkSchema, ("title", "id", "title"))
+
+    assert projection is get_projection(DrinkSchema, ("id", "title"))
+    assert get_projection(DrinkSchema, DRINK_FIELDS) is get_projection(DrinkSchema)
+
+
+def test_repeated_fields_share_a_projection(client):
+    client.get(url_for("drinks.drinks_list", fields="id"))
+    compiled = serializers._compile_projection.cache_info().currsize
+
+    for count in range(2, 20):
+        fields = ",".join(["id"] * count + ["title"] * (count % 2))
+        res = client.get(url_for("drinks.drinks_list", fields=fields))
+        assert res.status_code == 200
+
+    # ("id",) and ("id", "title") only
+    assert serializers._compile_projection.cache_info().currsize <= compiled + 1
+
+
+# json_response tests =====================================
+@pytest.mark.parametrize("backend", ["orjson", "ujson"])
+def test_json_backends_match_jsonify(app, backend):
+    pytest.importorskip(backend)
+    body = dict(drinks=[dict(id=1, title="Café / Latte", recipe=[])], success=True)
+
+    default = json_response(body)
+    app.config["JSON_BACKEND"] = backend
+    response = json_response(body)
+
+    assert response.mimetype == "application/json"
+    assert json.loads(response.get_data()) == json.loads(default.get_data())
+    assert response.get_data().endswith(b"\n")
+
+
+def test_unknown_json_backend():
+    with pytest.raises(ConfigError):
+        create_app(dict(JSON_BACKEND="pickle"))
+
+
+def test_listing_with_orjson(client, app, drinks):
+    pytest.importorskip("orjson")
+    expected = client.get(url_for("drinks.drinks_list", limit=2)).json
+
+    app.config["JSON_BACKEND"] = "orjson"
+    res = client.get(url_for("drinks.drinks_list", limit=2))
+
+    assert res.json == expected
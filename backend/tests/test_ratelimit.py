@@ -0,0 +1,166 @@
+import pytest
+from flask import url_for
+from werkzeug.exceptions import TooManyRequests
+
+from src.api import create_app, db_drop_and_create_all
+from src.auth.auth import AuthError
+from src.config import ConfigError
+from src.ratelimit import (MemoryStore, Rate, RedisStore, parse_rate,
+                           rate_limiter)
+
+RECIPE = [dict(name="milk", color="white", parts=1)]
+
+
+@pytest.fixture
+def app():
+    app = create_app(
+        dict(
+            RATE_LIMIT_PER_IP="3/minute",
+            RATE_LIMIT_AUTH_FAILURES="2/minute",
+            RATE_LIMIT_PERMISSIONS={"post:drinks": "1/minute"},
+        )
+    )
+    db_drop_and_create_all()
+    return app
+
+
+@pytest.fixture
+def make_request_as(monkeypatch):
+    def make_request_as(subject):
+        payload = dict(sub=subject, permissions=["post:drinks"])
+        monkeypatch.setattr("src.auth.auth.get_token_auth_header", lambda: subject)
+        monkeypatch.setattr("src.auth.auth.verify_decode_jwt", lambda token: payload)
+
+    return make_request_as
+
+
+# client ip tests =========================================
+def test_per_ip(client, monkeypatch):
+    for _ in range(3):
+        assert client.get(url_for("drinks.drinks_list", limit=1)).status_code == 200
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the database should not be queried")
+
+    monkeypatch.setattr("src.api.get_drink_rows", fail)
+    res = client.get(url_for("drinks.drinks_list", limit=1))
+
+    assert res.status_code == 429
+    assert res.json == dict(success=False, error=429, message="too many requests")
+    assert int(res.headers["Retry-After"]) == 20
+
+
+def test_per_ip_is_per_client(app):
+    def limit(remote_addr):
+        with app.test_request_context(environ_base={"REMOTE_ADDR": remote_addr}):
+            rate_limiter.limit_client()
+
+    for _ in range(3):
+        limit("10.0.0.1")
+
+    with pytest.raises(TooManyRequests):
+        limit("10.0.0.1")
+    limit("10.0.0.2")
+
+
+def test_disabled(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_PER_IP", "")
+    client = create_app().test_client()
+
+    assert all(client.get("/drinks").status_code == 200 for _ in range(5))
+
+
+# jwt sub tests ===========================================
+def test_per_subject_and_permission(client, make_request_as):
+    make_request_as("barista|1")
+    first = client.post(
+        url_for("drinks.drinks_create"), json=dict(title="A", recipe=RECIPE)
+    )
+    second = client.post(
+        url_for("drinks.drinks_create"), json=dict(title="B", recipe=RECIPE)
+    )
+
+    make_request_as("barista|2")
+    other = client.post(
+        url_for("drinks.drinks_create"), json=dict(title="C", recipe=RECIPE)
+    )
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) == 60
+    assert other.status_code == 200
+
+
+def test_auth_failures(client, monkeypatch):
+    def reject(token):
+        raise AuthError("token not authentic", 401)
+
+    monkeypatch.setattr("src.auth.auth.verify_decode_jwt", reject)
+    headers = dict(Authorization="Bearer not.a.token")
+    for _ in range(2):
+        res = client.get(url_for("drinks.drinks_detail", drink_id=1), headers=headers)
+        assert res.status_code == 401
+
+    def fail(token):
+        raise AssertionError("the token should not be verified")
+
+    monkeypatch.setattr("src.auth.auth.verify_decode_jwt", fail)
+    res = client.get(url_for("drinks.drinks_detail", drink_id=1), headers=headers)
+
+    assert res.status_code == 429
+
+
+# store tests =============================================
+def test_memory_store_refills():
+    now = [0.0]
+    store = MemoryStore(clock=lambda: now[0])
+    rate = Rate(2, 10)
+
+    assert store.take("key", rate) == (True, 0)
+    assert store.take("key", rate) == (True, 0)
+    allowed, retry_after = store.take("key", rate)
+    assert not allowed and retry_after == pytest.approx(5)
+
+    now[0] = 5
+    assert store.take("key", rate)[0]
+    assert not store.take("key", rate)[0]
+
+
+def test_memory_store_check_only():
+    store = MemoryStore(clock=lambda: 0)
+    rate = Rate(1, 60)
+
+    assert store.take("key", rate, cost=0) == (True, 0)
+    assert store.take("key", rate) == (True, 0)
+    assert not store.take("key", rate, cost=0)[0]
+
+
+def test_memory_store_is_bounded():
+    store = MemoryStore(maxsize=2, clock=lambda: 0)
+    for key in ("a", "b", "c"):
+        store.take(key, Rate(1, 60))
+
+    assert store.take("a", Rate(1, 60))[0]
+
+
+def test_redis_store():
+    class FakeRedis:
+        def eval(self, script, numkeys, key, *args):
+            self.call = (numkeys, key) + args[:3]
+            return [0, "2.5"]
+
+    client = FakeRedis()
+
+    assert RedisStore(client).take("ip:1", Rate(10, 60)) == (False, 2.5)
+    assert client.call == (1, "coffee-shop:ratelimit:ip:1", 10, 60, 1)
+
+
+@pytest.mark.parametrize("value", ["ten/minute", "10/fortnight", "0/second", "10"])
+def test_parse_rate_errors(value):
+    with pytest.raises(ConfigError):
+        parse_rate(value)
+
+
+def test_parse_rate():
+    assert parse_rate("60/minute") == Rate(60, 60)
+    assert parse_rate("") is None
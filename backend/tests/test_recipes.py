@@ -0,0 +1,105 @@
+import pytest
+
+from src.recipes import is_color, is_parts, recipe_errors, store_parts
+
+INGREDIENT = dict(name="milk", color="white", parts=1)
+
+
+# is_color tests ==========================================
+@pytest.mark.parametrize(
+    "value",
+    [
+        "white",
+        "RebeccaPurple",
+        "transparent",
+        "#fff",
+        "#ffff",
+        "#3b2a1d",
+        "#3B2A1D80",
+        "rgb(59, 42, 29)",
+        "rgba(59, 42, 29, 0.5)",
+        "rgb(59 42 29 / 50%)",
+        "hsl(25deg 34% 17%)",
+        "HSLA(25, 34%, 17%, .5)",
+    ],
+)
+def test_is_color(value):
+    assert is_color(value) == True
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", "clear", "#ff", "#ggg", "rgb(59, 42)", "rgb(59, 42, 29", "url(x)", 255, None],
+)
+def test_is_color_invalid(value):
+    assert is_color(value) == False
+
+
+# is_parts tests ==========================================
+@pytest.mark.parametrize("value", [1, 2.5, "1", "0.5", "1e2"])
+def test_is_parts(value):
+    assert is_parts(value) == True
+
+
+@pytest.mark.parametrize(
+    "value",
+    [0, -1, "0", "", "one", " 1", "nan", float("nan"), float("inf"), True, None],
+)
+def test_is_parts_invalid(value):
+    assert is_parts(value) == False
+
+
+# recipe_errors tests =====================================
+@pytest.mark.parametrize("recipe", [INGREDIENT, [INGREDIENT, INGREDIENT]])
+def test_recipe_errors_valid(recipe):
+    assert recipe_errors(recipe) == []
+
+
+def test_recipe_errors_checks_every_ingredient():
+    recipe = [
+        INGREDIENT,
+        dict(INGREDIENT, parts="lots"),
+        dict(INGREDIENT, name="", color="clear"),
+    ]
+
+    assert recipe_errors(recipe) == [
+        "ingredient 1: parts must be a positive number",
+        "ingredient 2: name must be a non empty string",
+        "ingredient 2: color must be a css color name, #hex, rgb() or hsl()",
+    ]
+
+
+@pytest.mark.parametrize(
+    "recipe",
+    [
+        None,
+        "milk",
+        [],
+        ["milk"],
+        dict(name="milk", color="white"),
+        dict(INGREDIENT, sugar=True),
+    ],
+)
+def test_recipe_errors_invalid_structure(recipe):
+    assert len(recipe_errors(recipe)) == 1
+
+
+# store_parts tests =======================================
+@pytest.mark.parametrize(
+    "parts,stored", [("1", 1), ("0.5", 0.5), ("1e2", 100), (2, 2), ("lots", "lots")]
+)
+def test_store_parts(parts, stored):
+    recipe = store_parts([dict(INGREDIENT, parts=parts)])
+
+    assert recipe[0]["parts"] == stored
+    assert type(recipe[0]["parts"]) is type(stored)
+
+
+def test_store_parts_keeps_the_recipe_shape():
+    assert store_parts(dict(INGREDIENT, parts="3")) == dict(INGREDIENT, parts=3)
+
+
+def test_store_parts_does_not_copy_numbers():
+    recipe = [INGREDIENT] * 3
+
+    assert store_parts(recipe) is recipe
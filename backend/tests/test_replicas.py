@@ -0,0 +1,102 @@
+import time
+
+import pytest
+
+from src.api import create_app
+from src.caching import menu_cache
+from src.config import ConfigError
+from src.models import Drink, db
+from src.services import add_drink, get_all_drinks, get_drink
+
+RECIPE = [dict(name="milk", color="white", parts=1)]
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app(
+        dict(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+            SQLALCHEMY_BINDS=dict(replica=f"sqlite:///{tmp_path / 'replica.db'}"),
+            SQLALCHEMY_REPLICA_BINDS=["replica"],
+            SQLALCHEMY_REPLICA_STICKY_SECONDS=0,
+        )
+    )
+    with app.app_context():
+        db.create_all()
+        Drink.__table__.create(db.get_engine(app, bind="replica"))
+
+        # a replica lagging behind the primary
+        db.session.add(Drink(title="Primary", recipe=RECIPE))
+        db.session.commit()
+        db.get_engine(app, bind="replica").execute(
+            Drink.__table__.insert(), title="Replica", recipe=RECIPE
+        )
+    return app
+
+
+def _titles(drinks):
+    return [drink.title for drink in drinks]
+
+
+# read routing tests ======================================
+def test_reads_use_replica(app):
+    assert _titles(get_all_drinks()) == ["Replica"]
+    assert get_drink(1).title == "Replica"
+
+
+def test_reads_for_update_use_primary(app):
+    assert get_drink(1, for_update=True).title == "Primary"
+
+
+def test_writes_use_primary(app):
+    add_drink(dict(title="Latte", recipe=RECIPE))
+
+    primary = (
+        db.get_engine(app).execute("SELECT title FROM drink ORDER BY id").fetchall()
+    )
+    replica = db.get_engine(app, bind="replica").execute("SELECT title FROM drink")
+    assert [title for title, in primary] == ["Primary", "Latte"]
+    assert [title for title, in replica] == ["Replica"]
+
+
+def test_reads_stick_to_primary_after_write(app):
+    app.config["SQLALCHEMY_REPLICA_STICKY_SECONDS"] = 60
+
+    add_drink(dict(title="Latte", recipe=RECIPE))
+
+    assert _titles(get_all_drinks()) == ["Primary", "Latte"]
+
+
+def test_reads_stick_to_primary_after_write_by_another_worker(app):
+    app.config["SQLALCHEMY_REPLICA_STICKY_SECONDS"] = 60
+
+    # another worker committed a write and bumped the shared menu state
+    menu_cache.backend.set("menu:modified", str(time.time()))
+
+    assert _titles(get_all_drinks()) == ["Primary"]
+    assert get_drink(1).title == "Primary"
+
+
+def test_reads_return_to_replica_once_write_is_old(app):
+    app.config["SQLALCHEMY_REPLICA_STICKY_SECONDS"] = 60
+
+    add_drink(dict(title="Latte", recipe=RECIPE))
+    menu_cache.backend.set("menu:modified", str(time.time() - 120))
+
+    assert _titles(get_all_drinks()) == ["Replica"]
+
+
+def test_without_replicas_reads_use_primary(app):
+    app.config["SQLALCHEMY_REPLICA_BINDS"] = []
+
+    assert _titles(get_all_drinks()) == ["Primary"]
+
+
+def test_unknown_replica_bind(tmp_path):
+    with pytest.raises(ConfigError):
+        create_app(
+            dict(
+                SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+                SQLALCHEMY_REPLICA_BINDS=["replica"],
+            )
+        )
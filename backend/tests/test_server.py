@@ -0,0 +1,181 @@
+import os
+import queue
+import re
+import signal
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from urllib.request import urlopen
+
+import pytest
+
+from src.caching import DictCache, RedisCache
+from src.changes import RedisPubSub
+from src.config import ConfigError
+from src.models import db
+from src.ratelimit import RedisStore
+from src.server import Arbiter, check_workers, parse_bind
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+
+
+@pytest.fixture
+def server(app, tmp_path):
+    database = tmp_path / "server.db"
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{database}"
+    with app.app_context():
+        db.create_all(app=app)
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.server", "--bind", "127.0.0.1:0"]
+        + ["--workers", "1", "--threads", "2", "--graceful-timeout", "5"],
+        # no network access for the JWKS warm up
+        env=dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{database}",
+            AUTH0_JWKS_URL=(tmp_path / "jwks.json").as_uri(),
+        ),
+        cwd=Path(__file__).parent.parent,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    lines = queue.Queue()
+    threading.Thread(
+        target=lambda: [lines.put(line) for line in process.stderr], daemon=True
+    ).start()
+
+    def wait_for(pattern, count=1):
+        matches = []
+        while len(matches) < count:
+            match = re.search(pattern, lines.get(timeout=30))
+            if match:
+                matches.append(match)
+        return matches
+
+    port = int(wait_for(r"listening on 127.0.0.1:(\d+)")[0].group(1))
+    wait_for(r"booted worker")
+    yield process, f"http://127.0.0.1:{port}", wait_for
+
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+
+
+# parse_bind tests ========================================
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("127.0.0.1:5000", ("127.0.0.1", 5000)),
+        (":8000", ("0.0.0.0", 8000)),
+        ("[::1]:8000", ("::1", 8000)),
+    ],
+)
+def test_parse_bind(value, expected):
+    assert parse_bind(value) == expected
+
+
+def test_parse_bind_invalid():
+    with pytest.raises(ConfigError):
+        parse_bind("localhost")
+
+
+# check_workers tests =====================================
+def test_check_workers_single_worker(app):
+    check_workers(app, 1)
+
+
+def test_check_workers_needs_shared_backends(app):
+    app.config["MENU_CACHE_BACKEND"] = DictCache()
+
+    with pytest.raises(ConfigError) as error:
+        check_workers(app, 2)
+
+    message = str(error.value)
+    assert "MENU_CACHE_BACKEND" in message and "CHANGES_BACKEND" in message
+
+
+def test_check_workers_shared_backends(app):
+    app.config["MENU_CACHE_BACKEND"] = RedisCache(client=None)
+    app.config["CHANGES_BACKEND"] = RedisPubSub(client=None)
+    app.config["RATE_LIMIT_STORE"] = RedisStore(client=None)
+
+    check_workers(app, 2)
+
+
+def test_check_workers_needs_shared_rate_limit_store(app):
+    app.config["MENU_CACHE_BACKEND"] = RedisCache(client=None)
+    app.config["CHANGES_BACKEND"] = RedisPubSub(client=None)
+
+    with pytest.raises(ConfigError, match="RATE_LIMIT_STORE"):
+        check_workers(app, 2)
+
+    app.config["RATE_LIMIT_PER_IP"] = ""
+    app.config["RATE_LIMIT_AUTH_FAILURES"] = ""
+    app.config["RATE_LIMIT_PERMISSIONS"] = {}
+    check_workers(app, 2)
+
+
+# Arbiter tests ===========================================
+def test_failed_reload_keeps_the_workers(monkeypatch):
+    def preload(config):
+        raise ConfigError("SQLITE_BUSY_TIMEOUT must be an integer")
+
+    monkeypatch.setattr("src.server.load_environment", lambda override: None)
+    monkeypatch.setattr("src.server.preload", preload)
+    arbiter = Arbiter(sock=None, workers=1, threads=1)
+    arbiter.app = app = object()
+    arbiter.children = {1234: None}
+
+    arbiter.reload()
+
+    assert arbiter.app is app
+    assert arbiter.children == {1234: None}
+    assert arbiter.retiring == {}
+
+
+# server tests ============================================
+def test_several_workers_without_shared_backends_refuse_to_start(tmp_path):
+    process = subprocess.run(
+        [sys.executable, "-m", "src.server", "--bind", "127.0.0.1:0"]
+        + ["--workers", "2"],
+        env=dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{tmp_path / 'server.db'}",
+            AUTH0_JWKS_URL=(tmp_path / "jwks.json").as_uri(),
+        ),
+        cwd=Path(__file__).parent.parent,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        timeout=30,
+    )
+
+    assert process.returncode == 1
+    assert "MENU_CACHE_BACKEND" in process.stderr
+    assert "booted worker" not in process.stderr
+
+
+def test_workers_serve_the_app(server):
+    process, url, wait_for = server
+
+    for _ in range(4):
+        with urlopen(f"{url}/drinks", timeout=10) as response:
+            assert response.status == 200
+
+
+def test_reload_replaces_the_workers(server):
+    process, url, wait_for = server
+
+    process.send_signal(signal.SIGHUP)
+    wait_for(r"booted worker")
+
+    with urlopen(f"{url}/drinks", timeout=10) as response:
+        assert response.status == 200
+
+
+def test_stop(server):
+    process, url, wait_for = server
+
+    process.send_signal(signal.SIGTERM)
+
+    assert process.wait(timeout=15) == 0
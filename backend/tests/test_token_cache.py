@@ -0,0 +1,106 @@
+import time
+
+import pytest
+from flask import url_for
+
+from src.auth import auth
+from src.auth.cache import TokenCache
+
+
+@pytest.fixture
+def token_cache(monkeypatch):
+    cache = TokenCache(maxsize=2)
+    monkeypatch.setattr(auth, "token_cache", cache)
+    return cache
+
+
+def _payload(expires_in=60, **claims):
+    return dict(exp=time.time() + expires_in, **claims)
+
+
+# TokenCache tests ========================================
+def test_get_returns_cached_payload(token_cache):
+    payload = _payload(sub="barista")
+    assert token_cache.set("token", payload) == True
+
+    assert token_cache.get("token") is payload
+    assert token_cache.stats()["hits"] == 1
+
+
+def test_get_unknown_token_is_miss(token_cache):
+    assert token_cache.get("token") is None
+    assert token_cache.stats()["misses"] == 1
+
+
+def test_set_without_exp_is_not_cached(token_cache):
+    assert token_cache.set("token", dict(sub="barista")) == False
+    assert token_cache.get("token") is None
+
+
+def test_set_expired_is_not_cached(token_cache):
+    assert token_cache.set("token", _payload(expires_in=-1)) == False
+
+
+def test_get_expires_at_exp(token_cache):
+    now = time.time()
+    token_cache.clock = lambda: now
+    token_cache.set("token", dict(exp=now + 10))
+
+    token_cache.clock = lambda: now + 10
+    assert token_cache.get("token") is None
+    assert token_cache.stats()["expirations"] == 1
+    assert token_cache.stats()["size"] == 0
+
+
+def test_set_evicts_least_recently_used(token_cache):
+    token_cache.set("token-1", _payload())
+    token_cache.set("token-2", _payload())
+    token_cache.get("token-1")
+
+    token_cache.set("token-3", _payload())
+
+    assert token_cache.get("token-2") is None
+    assert token_cache.get("token-1") is not None
+    assert token_cache.stats()["evictions"] == 1
+
+
+def test_disabled_cache(token_cache):
+    token_cache.maxsize = 0
+    assert token_cache.set("token", _payload()) == False
+
+
+# decode_jwt tests ========================================
+def test_decode_jwt_verifies_once(token_cache, monkeypatch):
+    calls = []
+
+    def verify(token):
+        calls.append(token)
+        return _payload(permissions=["get:drinks-detail"])
+
+    monkeypatch.setattr(auth, "verify_decode_jwt", verify)
+
+    for _ in range(5):
+        payload = auth.decode_jwt("token")
+
+    assert calls == ["token"]
+    assert payload["permissions"] == frozenset(["get:drinks-detail"])
+
+
+def test_requires_auth_skips_verification_on_cached_token(
+    client, token_cache, monkeypatch
+):
+    calls = []
+
+    def verify(token):
+        calls.append(token)
+        return _payload(permissions=["get:drinks-detail"])
+
+    monkeypatch.setattr(auth, "verify_decode_jwt", verify)
+    headers = dict(Authorization="Bearer token")
+
+    for _ in range(3):
+        res = client.get(url_for("drinks.drinks_list_detail"), headers=headers)
+        assert res.status_code == 200
+
+    assert calls == ["token"]
+    assert token_cache.stats()["hits"] == 2